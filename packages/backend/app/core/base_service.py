@@ -3,6 +3,7 @@ Base Service - Base class for all business services.
 Provides common functionality like caching, logging, and transaction management.
 """
 
+import hashlib
 import logging
 from typing import TypeVar, Generic, Optional, Any
 from datetime import datetime
@@ -51,7 +52,6 @@ class BaseService(Generic[DaoType]):
 
     def _get_cache_key(self, prefix: str, **kwargs) -> str:
         """Generate cache key from operation and parameters."""
-        import hashlib
         params = ":".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
         content = f"{prefix}:{params}"
         return hashlib.md5(content.encode()).hexdigest()
@@ -91,10 +91,19 @@ class BaseService(Generic[DaoType]):
 
     def log_info(self, message: str, **context) -> None:
         """Log info message with context."""
-        context_str = " ".join(f"{k}={v}" for k, v in context.items())
-        logger.info(f"{message} {context_str}".strip())
+        self._log(logging.INFO, message, context)
 
     def log_error(self, message: str, **context) -> None:
         """Log error message with context."""
-        context_str = " ".join(f"{k}={v}" for k, v in context.items())
-        logger.error(f"{message} {context_str}".strip())
+        self._log(logging.ERROR, message, context)
+
+    @staticmethod
+    def _log(level: int, message: str, context: dict) -> None:
+        """Log message with context, skipping formatting when level is disabled."""
+        if not logger.isEnabledFor(level):
+            return
+        if context:
+            context_str = " ".join(f"{k}={v}" for k, v in context.items())
+            logger.log(level, "%s %s", message, context_str)
+        else:
+            logger.log(level, message)
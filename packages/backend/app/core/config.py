@@ -29,6 +29,8 @@ class Settings(BaseSettings):
     sophnet_project_id: str = ""
     sophnet_tts_easyllm_id: str = ""
     sophnet_embedding_easyllm_id: str = ""
+    # 可选的多个 OpenAI 兼容入口 (逗号分隔), LLM/VLM 请求按轮询分发; 留空使用默认入口
+    sophnet_base_urls: str = ""
 
     # ========== Legacy AI Services (for backward compatibility) ==========
     # DashScope API (Alibaba Cloud - Qwen-VL & Paraformer) - DEPRECATED
@@ -38,6 +40,11 @@ class Settings(BaseSettings):
     modelscope_api_key: str = ""
     modelscope_model: str = "Qwen/Qwen2.5-Coder-32B-Instruct"
 
+    # LLM response cache (opt-in, e.g. LLM_CACHE=1 for repeated test runs)
+    llm_cache: bool = False
+    llm_cache_path: str = "data/llm_cache.db"
+    llm_cache_ttl: int = 7 * 24 * 3600  # 秒, 过期条目视为未命中; 0 表示永不过期
+
     # Upload and Temp directories
     upload_dir: str = "data/uploads"
     temp_dir: str = "data/temp"
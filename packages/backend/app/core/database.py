@@ -1,15 +1,36 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import get_settings
 
 settings = get_settings()
 
+_is_sqlite = settings.database_url.startswith("sqlite")
+
+engine_kwargs = {}
+if _is_sqlite:
+    # Wait for locks instead of failing immediately with "database is locked"
+    engine_kwargs["connect_args"] = {"timeout": 30}
+if ":memory:" not in settings.database_url:
+    engine_kwargs["pool_size"] = 10
+    engine_kwargs["max_overflow"] = 20
+
 # Create async engine
 engine = create_async_engine(
     settings.database_url,
     echo=settings.env == "development",
+    **engine_kwargs,
 )
 
+if _is_sqlite:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        """Use WAL so readers don't block the writer and commits avoid a full fsync."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
 # Create async session factory
 async_session = sessionmaker(
     engine,
@@ -6,6 +6,7 @@ from fastapi.staticfiles import StaticFiles
 
 from app.core import get_settings, init_db
 from app.core.router_registry import RouterRegistry
+from app.shared.perception import close_sophnet_service
 
 # Configure logging
 logging.basicConfig(
@@ -42,6 +43,7 @@ async def lifespan(app: FastAPI):
     logger.info(f"DashScope API Key configured: {'Yes' if settings.dashscope_api_key else 'No'}")
     yield
     logger.info("Viewpoint Prism API shutting down...")
+    await close_sophnet_service()
 
 
 app = FastAPI(
@@ -3,6 +3,7 @@ Analysis service - AI-powered video analysis.
 """
 
 import json
+import asyncio
 import hashlib
 import logging
 import traceback
@@ -10,6 +11,12 @@ from typing import List, Dict, Any, Optional
 from pathlib import Path
 from datetime import datetime
 
+try:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so existing handlers still apply
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 from app.core import get_settings
 from app.shared.perception import get_sophnet_service
 from app.shared.storage import get_vector_store
@@ -17,6 +24,9 @@ from app.shared.storage import get_vector_store
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# 单页简报最大并发生成数 (限制同时打到 LLM 的请求)
+ONE_PAGER_MAX_CONCURRENCY = 4
+
 
 class AnalysisService:
     """AI-powered analysis generation service."""
@@ -26,6 +36,8 @@ class AnalysisService:
         self.sophnet = get_sophnet_service()
         self._vector_store = None  # 延迟初始化
         self._cache: Dict[str, Any] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._one_pager_semaphore = asyncio.Semaphore(ONE_PAGER_MAX_CONCURRENCY)
 
     @property
     def vector_store(self):
@@ -53,9 +65,8 @@ class AnalysisService:
         limit_per_source: int = 50
     ) -> Dict[str, List[Dict]]:
         """Get documents for multiple sources."""
-        result = {}
-        for source_id in source_ids:
-            docs = self.vector_store.get_source_documents(source_id)
+        result = self.vector_store.get_documents_for_sources(source_ids)
+        for source_id, docs in result.items():
             docs.sort(key=lambda x: x.get("metadata", {}).get("start", 0))
             result[source_id] = docs[:limit_per_source]
         return result
@@ -65,8 +76,7 @@ class AnalysisService:
         parts = []
         for source_id, docs in source_docs.items():
             if docs:
-                texts = [d.get("text", "") for d in docs[:10]]
-                combined = " ".join(texts)
+                combined = " ".join(text for d in docs[:10] if (text := d.get("text", "")))
                 parts.append(f"[Source {source_id}]: {combined[:500]}")
         return "\n\n".join(parts) if parts else "No content available"
 
@@ -285,7 +295,7 @@ class AnalysisService:
                     lines = lines[:-1]
                 cleaned = "\n".join(lines).strip()
             
-            conflicts = json.loads(cleaned)
+            conflicts = json_loads(cleaned)
             if not isinstance(conflicts, list):
                 conflicts = [conflicts]
             conflicts = self._normalize_conflicts(conflicts)
@@ -332,7 +342,7 @@ class AnalysisService:
                     lines = lines[:-1]
                 cleaned = "\n".join(lines).strip()
             
-            graph = json.loads(cleaned)
+            graph = json_loads(cleaned)
             graph = self._normalize_graph(graph)
             self._cache[cache_key] = graph
         except json.JSONDecodeError:
@@ -382,7 +392,7 @@ class AnalysisService:
                     lines = lines[:-1]
                 cleaned = "\n".join(lines).strip()
             
-            timeline = json.loads(cleaned)
+            timeline = json_loads(cleaned)
             if not isinstance(timeline, list):
                 timeline = []
             timeline = self._normalize_timeline(timeline)
@@ -477,7 +487,7 @@ class AnalysisService:
                 )
 
                 cleaned = self._clean_llm_json(response)
-                data = json.loads(cleaned)
+                data = json_loads(cleaned)
                 entities_data = data.get("entities", [])
 
                 entities = []
@@ -553,11 +563,38 @@ class AnalysisService:
         source_ids: List[str],
         use_cache: bool = True,
     ) -> Dict[str, Any]:
-        """Generate a one-pager report."""
+        """Generate a one-pager report.
+
+        Concurrent calls for the same sources share one in-flight
+        generation, even when use_cache is False.
+        """
         cache_key = self._get_cache_key("one_pager", source_ids)
         if use_cache and cache_key in self._cache:
             return self._cache[cache_key]
 
+        # 生成放在独立 task 中: 任一调用方被取消都不会中断其他共享该结果的调用方
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(self._run_one_pager(source_ids, cache_key))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(cache_key, done))
+        return await asyncio.shield(task)
+
+    async def _run_one_pager(self, source_ids: List[str], cache_key: str) -> Dict[str, Any]:
+        """Generate the one-pager under the concurrency limit."""
+        async with self._one_pager_semaphore:
+            return await self._compute_one_pager(source_ids, cache_key)
+
+    def _finish_inflight(self, cache_key: str, task: asyncio.Task):
+        """Forget a finished one-pager task."""
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+        if not task.cancelled():
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            task.exception()
+
+    async def _compute_one_pager(self, source_ids: List[str], cache_key: str) -> Dict[str, Any]:
+        """Build the one-pager report and store it in the cache."""
         source_docs = self._get_source_documents(source_ids, limit_per_source=30)
         combined_text = self._build_source_summary(source_docs)
 
@@ -589,7 +626,7 @@ evidence_images (string数组), generated_at (ISO时间字符串), source_ids (s
 
         try:
             cleaned = self._clean_llm_json(response)
-            data = json.loads(cleaned)
+            data = json_loads(cleaned)
         except json.JSONDecodeError:
             result = self._fallback_one_pager(source_ids, source_docs)
             self._cache[cache_key] = result
@@ -9,6 +9,9 @@ from .schemas import (
     ChatReference,
     ContextBridgeRequest,
     ContextBridgeResponse,
+    ContextBridgeBatchItem,
+    ContextBridgeBatchRequest,
+    ContextBridgeBatchResponse,
 )
 
 __all__ = [
@@ -19,4 +22,7 @@ __all__ = [
     "ChatReference",
     "ContextBridgeRequest",
     "ContextBridgeResponse",
+    "ContextBridgeBatchItem",
+    "ContextBridgeBatchRequest",
+    "ContextBridgeBatchResponse",
 ]
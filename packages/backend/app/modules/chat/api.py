@@ -20,6 +20,8 @@ from app.modules.chat import (
     ChatReference,
     ContextBridgeRequest,
     ContextBridgeResponse,
+    ContextBridgeBatchRequest,
+    ContextBridgeBatchResponse,
 )
 
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -178,3 +180,19 @@ async def context_bridge(
     )
 
     return ContextBridgeResponse(**result)
+
+
+@router.post("/context-bridge/batch", response_model=ContextBridgeBatchResponse)
+async def context_bridge_batch(
+    request: ContextBridgeBatchRequest,
+    service: ChatService = Depends(get_chat_service),
+):
+    """Generate context bridges for several seeks in one request."""
+    results = await service.generate_context_bridge_batch(
+        source_id=request.source_id,
+        items=[item.model_dump() for item in request.items],
+    )
+
+    return ContextBridgeBatchResponse(
+        results=[ContextBridgeResponse(**r) for r in results]
+    )
@@ -35,3 +35,17 @@ class ContextBridgeResponse(BaseModel):
     previous_context: str
     current_context: str
     timestamp_str: str
+
+
+class ContextBridgeBatchItem(BaseModel):
+    timestamp: float
+    previous_timestamp: Optional[float] = None
+
+
+class ContextBridgeBatchRequest(BaseModel):
+    source_id: str
+    items: List[ContextBridgeBatchItem]
+
+
+class ContextBridgeBatchResponse(BaseModel):
+    results: List[ContextBridgeResponse]
@@ -3,8 +3,9 @@ Chat service - RAG-based conversation with video content.
 """
 
 import json
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional, Generator
+from typing import List, Dict, Any, Optional, AsyncIterator
 from pathlib import Path
 
 from app.shared.perception import get_sophnet_service
@@ -62,9 +63,9 @@ class ChatService:
         """Chat with video content using RAG."""
         vector_store = get_vector_store()
 
+        docs_by_source = vector_store.get_documents_for_sources(source_ids)
         source_titles = {}
-        for sid in source_ids:
-            docs = vector_store.get_source_documents(sid)
+        for sid, docs in docs_by_source.items():
             if docs:
                 source_titles[sid] = docs[0].get("metadata", {}).get("video_title", f"Source {sid}")
 
@@ -72,9 +73,8 @@ class ChatService:
         if not results:
             # Fallback to recent documents when query has no direct matches.
             fallback_docs = []
-            for sid in source_ids:
-                docs = vector_store.get_source_documents(sid)
-                docs.sort(key=lambda x: x.get("metadata", {}).get("start", 0))
+            for docs in docs_by_source.values():
+                docs = sorted(docs, key=lambda x: x.get("metadata", {}).get("start", 0))
                 fallback_docs.extend(docs[:3])
             results = fallback_docs[:n_results]
 
@@ -114,21 +114,31 @@ class ChatService:
         query: str,
         source_ids: List[str],
         n_results: int = 10
-    ) -> Generator[str, None, None]:
-        """Stream chat response."""
+    ) -> AsyncIterator[str]:
+        """Stream chat response.
+
+        Yields NDJSON lines: references first, then one {"delta": ...} line
+        per generated chunk, and finally the full {"content": ..., "done": true}.
+        """
         vector_store = get_vector_store()
-        results = vector_store.search(query=query, source_ids=source_ids, n_results=n_results)
+
+        # Search and the batched title lookup are independent blocking calls
+        results, docs_by_source = await asyncio.gather(
+            asyncio.to_thread(
+                vector_store.search, query=query, source_ids=source_ids, n_results=n_results
+            ),
+            asyncio.to_thread(vector_store.get_documents_for_sources, source_ids),
+        )
+
         if not results:
             fallback_docs = []
-            for sid in source_ids:
-                docs = vector_store.get_source_documents(sid)
-                docs.sort(key=lambda x: x.get("metadata", {}).get("start", 0))
+            for docs in docs_by_source.values():
+                docs = sorted(docs, key=lambda x: x.get("metadata", {}).get("start", 0))
                 fallback_docs.extend(docs[:3])
             results = fallback_docs[:n_results]
 
         source_titles = {}
-        for sid in source_ids:
-            docs = vector_store.get_source_documents(sid)
+        for sid, docs in docs_by_source.items():
             if docs:
                 source_titles[sid] = docs[0].get("metadata", {}).get("video_title", f"Source {sid}")
 
@@ -146,12 +156,15 @@ class ChatService:
 
 请给出回答。"""
 
-        response = await self.sophnet.chat(
+        parts = []
+        async for chunk in self.sophnet.chat_stream(
             messages=[{"role": "user", "content": prompt}],
             model=self.model,
-        )
+        ):
+            parts.append(chunk)
+            yield json.dumps({"delta": chunk}) + "\n"
 
-        yield json.dumps({"content": response, "done": True}) + "\n"
+        yield json.dumps({"content": "".join(parts), "done": True}) + "\n"
 
     async def generate_context_bridge(
         self,
@@ -162,7 +175,28 @@ class ChatService:
         """Generate context bridge when user seeks in video."""
         vector_store = get_vector_store()
         docs = vector_store.get_source_documents(source_id)
+        return self._build_context_bridge(docs, target_timestamp, previous_timestamp)
 
+    async def generate_context_bridge_batch(
+        self,
+        source_id: str,
+        items: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """Generate context bridges for several seeks; source documents are fetched once."""
+        vector_store = get_vector_store()
+        docs = vector_store.get_source_documents(source_id)
+        return [
+            self._build_context_bridge(docs, item["timestamp"], item.get("previous_timestamp"))
+            for item in items
+        ]
+
+    def _build_context_bridge(
+        self,
+        docs: List[Dict[str, Any]],
+        target_timestamp: float,
+        previous_timestamp: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Build a context bridge from already-fetched source documents."""
         if not docs:
             return {
                 "summary": "No content available",
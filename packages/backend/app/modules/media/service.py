@@ -15,6 +15,13 @@ from app.core import get_settings
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+def _frame_filter(interval: int, max_width: Optional[int] = None) -> str:
+    """Build the -vf chain: one frame per interval, optionally downscaled (never upscaled)."""
+    vf = f"fps=1/{interval}"
+    if max_width:
+        vf += f",scale='min({max_width},iw)':-2"
+    return vf
+
 
 def _run_ffmpeg_sync(cmd: List[str], timeout: int = 300) -> tuple:
     """Run FFmpeg command synchronously."""
@@ -126,9 +133,10 @@ class MediaProcessor:
         self,
         video_path: Path,
         source_id: str,
-        interval: int = 5
+        interval: int = 5,
+        max_width: Optional[int] = None,
     ) -> List[Path]:
-        """Extract frames from video at specified interval."""
+        """Extract frames from video at specified interval, optionally capped at max_width."""
         output_dir = self.base_dir / source_id / "frames"
         output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -139,7 +147,7 @@ class MediaProcessor:
                 "ffmpeg",
                 "-y",
                 "-i", str(video_path),
-                "-vf", f"fps=1/{interval}",
+                "-vf", _frame_filter(interval, max_width),
                 "-q:v", "2",
                 str(output_pattern)
             ]
@@ -162,23 +170,88 @@ class MediaProcessor:
             logger.error(f"Failed to extract frames: {e}")
             return []
 
+    async def extract_audio_and_frames(
+        self,
+        video_path: Path,
+        source_id: str,
+        interval: int = 5,
+        sample_rate: int = 16000,
+        max_width: Optional[int] = None,
+    ) -> Optional[tuple]:
+        """Extract audio and frames with one FFmpeg process (single demux/decode pass).
+
+        Returns:
+            (audio_path, frame_paths), or None if the combined run failed
+            (e.g. no audio stream) and the caller should extract separately
+        """
+        output_dir = self.base_dir / source_id
+        frames_dir = output_dir / "frames"
+        frames_dir.mkdir(parents=True, exist_ok=True)
+        audio_path = output_dir / "audio.wav"
+
+        try:
+            cmd = [
+                "ffmpeg",
+                "-y",
+                "-i", str(video_path),
+                # Output 1: mono PCM audio
+                "-map", "0:a:0",
+                "-vn",
+                "-acodec", "pcm_s16le",
+                "-ar", str(sample_rate),
+                "-ac", "1",
+                str(audio_path),
+                # Output 2: one frame every `interval` seconds
+                "-map", "0:v:0",
+                "-vf", _frame_filter(interval, max_width),
+                "-q:v", "2",
+                str(frames_dir / "frame_%05d.jpg"),
+            ]
+
+            logger.info(f"Extracting audio and frames every {interval}s from {video_path}")
+
+            returncode, stdout, stderr = await asyncio.to_thread(
+                _run_ffmpeg_sync, cmd, 300
+            )
+
+            if returncode == 0 and audio_path.exists():
+                frames = sorted(frames_dir.glob("frame_*.jpg"))
+                logger.info(f"Extracted audio and {len(frames)} frames")
+                return audio_path, frames
+
+            logger.warning(f"Combined FFmpeg extraction failed: {stderr.decode(errors='replace')}")
+            return None
+
+        except Exception as e:
+            logger.warning(f"Failed to extract audio and frames: {e}")
+            return None
+
     async def process_video(
         self,
         video_path: Path,
         source_id: str,
-        frame_interval: int = 5
+        frame_interval: int = 5,
+        frame_max_width: Optional[int] = None,
     ) -> dict:
-        """Full video processing: extract audio and frames."""
+        """Full video processing: extract audio and frames (frames optionally capped at frame_max_width)."""
         logger.info(f"Processing video: {video_path}")
 
         duration_task = self.get_video_duration(video_path)
-        audio_task = self.extract_audio(video_path, source_id)
-        frames_task = self.extract_frames(video_path, source_id, frame_interval)
-
-        duration, audio_path, frame_paths = await asyncio.gather(
-            duration_task, audio_task, frames_task
+        extract_task = self.extract_audio_and_frames(
+            video_path, source_id, frame_interval, max_width=frame_max_width
         )
 
+        duration, extracted = await asyncio.gather(duration_task, extract_task)
+
+        if extracted is None:
+            # Any combined failure: extract separately so one stream can still succeed
+            audio_path, frame_paths = await asyncio.gather(
+                self.extract_audio(video_path, source_id),
+                self.extract_frames(video_path, source_id, frame_interval, max_width=frame_max_width),
+            )
+        else:
+            audio_path, frame_paths = extracted
+
         result = {
             "duration": duration,
             "audio_path": audio_path,
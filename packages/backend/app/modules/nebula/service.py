@@ -2,7 +2,9 @@
 Nebula service - Knowledge graph and concept extraction.
 """
 
+import re
 import uuid
+from collections import Counter, defaultdict
 from typing import Dict, Any, Optional, List
 import logging
 
@@ -48,13 +50,10 @@ class NebulaService:
     ) -> List[Dict[str, Any]]:
         """Extract high-frequency concepts from all video content."""
         vector_store = get_vector_store()
-        all_docs = vector_store.get_all_documents()
-
-        from collections import Counter
-        import re
 
+        # Stream the collection page by page instead of loading every document at once
         word_counts = Counter()
-        for doc in all_docs:
+        for doc in vector_store.iter_documents():
             text = doc.get("text", "")
             words = re.findall(r'\b[a-zA-Z\u4e00-\u9fff]{2,10}\b', text)
             for word in words:
@@ -74,16 +73,12 @@ class NebulaService:
         vector_store = get_vector_store()
         all_docs = []
 
-        for sid in source_ids:
-            docs = vector_store.get_source_documents(sid)
+        for docs in vector_store.get_documents_for_sources(source_ids).values():
             all_docs.extend(docs)
 
         if not all_docs:
             return {"nodes": [], "links": []}
 
-        import re
-        from collections import Counter, defaultdict
-
         entity_counter = Counter()
         entity_source_map = defaultdict(set)
 
@@ -351,16 +351,12 @@ async def debug_chromadb():
         vector_store = get_vector_store()
         total_docs = vector_store.get_collection_count()
         
-        all_docs = vector_store.get_all_documents()
-        source_ids = set()
-        for doc in all_docs:
-            if 'metadata' in doc and 'source_id' in doc['metadata']:
-                source_ids.add(doc['metadata']['source_id'])
+        source_ids = vector_store.list_source_ids()
 
         return {
             "backend": "qdrant",
             "total_documents": total_docs,
-            "unique_sources": list(source_ids),
+            "unique_sources": source_ids,
             "source_count": len(source_ids),
             "status": "ok" if total_docs > 0 else "empty"
         }
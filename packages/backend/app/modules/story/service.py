@@ -2,6 +2,7 @@
 Story service - Webtoon/Cinematic Blog generation.
 """
 
+import json
 import uuid
 import asyncio
 from pathlib import Path
@@ -126,7 +127,7 @@ class StoryService:
         docs = vector_store.get_source_documents(source_id)
         transcripts = [d for d in docs if d.get("metadata", {}).get("type") == "transcript"]
         transcripts.sort(key=lambda d: d.get("metadata", {}).get("start", 0))
-        combined = " ".join([t.get("text", "") for t in transcripts[:20]])
+        combined = " ".join(text for t in transcripts[:20] if (text := t.get("text", "")))
 
         if not combined.strip():
             return [{"type": "text", "content": "暂无转写内容，以下为关键画面摘要。"}]
@@ -140,7 +141,6 @@ class StoryService:
             return [{"type": "text", "content": combined[:200]}]
 
         try:
-            import json
             cleaned = response.strip()
             if cleaned.startswith("```"):
                 lines = cleaned.split("\n")
@@ -3,8 +3,9 @@ Perception module - AI services for video intelligence.
 Provides unified access to LLM, VLM, TTS, Image, and Embedding capabilities.
 """
 
-from .sophnet import SophNetService, get_sophnet_service
+from .sophnet import SophNetService, get_sophnet_service, close_sophnet_service
 from .asr import ASRService, get_asr_service
+from .llm_cache import LLMCache, get_llm_cache
 from .types import (
     ChatMessage,
     FrameAnalysis,
@@ -16,8 +17,11 @@ from .types import (
 __all__ = [
     "SophNetService",
     "get_sophnet_service",
+    "close_sophnet_service",
     "ASRService",
     "get_asr_service",
+    "LLMCache",
+    "get_llm_cache",
     "ChatMessage",
     "FrameAnalysis",
     "SpeechResult",
@@ -28,8 +28,11 @@ def _get_whisper_model():
         return None
     if _whisper_model is None:
         try:
-            logger.info("Loading Whisper 'base' model...")
-            _whisper_model = whisper.load_model("base")
+            import torch
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            logger.info(f"Loading Whisper 'base' model on {device}...")
+            # in_memory reads the checkpoint into memory for this one load; reuse comes from the _whisper_model singleton
+            _whisper_model = whisper.load_model("base", device=device, in_memory=True)
             logger.info("Whisper model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load Whisper model: {e}")
@@ -49,6 +52,10 @@ class ASRService:
         """Initialize ASR service."""
         pass
 
+    def warmup(self) -> bool:
+        """Load the Whisper model ahead of the first transcription."""
+        return _get_whisper_model() is not None
+
     async def transcribe_audio(self, audio_path) -> List[Dict[str, Any]]:
         """
         Transcribe audio using local Whisper model.
@@ -84,6 +91,7 @@ class ASRService:
                     language="zh",
                     task="transcribe",
                     word_timestamps=True,
+                    fp16=model.device.type == "cuda",
                 )
                 return result
 
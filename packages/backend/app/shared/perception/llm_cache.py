@@ -0,0 +1,110 @@
+"""
+LLM Response Cache - SQLite-backed cache for chat completions.
+
+Enabled with LLM_CACHE=1. Responses are keyed by a SHA-256 of the model,
+messages and sampling parameters, so repeated prompts return from disk
+instead of hitting the API. Entries older than LLM_CACHE_TTL seconds are
+treated as misses. Callers only use it for deterministic (temperature 0)
+requests.
+"""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Mapping, Optional, Sequence
+
+import aiosqlite
+
+from app.core import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class LLMCache:
+    """SQLite-backed key/value cache for LLM responses."""
+
+    def __init__(self, db_path: Path, ttl: int = 0):
+        """Initialize cache at the given database path; ttl <= 0 disables expiry."""
+        self.db_path = db_path
+        self.ttl = ttl
+        self._initialized = False
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: Sequence[Mapping[str, Any]],
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        """Build a stable cache key for a chat request."""
+        content = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    async def _ensure_table(self, db: aiosqlite.Connection) -> None:
+        """Create the cache table on first use."""
+        if self._initialized:
+            return
+        await db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, "
+            "response TEXT NOT NULL, "
+            "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+        await db.commit()
+        self._initialized = True
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None."""
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await self._ensure_table(db)
+                async with db.execute(
+                    "SELECT response FROM llm_cache WHERE key = ? "
+                    "AND (? <= 0 OR created_at >= datetime('now', ?))",
+                    (key, self.ttl, f"-{self.ttl} seconds"),
+                ) as cursor:
+                    row = await cursor.fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+
+    async def set(self, key: str, response: str) -> None:
+        """Store a response under key."""
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await self._ensure_table(db)
+                await db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response) VALUES (?, ?)",
+                    (key, response),
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+
+_llm_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Get the LLMCache singleton, or None when caching is disabled."""
+    global _llm_cache
+    if not settings.llm_cache:
+        return None
+    if _llm_cache is None:
+        db_path = settings.resolve_path(settings.llm_cache_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        _llm_cache = LLMCache(db_path, ttl=settings.llm_cache_ttl)
+        logger.info(f"LLM response cache enabled: {db_path}")
+    return _llm_cache
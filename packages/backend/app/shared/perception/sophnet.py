@@ -11,15 +11,17 @@ This service provides a unified interface to:
 
 import asyncio
 import base64
+import importlib.util
 import json
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, BinaryIO, Mapping, Sequence, Union
 
 import httpx
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, RateLimitError
 
 from app.core import get_settings
+from app.shared.perception.llm_cache import LLMCache, get_llm_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -27,6 +29,28 @@ settings = get_settings()
 SOPHNET_BASE_URL = "https://www.sophnet.com/api/open-apis/v1"
 SOPHNET_API_BASE = "https://www.sophnet.com/api/open-apis"
 
+# Max in-flight VLM requests when analyzing frames concurrently
+VLM_MAX_CONCURRENCY = 4
+# Rate-limited (429) VLM requests are retried with exponential backoff
+VLM_MAX_RETRIES = 3
+VLM_RETRY_BASE_DELAY = 1.0
+
+# 进程内共享的 HTTP 连接池, LLM/VLM/TTS/Embedding 请求复用 keep-alive 连接
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=16, max_connections=32, keepalive_expiry=90)
+HTTP_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# 固定的请求消息只构建一次; chat()/chat_stream() 接受任意只读序列, 无需每次新建 list
+_WARMUP_MESSAGES = ({"role": "user", "content": "ping"},)
+
+
+def _cache_for(temperature: float, use_cache: bool) -> Optional[LLMCache]:
+    """Return the LLM cache for a request, or None when it must not be cached."""
+    # 采样温度非 0 的回复本身不确定, 缓存会把一次随机结果固定下来
+    if not use_cache or temperature != 0:
+        return None
+    return get_llm_cache()
+
 
 class SophNetService:
     """
@@ -44,39 +68,150 @@ class SophNetService:
             logger.warning("SophNet API key not configured!")
             return
 
-        self.openai_client = AsyncOpenAI(
-            api_key=self.api_key,
-            base_url=SOPHNET_BASE_URL,
+        self.http_client = httpx.AsyncClient(
+            limits=HTTP_LIMITS,
+            timeout=HTTP_TIMEOUT,
+            http2=HTTP2_AVAILABLE,
         )
+        # 每个入口一个 AsyncOpenAI 客户端, 共用同一个连接池; LLM/VLM 请求轮询分发
+        base_urls = [u.strip() for u in settings.sophnet_base_urls.split(",") if u.strip()]
+        self.openai_clients = [
+            AsyncOpenAI(api_key=self.api_key, base_url=url, http_client=self.http_client)
+            for url in base_urls or [SOPHNET_BASE_URL]
+        ]
+        self.openai_client = self.openai_clients[0]
+        self._rr = 0
 
         self.tts_easyllm_id = settings.sophnet_tts_easyllm_id
         self.embedding_easyllm_id = settings.sophnet_embedding_easyllm_id
 
-        logger.info(f"SophNetService initialized: project={self.project_id}")
+        logger.info(
+            f"SophNetService initialized: project={self.project_id}, "
+            f"endpoints={len(self.openai_clients)}"
+        )
+
+    def _next_client(self) -> AsyncOpenAI:
+        """Pick the next OpenAI-compatible endpoint in round-robin order."""
+        i = self._rr
+        self._rr = (i + 1) % len(self.openai_clients)
+        return self.openai_clients[i]
+
+    async def warmup(self) -> bool:
+        """Open a pooled connection per endpoint with a 1-token completion (bypasses the LLM cache)."""
+        if not self.api_key:
+            return False
+        try:
+            await asyncio.gather(*(
+                client.chat.completions.create(
+                    model="DeepSeek-V3.2",
+                    messages=_WARMUP_MESSAGES,
+                    max_tokens=1,
+                )
+                for client in self.openai_clients
+            ))
+            return True
+        except Exception as e:
+            logger.warning(f"SophNet warmup failed: {e}")
+            return False
 
     async def chat(
         self,
-        messages: List[Dict[str, Any]],
+        messages: Sequence[Mapping[str, Any]],
         model: str = "DeepSeek-V3.2",
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        use_cache: bool = True,
     ) -> str:
-        """Send chat completion request to DeepSeek-V3.2."""
+        """
+        Send chat completion request to DeepSeek-V3.2.
+
+        Only deterministic (temperature 0) requests go through the LLM cache;
+        pass use_cache=False to always hit the API (e.g. connectivity probes).
+        """
         if not self.api_key:
             return "API key not configured"
 
+        cache = _cache_for(temperature, use_cache)
+        cache_key = None
+        if cache is not None:
+            cache_key = LLMCache.make_key(model, messages, temperature, max_tokens)
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
-            response = await self.openai_client.chat.completions.create(
+            response = await self._next_client().chat.completions.create(
                 model=model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
             )
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
         except Exception as e:
             logger.error(f"Chat failed: {e}")
             return f"Error: {str(e)}"
 
+        if cache is not None and content:
+            await cache.set(cache_key, content)
+        return content
+
+    async def chat_stream(
+        self,
+        messages: Sequence[Mapping[str, Any]],
+        model: str = "DeepSeek-V3.2",
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        use_cache: bool = True,
+    ) -> AsyncIterator[str]:
+        """
+        Stream chat completion tokens from DeepSeek-V3.2 as they are generated.
+
+        Shares the LLM cache with chat() under the same temperature-0 rule: a
+        cached reply is replayed as a single chunk, and a stream consumed to
+        the end is stored for next time.
+        """
+        if not self.api_key:
+            yield "API key not configured"
+            return
+
+        cache = _cache_for(temperature, use_cache)
+        cache_key = None
+        if cache is not None:
+            cache_key = LLMCache.make_key(model, messages, temperature, max_tokens)
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        try:
+            stream = await self._next_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+        except Exception as e:
+            logger.error(f"Chat stream failed: {e}")
+            yield f"Error: {str(e)}"
+            return
+
+        parts = []
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+            # Only complete replies are cached; an early aclose() never gets here
+            if cache is not None and parts:
+                await cache.set(cache_key, "".join(parts))
+        except Exception as e:
+            logger.error(f"Chat stream failed: {e}")
+            yield f"Error: {str(e)}"
+        finally:
+            # Consumers may stop early (aclose); release the connection right away
+            await stream.close()
+
     async def analyze_video_frame(
         self,
         prompt: str,
@@ -102,26 +237,36 @@ class SophNetService:
         else:
             return "Error: No image provided"
 
-        try:
-            response = await self.openai_client.chat.completions.create(
-                model=model,
-                messages=[
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
                     {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": final_image_url},
-                            },
-                        ],
-                    }
+                        "type": "image_url",
+                        "image_url": {"url": final_image_url},
+                    },
                 ],
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"VLM analysis failed: {e}")
-            return f"Error: {str(e)}"
+            }
+        ]
+
+        for attempt in range(VLM_MAX_RETRIES + 1):
+            try:
+                response = await self._next_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                )
+                return response.choices[0].message.content
+            except RateLimitError as e:
+                if attempt == VLM_MAX_RETRIES:
+                    logger.error(f"VLM analysis rate limited, giving up: {e}")
+                    return f"Error: {str(e)}"
+                delay = VLM_RETRY_BASE_DELAY * 2 ** attempt
+                logger.warning(f"VLM analysis rate limited, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                logger.error(f"VLM analysis failed: {e}")
+                return f"Error: {str(e)}"
 
     async def analyze_frames(
         self,
@@ -133,23 +278,42 @@ class SophNetService:
         if not frame_paths:
             return []
 
-        results = []
-        for i, frame_path in enumerate(frame_paths):
-            timestamp = i * frame_interval
-            description = await self.analyze_video_frame(
-                prompt=prompt, image_path=frame_path
-            )
-            results.append(
-                {"timestamp": timestamp, "description": description, "frame_path": str(frame_path)}
-            )
-
-            if i < len(frame_paths) - 1:
-                await asyncio.sleep(0.5)
-
-            if (i + 1) % 5 == 0:
-                logger.info(f"Analyzed {i + 1}/{len(frame_paths)} frames")
+        descriptions = await self.analyze_video_frames(
+            [{"prompt": prompt, "image_path": frame_path} for frame_path in frame_paths]
+        )
+        return [
+            {"timestamp": i * frame_interval, "description": description, "frame_path": str(frame_path)}
+            for i, (frame_path, description) in enumerate(zip(frame_paths, descriptions))
+        ]
 
-        return results
+    async def analyze_video_frames(
+        self,
+        items: List[Dict[str, Any]],
+        max_concurrency: int = VLM_MAX_CONCURRENCY,
+    ) -> List[str]:
+        """
+        Analyze many frames concurrently.
+
+        Args:
+            items: keyword arguments for analyze_video_frame, one dict per frame
+            max_concurrency: max in-flight VLM requests
+
+        Returns:
+            Descriptions in the same order as items
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        done = 0
+
+        async def analyze_one(item: Dict[str, Any]) -> str:
+            nonlocal done
+            async with semaphore:
+                description = await self.analyze_video_frame(**item)
+            done += 1
+            if done % 5 == 0:
+                logger.info(f"Analyzed {done}/{len(items)} frames")
+            return description
+
+        return await asyncio.gather(*(analyze_one(item) for item in items))
 
     async def generate_speech(
         self,
@@ -187,33 +351,35 @@ class SophNetService:
 
         audio_data = bytearray()
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            async with client.stream("POST", url, headers=headers, json=payload) as response:
-                if response.status_code != 200:
-                    error_content = await response.aread()
-                    error_text = error_content.decode('utf-8', errors='replace')
-                    raise Exception(f"TTS request failed ({response.status_code}): {error_text}")
-
-                async for line in response.aiter_lines():
-                    if line and line.startswith("data:"):
-                        try:
-                            data = json.loads(line[5:])
-                            frame = data.get("audioFrame")
-                            if frame:
-                                audio_data.extend(base64.b64decode(frame))
-                        except json.JSONDecodeError:
-                            continue
+        async with self.http_client.stream("POST", url, headers=headers, json=payload) as response:
+            if response.status_code != 200:
+                error_content = await response.aread()
+                error_text = error_content.decode('utf-8', errors='replace')
+                raise Exception(f"TTS request failed ({response.status_code}): {error_text}")
+
+            async for line in response.aiter_lines():
+                if line and line.startswith("data:"):
+                    try:
+                        data = json.loads(line[5:])
+                        frame = data.get("audioFrame")
+                        if frame:
+                            audio_data.extend(base64.b64decode(frame))
+                    except json.JSONDecodeError:
+                        continue
 
         return bytes(audio_data)
 
     async def generate_speech_to_file(
         self,
         text: str,
-        output_path: Path,
+        output_path: Union[Path, BinaryIO],
         voice: str = "longxiaochun",
-    ) -> Path:
-        """Generate speech and save to file."""
+    ) -> Union[Path, BinaryIO]:
+        """Generate speech and save to a file path, or write it into a binary file-like object."""
         audio_data = await self.generate_speech(text, voice=voice)
+        if not isinstance(output_path, Path):
+            output_path.write(audio_data)
+            return output_path
         output_path.parent.mkdir(parents=True, exist_ok=True)
         with open(output_path, "wb") as f:
             f.write(audio_data)
@@ -227,8 +393,12 @@ class SophNetService:
         model: str = "qwen-image",
         max_polls: int = 30,
         poll_interval: float = 2.0,
+        download: bool = True,
     ) -> str:
-        """Generate image using Qwen-Image with async polling."""
+        """Generate image using Qwen-Image with async polling.
+
+        Returns the local file path, or the remote image URL when ``download`` is False.
+        """
         if not self.api_key:
             raise ValueError("API key not configured")
 
@@ -305,6 +475,9 @@ class SophNetService:
             if not image_url:
                 raise ValueError(f"No image URL in successful response: {output}")
 
+            if not download:
+                return image_url
+
             download_resp = requests.get(image_url, timeout=60.0)
             if download_resp.status_code != 200:
                 raise Exception(f"Failed to download image: {image_url}")
@@ -342,62 +515,61 @@ class SophNetService:
             "dimensions": dimensions,
         }
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
-
-            if response.status_code != 200:
-                error_text = response.text
-                logger.error(f"Embedding request failed ({response.status_code}): {error_text}")
-                raise Exception(f"Embedding request failed: {error_text}")
-
-            result = response.json()
-            embedding = None
-
-            if "data" in result:
-                data = result["data"]
-                if isinstance(data, dict) and "embedding" in data:
-                    embedding = data["embedding"]
-                elif isinstance(data, list) and len(data) > 0:
-                    first_item = data[0]
-                    if isinstance(first_item, dict) and "embedding" in first_item:
-                        embedding = first_item["embedding"]
-                    elif isinstance(first_item, list):
-                        embedding = first_item
-                    else:
-                        embedding = data[0]
-                elif isinstance(data, list):
+        response = await self.http_client.post(url, headers=headers, json=payload, timeout=60.0)
+
+        if response.status_code != 200:
+            error_text = response.text
+            logger.error(f"Embedding request failed ({response.status_code}): {error_text}")
+            raise Exception(f"Embedding request failed: {error_text}")
+
+        result = response.json()
+        embedding = None
+
+        if "data" in result:
+            data = result["data"]
+            if isinstance(data, dict) and "embedding" in data:
+                embedding = data["embedding"]
+            elif isinstance(data, list) and len(data) > 0:
+                first_item = data[0]
+                if isinstance(first_item, dict) and "embedding" in first_item:
+                    embedding = first_item["embedding"]
+                elif isinstance(first_item, list):
+                    embedding = first_item
+                else:
                     embedding = data[0]
+            elif isinstance(data, list):
+                embedding = data[0]
 
-            if embedding is None and "embeddings" in result:
-                embeddings = result["embeddings"]
-                if isinstance(embeddings, list) and len(embeddings) > 0:
-                    embedding = embeddings[0]
+        if embedding is None and "embeddings" in result:
+            embeddings = result["embeddings"]
+            if isinstance(embeddings, list) and len(embeddings) > 0:
+                embedding = embeddings[0]
 
-            if embedding is None and "embedding" in result:
-                embedding = result["embedding"]
+        if embedding is None and "embedding" in result:
+            embedding = result["embedding"]
 
-            if embedding is None and "output" in result:
-                output = result["output"]
-                if isinstance(output, list) and len(output) > 0:
-                    embedding = output[0]
-                elif isinstance(output, dict) and "embedding" in output:
-                    embedding = output["embedding"]
+        if embedding is None and "output" in result:
+            output = result["output"]
+            if isinstance(output, list) and len(output) > 0:
+                embedding = output[0]
+            elif isinstance(output, dict) and "embedding" in output:
+                embedding = output["embedding"]
 
-            if embedding is None and "result" in result:
-                result_data = result["result"]
-                if isinstance(result_data, list) and len(result_data) > 0:
-                    embedding = result_data[0]
-                elif isinstance(result_data, dict) and "embedding" in result_data:
-                    embedding = result_data["embedding"]
+        if embedding is None and "result" in result:
+            result_data = result["result"]
+            if isinstance(result_data, list) and len(result_data) > 0:
+                embedding = result_data[0]
+            elif isinstance(result_data, dict) and "embedding" in result_data:
+                embedding = result_data["embedding"]
 
-            if embedding is None:
-                raise ValueError(f"Unexpected response format, cannot find embedding: {result}")
+        if embedding is None:
+            raise ValueError(f"Unexpected response format, cannot find embedding: {result}")
 
-            if not isinstance(embedding, list):
-                raise ValueError(f"Embedding is not a list: {type(embedding)}, value: {embedding}")
+        if not isinstance(embedding, list):
+            raise ValueError(f"Embedding is not a list: {type(embedding)}, value: {embedding}")
 
-            logger.info(f"Generated embedding with {len(embedding)} dimensions")
-            return embedding
+        logger.info(f"Generated embedding with {len(embedding)} dimensions")
+        return embedding
 
     async def get_embeddings_batch(
         self, texts: List[str], dimensions: int = 1024
@@ -419,43 +591,47 @@ class SophNetService:
             "dimensions": dimensions,
         }
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
-
-            if response.status_code != 200:
-                error_text = response.text
-                logger.error(f"Embedding batch request failed ({response.status_code}): {error_text}")
-                raise Exception(f"Embedding batch request failed: {error_text}")
-
-            result = response.json()
-            embeddings = None
-
-            if "data" in result:
-                data = result["data"]
-                if isinstance(data, list):
-                    if len(data) > 0 and isinstance(data[0], dict) and "embedding" in data[0]:
-                        embeddings = [item["embedding"] for item in data]
-                    else:
-                        embeddings = data
-                elif isinstance(data, dict) and "embedding" in data:
-                    embeddings = [data["embedding"]]
-                elif isinstance(data, dict) and "embeddings" in data:
-                    embeddings = data["embeddings"]
-            elif "embeddings" in result:
-                embeddings = result["embeddings"]
-            elif "output" in result:
-                embeddings = result["output"]
-            elif "result" in result:
-                embeddings = result["result"]
-
-            if embeddings is None:
-                raise ValueError(f"Unexpected response format: {result}")
-
-            if not isinstance(embeddings, list):
-                raise ValueError(f"Embeddings is not a list: {type(embeddings)}")
-
-            logger.info(f"Generated {len(embeddings)} embeddings")
-            return embeddings
+        response = await self.http_client.post(url, headers=headers, json=payload, timeout=60.0)
+
+        if response.status_code != 200:
+            error_text = response.text
+            logger.error(f"Embedding batch request failed ({response.status_code}): {error_text}")
+            raise Exception(f"Embedding batch request failed: {error_text}")
+
+        result = response.json()
+        embeddings = None
+
+        if "data" in result:
+            data = result["data"]
+            if isinstance(data, list):
+                if len(data) > 0 and isinstance(data[0], dict) and "embedding" in data[0]:
+                    embeddings = [item["embedding"] for item in data]
+                else:
+                    embeddings = data
+            elif isinstance(data, dict) and "embedding" in data:
+                embeddings = [data["embedding"]]
+            elif isinstance(data, dict) and "embeddings" in data:
+                embeddings = data["embeddings"]
+        elif "embeddings" in result:
+            embeddings = result["embeddings"]
+        elif "output" in result:
+            embeddings = result["output"]
+        elif "result" in result:
+            embeddings = result["result"]
+
+        if embeddings is None:
+            raise ValueError(f"Unexpected response format: {result}")
+
+        if not isinstance(embeddings, list):
+            raise ValueError(f"Embeddings is not a list: {type(embeddings)}")
+
+        logger.info(f"Generated {len(embeddings)} embeddings")
+        return embeddings
+
+    async def aclose(self):
+        """Close the shared HTTP connection pool."""
+        if getattr(self, "http_client", None) is not None:
+            await self.http_client.aclose()
 
 
 _sophnet_service: Optional[SophNetService] = None
@@ -467,3 +643,11 @@ def get_sophnet_service() -> SophNetService:
     if _sophnet_service is None:
         _sophnet_service = SophNetService()
     return _sophnet_service
+
+
+async def close_sophnet_service():
+    """Close the SophNetService singleton's connection pool (application shutdown)."""
+    global _sophnet_service
+    if _sophnet_service is not None:
+        await _sophnet_service.aclose()
+        _sophnet_service = None
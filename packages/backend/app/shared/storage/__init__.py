@@ -2,10 +2,11 @@
 Storage module - Vector store and data persistence.
 """
 
-from .vector_store import VectorStore, get_vector_store, reset_vector_store
+from .vector_store import VectorStore, get_vector_store, reset_vector_store, isolated_vector_store
 
 __all__ = [
     "VectorStore",
     "get_vector_store",
     "reset_vector_store",
+    "isolated_vector_store",
 ]
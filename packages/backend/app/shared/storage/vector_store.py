@@ -4,8 +4,12 @@ Migrated from ChromaDB to Qdrant for better cross-platform compatibility.
 """
 
 import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Sequence, Iterator
 from dataclasses import dataclass
 import logging
 import uuid
@@ -15,7 +19,6 @@ from qdrant_client.http import models
 from qdrant_client.http.models import (
     Distance,
     VectorParams,
-    PointStruct,
     KeywordIndexParams,
     KeywordIndexType,
 )
@@ -28,6 +31,25 @@ settings = get_settings()
 
 COLLECTION_NAME = "video_knowledge"
 VECTOR_SIZE = 384  # MiniLM embedding size
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+PAYLOAD_INDEX_FIELDS = ("source_id", "type")
+# Upper bound on distinct source_ids returned by one facet query
+SOURCE_FACET_LIMIT = 10000
+# Page size for keyset-paginated scrolls over the collection
+SCROLL_BATCH_SIZE = 1024
+
+# Scalar (int8) quantization: compact vectors kept in RAM, rescored with full vectors.
+# 1-bit binary codes lose too much recall at VECTOR_SIZE=384.
+QUANTIZATION_CONFIG = models.ScalarQuantization(
+    scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, always_ram=True),
+)
+SEARCH_PARAMS = models.SearchParams(
+    quantization=models.QuantizationSearchParams(
+        ignore=False,
+        rescore=True,
+        oversampling=2.0,
+    ),
+)
 
 
 @dataclass
@@ -55,9 +77,15 @@ class VectorStore:
         host: str = None,
         port: int = None,
         prefer_grpc: bool = False,
-        persist_dir: Optional[str] = None
+        persist_dir: Optional[str] = None,
+        in_memory: bool = False,
+        embedding_model: Optional[SentenceTransformer] = None
     ):
-        """Initialize Qdrant client."""
+        """Initialize Qdrant client.
+
+        in_memory=True uses an embedded ":memory:" Qdrant (no server, no disk I/O);
+        embedding_model lets such a store share an already loaded model.
+        """
         config = get_settings()
         host = host or getattr(config, 'vector_store_host', 'localhost')
         port = port or getattr(config, 'vector_store_port', 6333)
@@ -68,18 +96,28 @@ class VectorStore:
         self.vector_size = VECTOR_SIZE
 
         # Initialize Qdrant client
-        if prefer_grpc:
+        if in_memory:
+            self.client = QdrantClient(location=":memory:")
+        elif prefer_grpc:
             self.client = QdrantClient(host=host, port=port, grpc_port=port + 1)
         else:
             self.client = QdrantClient(host=host, port=port)
 
         # Initialize embedding function
-        self._init_embedding_function()
+        if embedding_model is not None:
+            self.embedding_model = embedding_model
+        else:
+            self._init_embedding_function()
+        # Optional override installed via set_embedder() (e.g. a fake embedder in tests)
+        self._embedder: Optional[Callable[[List[str]], Sequence[Sequence[float]]]] = None
+        # Repeated queries skip the embedding model entirely
+        self._embed_query = lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)(self._embed_query_uncached)
 
         # Ensure collection exists
         self._ensure_collection()
 
-        logger.info(f"VectorStore initialized: {host}:{port}/{self.collection_name}")
+        location = ":memory:" if in_memory else f"{host}:{port}"
+        logger.info(f"VectorStore initialized: {location}/{self.collection_name}")
 
     def _init_embedding_function(self):
         """Initialize sentence transformer embedding function."""
@@ -96,12 +134,9 @@ class VectorStore:
                 self.embedding_model = None
 
     def _ensure_collection(self):
-        """Create collection if it doesn't exist."""
+        """Create collection if it doesn't exist, and make sure payload indexes exist."""
         try:
-            collections = self.client.get_collections()
-            collection_names = [c.name for c in collections.collections]
-
-            if self.collection_name not in collection_names:
+            if not self.client.collection_exists(self.collection_name):
                 # Create collection with HNSW index
                 self.client.create_collection(
                     collection_name=self.collection_name,
@@ -109,37 +144,76 @@ class VectorStore:
                         size=self.vector_size,
                         distance=Distance.COSINE,
                     ),
+                    quantization_config=QUANTIZATION_CONFIG,
                 )
                 logger.info(f"Created collection: {self.collection_name}")
+                existing_indexes = set()
+            else:
+                collection_info = self.client.get_collection(self.collection_name)
+                existing_indexes = set(collection_info.payload_schema or {})
 
-                # Create payload indexes for filtering using correct API
-                self.client.create_payload_index(
-                    collection_name=self.collection_name,
-                    field_name="source_id",
-                    field_schema=KeywordIndexParams(
-                        type=KeywordIndexType.KEYWORD,
-                    ),
-                )
+            # Keyword indexes let source_id/type filters skip a full segment scan
+            for field_name in PAYLOAD_INDEX_FIELDS:
+                if field_name in existing_indexes:
+                    continue
                 self.client.create_payload_index(
                     collection_name=self.collection_name,
-                    field_name="type",
+                    field_name=field_name,
                     field_schema=KeywordIndexParams(
                         type=KeywordIndexType.KEYWORD,
                     ),
                 )
-                logger.info("Created payload indexes")
+                logger.info(f"Created payload index: {field_name}")
 
         except Exception as e:
             logger.error(f"Failed to ensure collection: {e}")
             raise
 
+    def warmup(self) -> bool:
+        """Run one embedding so model weights and tokenizer are loaded before real traffic."""
+        if self.embedding_model is None and self._embedder is None:
+            return False
+        self._embed_texts(["warmup"])
+        return True
+
+    def set_embedder(
+        self,
+        fn: Optional[Callable[[List[str]], Sequence[Sequence[float]]]],
+    ):
+        """
+        Replace the embedding model with ``fn`` (texts -> vectors of VECTOR_SIZE).
+
+        Pass None to restore the sentence transformer. Cached query embeddings
+        are dropped so they are never mixed across embedders.
+        """
+        self._embedder = fn
+        self._embed_query.cache_clear()
+
     def _embed_text(self, text: str) -> List[float]:
         """Generate embedding for text."""
+        if self._embedder is not None:
+            return self._embed_texts([text])[0]
         if self.embedding_model:
             return self.embedding_model.encode(text).tolist()
         # Fallback: return zero vector
         return [0.0] * self.vector_size
 
+    def _embed_query_uncached(self, text: str) -> tuple:
+        """Embed a search query; returns a tuple so results can be memoized."""
+        return tuple(self._embed_text(text))
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a search query, reusing the cached vector for repeated queries."""
+        return list(self._embed_query(query))
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for multiple texts in one batched model call."""
+        if self._embedder is not None:
+            return [[float(x) for x in vector] for vector in self._embedder(texts)]
+        if self.embedding_model:
+            return self.embedding_model.encode(texts, batch_size=64).tolist()
+        return [[0.0] * self.vector_size for _ in texts]
+
     def _chunk_text(self, text: str, max_length: int = 500) -> List[str]:
         """Split text into smaller chunks."""
         if len(text) <= max_length:
@@ -185,8 +259,9 @@ class VectorStore:
         Returns:
             Number of documents added
         """
-        points = []
-        doc_count = 0
+        ids: List[str] = []
+        texts: List[str] = []
+        payloads: List[Dict[str, Any]] = []
 
         # Process transcripts
         for segment in transcripts:
@@ -196,24 +271,16 @@ class VectorStore:
 
             chunks = self._chunk_text(text)
             for chunk in chunks:
-                point_id = str(uuid.uuid4())
-                vector = self._embed_text(chunk)
-
-                payload = {
+                ids.append(str(uuid.uuid4()))
+                texts.append(chunk)
+                payloads.append({
                     "source_id": source_id,
                     "type": "transcript",
                     "start": segment.get("start", 0),
                     "end": segment.get("end", 0),
                     "video_title": video_title,
                     "text": chunk,
-                }
-
-                points.append(PointStruct(
-                    id=point_id,
-                    vector=vector,
-                    payload=payload
-                ))
-                doc_count += 1
+                })
 
         # Process visual descriptions
         for desc in visual_descriptions:
@@ -221,11 +288,10 @@ class VectorStore:
             if not text or text.startswith("Error:") or text.startswith("Analysis failed"):
                 continue
 
-            point_id = str(uuid.uuid4())
-            vector = self._embed_text(text)
             timestamp = desc.get("timestamp", 0)
-
-            payload = {
+            ids.append(str(uuid.uuid4()))
+            texts.append(text)
+            payloads.append({
                 "source_id": source_id,
                 "type": "visual",
                 "start": timestamp,
@@ -233,54 +299,56 @@ class VectorStore:
                 "video_title": video_title,
                 "text": text,
                 "frame_path": desc.get("frame_path", ""),
-            }
+            })
 
-            points.append(PointStruct(
-                id=point_id,
-                vector=vector,
-                payload=payload
-            ))
-            doc_count += 1
+        return self.add_documents(source_id, ids, texts, payloads)
 
-        # Upload points in batches
-        if points:
-            try:
-                self.client.upload_points(
-                    collection_name=self.collection_name,
-                    points=points,
-                    batch_size=100,
-                )
-                logger.info(f"Added {doc_count} documents for source {source_id}")
-            except Exception as e:
-                logger.error(f"Failed to add documents: {e}")
-                return 0
-
-        return doc_count
-
-    def search(
+    def add_documents(
         self,
-        query: str,
-        source_ids: Optional[List[str]] = None,
-        n_results: int = 10,
-        doc_type: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
+        source_id: str,
+        ids: List[str],
+        texts: List[str],
+        payloads: List[Dict[str, Any]],
+    ) -> int:
         """
-        Search for relevant video segments.
+        Upsert prepared documents in a single request.
 
         Args:
-            query: Search query
-            source_ids: Filter by source IDs
-            n_results: Number of results to return
-            doc_type: Filter by document type (transcript/visual)
+            source_id: Source video ID (for logging)
+            ids: Point IDs
+            texts: Document texts, embedded in one batched call
+            payloads: Point payloads
 
         Returns:
-            List of search results with text, metadata, and score
+            Number of documents added
         """
-        logger.info(f"[VectorStore] Search: query='{query}', source_ids={source_ids}, n_results={n_results}, type={doc_type}")
+        if not ids:
+            return 0
 
-        query_vector = self._embed_text(query)
+        vectors = self._embed_texts(texts)
 
-        # Build filter
+        try:
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=models.Batch(
+                    ids=ids,
+                    vectors=vectors,
+                    payloads=payloads,
+                ),
+            )
+            logger.info(f"Added {len(ids)} documents for source {source_id}")
+        except Exception as e:
+            logger.error(f"Failed to add documents: {e}")
+            return 0
+
+        return len(ids)
+
+    def _build_filter(
+        self,
+        source_ids: Optional[List[str]] = None,
+        doc_type: Optional[str] = None
+    ) -> Optional[models.Filter]:
+        """Build a payload filter for source IDs and document type."""
         must_conditions = []
         if source_ids:
             must_conditions.append(
@@ -297,11 +365,49 @@ class VectorStore:
                 )
             )
 
-        filter_obj = None
-        if must_conditions:
-            filter_obj = models.Filter(
-                must=must_conditions
-            )
+        if not must_conditions:
+            return None
+        return models.Filter(must=must_conditions)
+
+    def _format_hit(self, hit) -> Dict[str, Any]:
+        """Convert a scored point into a search result dict."""
+        return {
+            "text": hit.payload.get("text", ""),
+            "metadata": {
+                "source_id": hit.payload.get("source_id", ""),
+                "type": hit.payload.get("type", ""),
+                "start": hit.payload.get("start", 0),
+                "end": hit.payload.get("end", 0),
+                "video_title": hit.payload.get("video_title", ""),
+                "frame_path": hit.payload.get("frame_path", ""),
+            },
+            "distance": hit.score if hasattr(hit, 'score') else 0.0,
+        }
+
+    def search(
+        self,
+        query: str,
+        source_ids: Optional[List[str]] = None,
+        n_results: int = 10,
+        doc_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for relevant video segments.
+
+        Args:
+            query: Search query
+            source_ids: Filter by source IDs
+            n_results: Number of results to return
+            doc_type: Filter by document type (transcript/visual)
+
+        Returns:
+            List of search results with text, metadata, and score
+        """
+        logger.info(f"[VectorStore] Search: query='{query}', source_ids={source_ids}, n_results={n_results}, type={doc_type}")
+
+        query_vector = self.embed_query(query)
+
+        filter_obj = self._build_filter(source_ids, doc_type)
 
         try:
             if hasattr(self.client, "query_points"):
@@ -311,6 +417,7 @@ class VectorStore:
                     "limit": n_results,
                     "with_payload": True,
                     "with_vectors": False,
+                    "search_params": SEARCH_PARAMS,
                 }
                 if filter_obj:
                     query_kwargs["query_filter"] = filter_obj
@@ -323,6 +430,7 @@ class VectorStore:
                     "limit": n_results,
                     "with_payload": True,
                     "with_vectors": False,
+                    "search_params": SEARCH_PARAMS,
                 }
                 if filter_obj:
                     search_kwargs["query_filter"] = filter_obj
@@ -335,36 +443,9 @@ class VectorStore:
                     raise AttributeError("QdrantClient has no search method")
 
             if not points:
-                fallback_docs = []
-                if source_ids:
-                    for sid in source_ids:
-                        fallback_docs.extend(self.get_source_documents(sid))
-                else:
-                    fallback_docs = self.get_all_documents()
-                fallback_docs = fallback_docs[:n_results]
-                return [
-                    {
-                        "text": d.get("text", ""),
-                        "metadata": d.get("metadata", {}),
-                        "distance": 0.0,
-                    }
-                    for d in fallback_docs
-                ]
-
-            formatted_results = []
-            for hit in points:
-                formatted_results.append({
-                    "text": hit.payload.get("text", ""),
-                    "metadata": {
-                        "source_id": hit.payload.get("source_id", ""),
-                        "type": hit.payload.get("type", ""),
-                        "start": hit.payload.get("start", 0),
-                        "end": hit.payload.get("end", 0),
-                        "video_title": hit.payload.get("video_title", ""),
-                        "frame_path": hit.payload.get("frame_path", ""),
-                    },
-                    "distance": hit.score if hasattr(hit, 'score') else 0.0,
-                })
+                return self._fallback_results(source_ids, n_results)
+
+            formatted_results = [self._format_hit(hit) for hit in points]
 
             if formatted_results:
                 logger.info(f"Search returned {len(formatted_results)} results")
@@ -378,29 +459,154 @@ class VectorStore:
             logger.error(f"Search failed: {e}")
             return []
 
-    def get_all_documents(self) -> List[Dict[str, Any]]:
-        """Get all documents from the vector store."""
+    def search_batch(
+        self,
+        queries: List[str],
+        source_ids: Optional[List[str]] = None,
+        n_results: int = 10,
+        doc_type: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for multiple queries in a single Qdrant request.
+
+        Args:
+            queries: Search queries
+            source_ids: Filter by source IDs (applied to every query)
+            n_results: Number of results to return per query
+            doc_type: Filter by document type (transcript/visual)
+
+        Returns:
+            One result list per query, in the same order as queries
+        """
+        if not queries:
+            return []
+
+        if not hasattr(self.client, "query_batch_points"):
+            return [
+                self.search(q, source_ids=source_ids, n_results=n_results, doc_type=doc_type)
+                for q in queries
+            ]
+
+        filter_obj = self._build_filter(source_ids, doc_type)
+        requests = [
+            models.QueryRequest(
+                query=vector,
+                filter=filter_obj,
+                params=SEARCH_PARAMS,
+                limit=n_results,
+                with_payload=True,
+                with_vector=False,
+            )
+            for vector in self._embed_texts(queries)
+        ]
+
         try:
-            results = self.client.scroll(
+            responses = self.client.query_batch_points(
                 collection_name=self.collection_name,
-                limit=10000,
+                requests=requests,
+            )
+            logger.info(f"Batch search returned results for {len(responses)} queries")
+        except Exception as e:
+            # e.g. a server without the batch query endpoint: answer each query via search()
+            logger.error(f"Batch search failed ({e}), falling back to per-query search")
+            return [
+                self.search(q, source_ids=source_ids, n_results=n_results, doc_type=doc_type)
+                for q in queries
+            ]
+
+        # Same empty-result fallback as search()
+        return [
+            [self._format_hit(hit) for hit in r.points] or self._fallback_results(source_ids, n_results)
+            for r in responses
+        ]
+
+    def _fallback_results(
+        self,
+        source_ids: Optional[List[str]],
+        n_results: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the first n_results documents of the given sources (or of the
+        whole collection) when a vector search finds nothing.
+
+        Only the needed documents are scrolled, never the full collection.
+        """
+        try:
+            if source_ids:
+                docs: List[Dict[str, Any]] = []
+                for sid in source_ids:
+                    remaining = n_results - len(docs)
+                    if remaining <= 0:
+                        break
+                    docs.extend(islice(
+                        self.iter_documents(
+                            batch_size=min(remaining, SCROLL_BATCH_SIZE),
+                            scroll_filter=self._build_filter([sid]),
+                        ),
+                        remaining,
+                    ))
+            else:
+                docs = list(islice(
+                    self.iter_documents(batch_size=max(1, min(n_results, SCROLL_BATCH_SIZE))),
+                    n_results,
+                ))
+        except Exception as e:
+            logger.error(f"Search fallback failed: {e}")
+            return []
+
+        return [
+            {"text": d["text"], "metadata": d["metadata"], "distance": 0.0}
+            for d in docs
+        ]
+
+    def _iter_points(
+        self,
+        scroll_filter: Optional[models.Filter] = None,
+        batch_size: int = SCROLL_BATCH_SIZE,
+    ) -> Iterator[Any]:
+        """Scroll the collection page by page, following next_page_offset."""
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=batch_size,
+                offset=offset,
                 with_payload=True,
                 with_vectors=False,
             )
+            yield from points
+            if offset is None:
+                break
 
-            documents = []
-            for point in results[0]:
-                documents.append({
-                    "text": point.payload.get("text", ""),
-                    "metadata": {
-                        "source_id": point.payload.get("source_id", ""),
-                        "type": point.payload.get("type", ""),
-                        "start": point.payload.get("start", 0),
-                        "end": point.payload.get("end", 0),
-                        "video_title": point.payload.get("video_title", ""),
-                    },
-                })
+    @staticmethod
+    def _point_to_document(point) -> Dict[str, Any]:
+        """Convert a scrolled point into a document dict."""
+        return {
+            "text": point.payload.get("text", ""),
+            "metadata": {
+                "source_id": point.payload.get("source_id", ""),
+                "type": point.payload.get("type", ""),
+                "start": point.payload.get("start", 0),
+                "end": point.payload.get("end", 0),
+                "video_title": point.payload.get("video_title", ""),
+                "frame_path": point.payload.get("frame_path", ""),
+            },
+        }
+
+    def iter_documents(
+        self,
+        batch_size: int = SCROLL_BATCH_SIZE,
+        scroll_filter: Optional[models.Filter] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream documents (optionally filtered) without materializing the whole collection."""
+        for point in self._iter_points(scroll_filter=scroll_filter, batch_size=batch_size):
+            yield self._point_to_document(point)
 
+    def get_all_documents(self) -> List[Dict[str, Any]]:
+        """Get all documents from the vector store."""
+        try:
+            documents = list(self.iter_documents())
             logger.info(f"Retrieved {len(documents)} total documents")
             return documents
 
@@ -408,57 +614,81 @@ class VectorStore:
             logger.error(f"Failed to get all documents: {e}")
             return []
 
+    def list_source_ids(self) -> List[str]:
+        """
+        Get the distinct source_ids in the collection.
+
+        Uses a facet query on the source_id payload index instead of pulling
+        every document.
+        """
+        try:
+            response = self.client.facet(
+                collection_name=self.collection_name,
+                key="source_id",
+                limit=SOURCE_FACET_LIMIT,
+            )
+            source_ids = [str(hit.value) for hit in response.hits if hit.value]
+        except Exception as e:
+            logger.warning(f"Facet query failed ({e}), falling back to scroll")
+            source_ids = list(dict.fromkeys(
+                doc["metadata"]["source_id"]
+                for doc in self.get_all_documents()
+                if doc["metadata"]["source_id"]
+            ))
+
+        return source_ids
+
     def get_source_documents(self, source_id: str) -> List[Dict[str, Any]]:
         """Get all documents for a specific source."""
+        return self.get_documents_for_sources([source_id])[source_id]
+
+    def get_documents_for_sources(self, source_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get all documents for several sources with one filtered scroll.
+
+        Returns {source_id: documents} in the order of source_ids; sources
+        without documents map to an empty list.
+        """
+        result: Dict[str, List[Dict[str, Any]]] = {sid: [] for sid in source_ids}
+        if not source_ids:
+            return result
         try:
-            results = self.client.scroll(
-                collection_name=self.collection_name,
+            points = self._iter_points(
                 scroll_filter=models.Filter(
                     must=[
                         models.FieldCondition(
                             key="source_id",
-                            match=models.MatchValue(value=source_id),
+                            match=models.MatchAny(any=list(result)),
                         )
                     ]
                 ),
-                limit=10000,
-                with_payload=True,
-                with_vectors=False,
             )
 
-            documents = []
-            for point in results[0]:
-                documents.append({
-                    "text": point.payload.get("text", ""),
-                    "metadata": {
-                        "source_id": point.payload.get("source_id", ""),
-                        "type": point.payload.get("type", ""),
-                        "start": point.payload.get("start", 0),
-                        "end": point.payload.get("end", 0),
-                        "video_title": point.payload.get("video_title", ""),
-                        "frame_path": point.payload.get("frame_path", ""),
-                    },
-                })
+            for point in points:
+                doc = self._point_to_document(point)
+                result[doc["metadata"]["source_id"]].append(doc)
 
-            return documents
+            return result
 
         except Exception as e:
             logger.error(f"Failed to get source documents: {e}")
-            return []
+            return {sid: [] for sid in source_ids}
 
     def delete_source(self, source_id: str) -> bool:
         """Delete all documents for a source."""
         try:
-            # Delete by filter
+            # Server-side delete by filter: one request, resolved via the source_id index
             self.client.delete(
                 collection_name=self.collection_name,
-                points_selector=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="source_id",
-                            match=models.MatchValue(value=source_id),
-                        )
-                    ]
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(
+                        must=[
+                            models.FieldCondition(
+                                key="source_id",
+                                match=models.MatchValue(value=source_id),
+                            )
+                        ]
+                    )
                 ),
             )
             logger.info(f"Deleted documents for source {source_id}")
@@ -484,6 +714,7 @@ class VectorStore:
             "collection_name": self.collection_name,
             "host": self.host,
             "port": self.port,
+            "query_embedding_cache": self._embed_query.cache_info()._asdict(),
         }
 
     def clear_collection(self) -> bool:
@@ -500,10 +731,18 @@ class VectorStore:
 
 # Singleton instance
 _vector_store: Optional[VectorStore] = None
+# Per-context override installed by isolated_vector_store(); ContextVar keeps
+# concurrent asyncio tasks from seeing each other's store
+_vector_store_override: ContextVar[Optional[VectorStore]] = ContextVar(
+    "vector_store_override", default=None
+)
 
 
 def get_vector_store() -> VectorStore:
     """Get or create VectorStore singleton."""
+    override = _vector_store_override.get()
+    if override is not None:
+        return override
     global _vector_store
     if _vector_store is None:
         _vector_store = VectorStore()
@@ -519,3 +758,23 @@ def reset_vector_store():
         except Exception:
             pass
     _vector_store = None
+
+
+@contextmanager
+def isolated_vector_store() -> Iterator[VectorStore]:
+    """
+    Route get_vector_store() to a fresh in-memory store for the current context
+    (useful for testing). The singleton is left untouched and its embedding
+    model, if already loaded, is shared instead of loaded again.
+    """
+    shared_model = _vector_store.embedding_model if _vector_store is not None else None
+    store = VectorStore(in_memory=True, embedding_model=shared_model)
+    token = _vector_store_override.set(store)
+    try:
+        yield store
+    finally:
+        _vector_store_override.reset(token)
+        try:
+            store.client.close()
+        except Exception:
+            pass
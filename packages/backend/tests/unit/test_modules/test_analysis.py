@@ -0,0 +1,61 @@
+"""
+Unit tests for Modules - Analysis Service (one-pager coalescing)
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock
+
+pytest.importorskip("sentence_transformers")
+
+import app.modules.analysis.service as analysis_service_module
+from app.modules.analysis.service import AnalysisService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """Create an AnalysisService whose one-pager generation is a slow stub."""
+    monkeypatch.setattr(analysis_service_module, "get_sophnet_service", MagicMock)
+    service = AnalysisService()
+    calls = []
+
+    async def compute(source_ids, cache_key):
+        calls.append(source_ids)
+        await asyncio.sleep(0.05)
+        return {"headline": "report", "source_ids": source_ids}
+
+    service._compute_one_pager = compute
+    service.calls = calls
+    return service
+
+
+class TestOnePagerCoalescing:
+    """Tests for concurrent AnalysisService.generate_one_pager calls."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_generation(self, service):
+        """Test that concurrent callers for the same sources share one generation."""
+        first, second = await asyncio.gather(
+            service.generate_one_pager(["a", "b"]),
+            service.generate_one_pager(["b", "a"]),
+        )
+
+        assert first == second
+        assert len(service.calls) == 1
+        assert service._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_cancel_followers(self, service):
+        """Test that cancelling the first caller still lets the second get a result."""
+        leader = asyncio.create_task(service.generate_one_pager(["a"]))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(service.generate_one_pager(["a"]))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        assert await follower == {"headline": "report", "source_ids": ["a"]}
+        assert len(service.calls) == 1
@@ -0,0 +1,124 @@
+"""
+Unit tests for Modules - Chat Service (context bridge)
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+pytest.importorskip("sentence_transformers")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.modules.chat.service as chat_service_module
+from app.modules.chat.api import router
+from app.modules.chat.service import ChatService, get_chat_service
+
+
+DOCS = [
+    {"text": "开场介绍", "metadata": {"start": 0}},
+    {"text": "第一部分内容", "metadata": {"start": 30}},
+    {"text": "第二部分内容", "metadata": {"start": 60}},
+]
+
+
+@pytest.fixture
+def vector_store(monkeypatch):
+    """Patch the chat module's vector store with a stub returning DOCS."""
+    store = MagicMock()
+    store.get_source_documents.return_value = DOCS
+    monkeypatch.setattr(chat_service_module, "get_vector_store", lambda: store)
+    monkeypatch.setattr(chat_service_module, "get_sophnet_service", MagicMock)
+    return store
+
+
+class TestContextBridgeBatch:
+    """Tests for ChatService.generate_context_bridge_batch."""
+
+    @pytest.mark.asyncio
+    async def test_batch_fetches_documents_once(self, vector_store):
+        """Test that all items share one source document fetch."""
+        service = ChatService()
+        vector_store.get_source_documents.reset_mock()
+
+        results = await service.generate_context_bridge_batch(
+            "src-1",
+            [{"timestamp": 30, "previous_timestamp": 0}, {"timestamp": 60}],
+        )
+
+        vector_store.get_source_documents.assert_called_once_with("src-1")
+        assert len(results) == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_matches_single_requests(self, vector_store):
+        """Test that each batch result equals the single-request result."""
+        service = ChatService()
+        items = [
+            {"timestamp": 30, "previous_timestamp": 0},
+            {"timestamp": 60, "previous_timestamp": None},
+            {"timestamp": 90},
+        ]
+
+        results = await service.generate_context_bridge_batch("src-1", items)
+
+        for item, result in zip(items, results):
+            single = await service.generate_context_bridge(
+                "src-1", item["timestamp"], item.get("previous_timestamp")
+            )
+            assert result == single
+        assert results[0]["current_context"] == "第一部分内容"
+        assert results[0]["previous_context"] == "开场介绍"
+        assert results[1]["timestamp_str"] == "01:00"
+
+    @pytest.mark.asyncio
+    async def test_batch_without_documents(self, vector_store):
+        """Test that a source without documents yields placeholder bridges."""
+        vector_store.get_source_documents.return_value = []
+        service = ChatService()
+
+        results = await service.generate_context_bridge_batch("missing", [{"timestamp": 5}])
+
+        assert results == [{
+            "summary": "No content available",
+            "previous_context": "",
+            "current_context": "",
+            "timestamp_str": "00:05",
+        }]
+
+
+class TestContextBridgeBatchAPI:
+    """Tests for POST /chat/context-bridge/batch."""
+
+    @pytest.fixture
+    def client(self, vector_store):
+        """Create a test client with the chat router and a stubbed service."""
+        app = FastAPI()
+        app.include_router(router)
+        service = ChatService()
+        app.dependency_overrides[get_chat_service] = lambda: service
+        return TestClient(app)
+
+    def test_batch_endpoint_returns_results_in_order(self, client):
+        """Test that the endpoint returns one complete result per item, in order."""
+        response = client.post(
+            "/chat/context-bridge/batch",
+            json={
+                "source_id": "src-1",
+                "items": [{"timestamp": 60, "previous_timestamp": 30}, {"timestamp": 30}],
+            },
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["timestamp_str"] for r in results] == ["01:00", "00:30"]
+        for result in results:
+            assert set(result) == {"summary", "previous_context", "current_context", "timestamp_str"}
+
+    def test_batch_endpoint_rejects_missing_timestamp(self, client):
+        """Test that items without a timestamp fail validation."""
+        response = client.post(
+            "/chat/context-bridge/batch",
+            json={"source_id": "src-1", "items": [{"previous_timestamp": 30}]},
+        )
+
+        assert response.status_code == 422
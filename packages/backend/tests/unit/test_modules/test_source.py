@@ -4,12 +4,30 @@ Unit tests for Modules - Source Service
 
 import pytest
 import asyncio
+from types import SimpleNamespace
+from typing import Callable, Protocol
 from unittest.mock import AsyncMock, MagicMock
 
 from app.modules.source.service import SourceService
 from app.modules.source.schemas import SourceCreate
 
 
+class DAOProto(Protocol):
+    """DAO surface used by SourceService."""
+    create: Callable
+    get: Callable
+    get_all: Callable
+    delete: Callable
+    update: Callable
+
+
+def make_dao(**overrides) -> DAOProto:
+    """Create a lightweight DAO stub with AsyncMock methods."""
+    methods = {name: AsyncMock() for name in ("create", "get", "get_all", "delete", "update")}
+    methods.update(overrides)
+    return SimpleNamespace(**methods)
+
+
 class TestSourceService:
     """Tests for SourceService class."""
     
@@ -26,8 +44,7 @@ class TestSourceService:
     @pytest.mark.asyncio
     async def test_create_source(self, service, mock_session):
         """Test that create_source creates a new source."""
-        mock_dao = MagicMock()
-        mock_dao.create = AsyncMock(return_value=MagicMock(id="new-id", title="Test Video"))
+        mock_dao = make_dao(create=AsyncMock(return_value=MagicMock(id="new-id", title="Test Video")))
         service.dao = mock_dao
         
         data = SourceCreate(title="Test Video")
@@ -46,9 +63,8 @@ class TestSourceService:
     @pytest.mark.asyncio
     async def test_get_source(self, service):
         """Test that get_source returns source by ID."""
-        mock_dao = MagicMock()
         mock_source = MagicMock(id="test-id", title="Test Video")
-        mock_dao.get = AsyncMock(return_value=mock_source)
+        mock_dao = make_dao(get=AsyncMock(return_value=mock_source))
         service.dao = mock_dao
         
         result = await service.get_source("test-id")
@@ -59,9 +75,7 @@ class TestSourceService:
     @pytest.mark.asyncio
     async def test_get_source_returns_none_when_not_found(self, service):
         """Test that get_source returns None when source not found."""
-        mock_dao = MagicMock()
-        mock_dao.get = AsyncMock(return_value=None)
-        service.dao = mock_dao
+        service.dao = make_dao(get=AsyncMock(return_value=None))
         
         result = await service.get_source("non-existent-id")
         
@@ -70,12 +84,11 @@ class TestSourceService:
     @pytest.mark.asyncio
     async def test_list_sources(self, service):
         """Test that list_sources returns list of sources."""
-        mock_dao = MagicMock()
         mock_sources = [
             MagicMock(id="1", title="Video 1"),
             MagicMock(id="2", title="Video 2"),
         ]
-        mock_dao.get_all = AsyncMock(return_value=mock_sources)
+        mock_dao = make_dao(get_all=AsyncMock(return_value=mock_sources))
         service.dao = mock_dao
         
         result = await service.list_sources()
@@ -86,8 +99,7 @@ class TestSourceService:
     @pytest.mark.asyncio
     async def test_delete_source(self, service):
         """Test that delete_source calls DAO delete."""
-        mock_dao = MagicMock()
-        mock_dao.delete = AsyncMock(return_value=True)
+        mock_dao = make_dao(delete=AsyncMock(return_value=True))
         service.dao = mock_dao
         
         result = await service.delete_source("test-id")
@@ -98,9 +110,8 @@ class TestSourceService:
     @pytest.mark.asyncio
     async def test_update_status(self, service):
         """Test that update_status calls DAO update."""
-        mock_dao = MagicMock()
         mock_source = MagicMock(id="test-id", status="done")
-        mock_dao.update = AsyncMock(return_value=mock_source)
+        mock_dao = make_dao(update=AsyncMock(return_value=mock_source))
         service.dao = mock_dao
         
         result = await service.update_status("test-id", "done")
@@ -13,71 +13,64 @@
 import sys
 import os
 from pathlib import Path
+from string import Template
 
 # 添加项目根目录到 Python 路径
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 
-def to_pascal_case(name: str) -> str:
-    """将 snake_case 转换为 PascalCase"""
-    return "".join(word.capitalize() for word in name.split("_"))
-
-
-def generate_init_py(module_name: str, model_name: str) -> str:
-    """生成 __init__.py 内容"""
-    return f'''"""
-{module_name} module - {model_name} management.
-Handles CRUD operations for {model_name}.
+# 模板在导入时预构建, 生成时只做 substitute
+_TPL_INIT = Template('''"""
+${module_name} module - ${model_name} management.
+Handles CRUD operations for ${model_name}.
 """
 
-from .models import {model_name}
-from .dao import {model_name}DAO
-from .service import {model_name}Service
-from .schemas import {model_name}Base, {model_name}Create, {model_name}Response
+from .models import ${model_name}
+from .dao import ${model_name}DAO
+from .service import ${model_name}Service
+from .schemas import ${model_name}Base, ${model_name}Create, ${model_name}Response
 
 __all__ = [
-    "{model_name}",
-    "{model_name}DAO",
-    "{model_name}Service",
-    "{model_name}Base",
-    "{model_name}Create",
-    "{model_name}Response",
+    "${model_name}",
+    "${model_name}DAO",
+    "${model_name}Service",
+    "${model_name}Base",
+    "${model_name}Create",
+    "${model_name}Response",
 ]
-'''
+''')
 
-
-def generate_models_py(module_name: str, model_name: str) -> str:
-    """生成 models.py 内容"""
-    return f'''"""
-{module_name} SQLAlchemy models.
+_TPL_MODELS = Template('''"""
+${module_name} SQLAlchemy models.
 """
 
-from sqlalchemy import Column, String, DateTime, Float, Text
+from sqlalchemy import Column, String, DateTime, Float, Text, Index
 from sqlalchemy.sql import func
 from app.models import Base
 
 
-class {model_name}(Base):
-    """{model_name} model."""
-    __tablename__ = "{module_name}s"
+class ${model_name}(Base):
+    """${model_name} model."""
+    __tablename__ = "${module_name}s"
 
     id = Column(String, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    status = Column(String, default="active")
+    status = Column(String, default="active", index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    def __repr__(self):
-        return f"<{model_name}(id={{self.id}}, name={{self.name}})>"
-'''
+    __table_args__ = (
+        Index("ix_${module_name}s_status_created", "status", created_at.desc()),
+    )
 
+    def __repr__(self):
+        return f"<${model_name}(id={self.id}, name={self.name})>"
+''')
 
-def generate_schemas_py(module_name: str, model_name: str) -> str:
-    """生成 schemas.py 内容"""
-    return f'''"""
-{module_name} Pydantic schemas.
+_TPL_SCHEMAS = Template('''"""
+${module_name} Pydantic schemas.
 """
 
 from typing import Optional
@@ -85,19 +78,19 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 
 
-class {model_name}Base(BaseModel):
-    """Base schema for {model_name}."""
-    name: str = Field(..., description="Name of the {module_name}")
+class ${model_name}Base(BaseModel):
+    """Base schema for ${model_name}."""
+    name: str = Field(..., description="Name of the ${module_name}")
     description: Optional[str] = Field(None, description="Description")
 
 
-class {model_name}Create({model_name}Base):
-    """Schema for creating a new {model_name}."""
+class ${model_name}Create(${model_name}Base):
+    """Schema for creating a new ${model_name}."""
     pass
 
 
-class {model_name}Response({model_name}Base):
-    """Schema for {model_name} response."""
+class ${model_name}Response(${model_name}Base):
+    """Schema for ${model_name} response."""
     id: str
     status: str
     created_at: datetime
@@ -105,13 +98,10 @@ class {model_name}Response({model_name}Base):
 
     class Config:
         from_attributes = True
-'''
-
+''')
 
-def generate_dao_py(module_name: str, model_name: str) -> str:
-    """生成 dao.py 内容"""
-    return f'''"""
-{module_name} Data Access Object.
+_TPL_DAO = Template('''"""
+${module_name} Data Access Object.
 """
 
 from typing import List, Optional
@@ -119,34 +109,33 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.core.base_dao import BaseDAO
-from app.modules.{module_name}.models import {model_name}
+from app.modules.${module_name}.models import ${model_name}
 
 
-class {model_name}DAO(BaseDAO[{model_name}]):
-    """DAO for {model_name} model."""
+class ${model_name}DAO(BaseDAO[${model_name}]):
+    """DAO for ${model_name} model."""
 
-    async def get_by_status(self, status: str) -> List[{model_name}]:
-        """Get {module_name}s by status."""
+    async def get_by_status(self, status: str) -> List[${model_name}]:
+        """Get ${module_name}s by status."""
         result = await self.session.execute(
-            select({model_name}).where({model_name}.status == status)
+            select(${model_name})
+            .where(${model_name}.status == status)
+            .order_by(${model_name}.created_at.desc())
         )
         return list(result.scalars().all())
 
-    async def search_by_name(self, keyword: str, limit: int = 50) -> List[{model_name}]:
-        """Search {module_name}s by name keyword."""
+    async def search_by_name(self, keyword: str, limit: int = 50) -> List[${model_name}]:
+        """Search ${module_name}s by name keyword."""
         result = await self.session.execute(
-            select({model_name})
-            .where({model_name}.name.contains(keyword))
+            select(${model_name})
+            .where(${model_name}.name.contains(keyword))
             .limit(limit)
         )
         return list(result.scalars().all())
-'''
+''')
 
-
-def generate_service_py(module_name: str, model_name: str) -> str:
-    """生成 service.py 内容"""
-    return f'''"""
-{module_name} business service.
+_TPL_SERVICE = Template('''"""
+${module_name} business service.
 """
 
 import logging
@@ -154,66 +143,63 @@ from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.base_service import BaseService
-from app.modules.{module_name}.dao import {model_name}DAO
-from app.modules.{module_name}.models import {model_name}
-from app.modules.{module_name}.schemas import {model_name}Create, {model_name}Response
+from app.modules.${module_name}.dao import ${model_name}DAO
+from app.modules.${module_name}.models import ${model_name}
+from app.modules.${module_name}.schemas import ${model_name}Create, ${model_name}Response
 
 logger = logging.getLogger(__name__)
 
 
-class {model_name}Service(BaseService[{model_name}DAO]):
-    """Service for {module_name} management."""
+class ${model_name}Service(BaseService[${model_name}DAO]):
+    """Service for ${module_name} management."""
 
     def __init__(self, session: AsyncSession):
         """Initialize with session."""
-        super().__init__(session, {model_name}DAO, {model_name})
+        super().__init__(session, ${model_name}DAO, ${model_name})
 
-    async def create_{module_name}(self, data: {model_name}Create) -> {model_name}:
-        """Create a new {module_name}."""
-        {module_name_lower} = await self.dao.create(
+    async def create_${module_name}(self, data: ${model_name}Create) -> ${model_name}:
+        """Create a new ${module_name}."""
+        ${module_name} = await self.dao.create(
             name=data.name,
             description=data.description,
             status="active",
         )
-        self.log_info("{model_name} created", id={module_name_lower}.id, name={module_name_lower}.name)
-        return {module_name_lower}
+        self.log_info("${model_name} created", id=${module_name}.id, name=${module_name}.name)
+        return ${module_name}
 
-    async def get_{module_name}(self, id: str) -> Optional[{model_name}]:
-        """Get {module_name} by ID."""
+    async def get_${module_name}(self, id: str) -> Optional[${model_name}]:
+        """Get ${module_name} by ID."""
         return await self.dao.get(id)
 
-    async def list_{module_name}s(self, limit: int = 100, offset: int = 0) -> List[{model_name}]:
-        """List all {module_name}s."""
+    async def list_${module_name}s(self, limit: int = 100, offset: int = 0) -> List[${model_name}]:
+        """List all ${module_name}s."""
         return await self.dao.get_all(limit=limit, offset=offset)
 
-    async def update_{module_name}(self, id: str, **kwargs) -> Optional[{model_name}]:
-        """Update {module_name}."""
+    async def update_${module_name}(self, id: str, **kwargs) -> Optional[${model_name}]:
+        """Update ${module_name}."""
         result = await self.dao.update(id, **kwargs)
         if result:
-            self.log_info("{model_name} updated", id=id)
+            self.log_info("${model_name} updated", id=id)
         return result
 
-    async def delete_{module_name}(self, id: str) -> bool:
-        """Delete {module_name} by ID."""
+    async def delete_${module_name}(self, id: str) -> bool:
+        """Delete ${module_name} by ID."""
         result = await self.dao.delete(id)
         if result:
-            self.log_info("{model_name} deleted", id=id)
+            self.log_info("${model_name} deleted", id=id)
         return result
 
-    async def get_by_status(self, status: str) -> List[{model_name}]:
-        """Get {module_name}s by status."""
+    async def get_by_status(self, status: str) -> List[${model_name}]:
+        """Get ${module_name}s by status."""
         return await self.dao.get_by_status(status)
 
-    async def search_by_name(self, keyword: str) -> List[{model_name}]:
-        """Search {module_name}s by name."""
+    async def search_by_name(self, keyword: str) -> List[${model_name}]:
+        """Search ${module_name}s by name."""
         return await self.dao.search_by_name(keyword)
-'''
+''')
 
-
-def generate_api_py(module_name: str, model_name: str) -> str:
-    """生成 api.py 内容"""
-    return f'''"""
-{module_name} API routes.
+_TPL_API = Template('''"""
+${module_name} API routes.
 """
 
 from typing import List
@@ -221,59 +207,94 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import get_db
-from app.modules.{module_name} import {model_name}Service, {model_name}Create, {model_name}Response
+from app.modules.${module_name} import ${model_name}Service, ${model_name}Create, ${model_name}Response
 
-router = APIRouter(prefix="/{module_name}s", tags=["{module_name}s"])
+router = APIRouter(prefix="/${module_name}s", tags=["${module_name}s"])
 
 
-def get_{module_name}_service(db: AsyncSession = Depends(get_db)) -> {model_name}Service:
-    """Dependency for {model_name}Service."""
-    return {model_name}Service(db)
+def get_${module_name}_service(db: AsyncSession = Depends(get_db)) -> ${model_name}Service:
+    """Dependency for ${model_name}Service."""
+    return ${model_name}Service(db)
 
 
-@router.post("/", response_model={model_name}Response)
-async def create_{module_name}(
-    data: {model_name}Create,
-    service: {model_name}Service = Depends(get_{module_name}_service),
+@router.post("/", response_model=${model_name}Response)
+async def create_${module_name}(
+    data: ${model_name}Create,
+    service: ${model_name}Service = Depends(get_${module_name}_service),
 ):
-    """Create a new {module_name}."""
-    return await service.create_{module_name}(data)
+    """Create a new ${module_name}."""
+    return await service.create_${module_name}(data)
 
 
-@router.get("/", response_model=List[{model_name}Response])
-async def list_{module_name}s(
+@router.get("/", response_model=List[${model_name}Response])
+async def list_${module_name}s(
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
-    service: {model_name}Service = Depends(get_{module_name}_service),
+    service: ${model_name}Service = Depends(get_${module_name}_service),
 ):
-    """List all {module_name}s."""
-    items = await service.list_{module_name}s(limit=limit, offset=offset)
-    return [{model_name}Response.model_validate(item) for item in items]
+    """List all ${module_name}s."""
+    items = await service.list_${module_name}s(limit=limit, offset=offset)
+    return [${model_name}Response.model_validate(item) for item in items]
 
 
-@router.get("/{{item_id}}", response_model={model_name}Response)
-async def get_{module_name}(
+@router.get("/{item_id}", response_model=${model_name}Response)
+async def get_${module_name}(
     item_id: str,
-    service: {model_name}Service = Depends(get_{module_name}_service),
+    service: ${model_name}Service = Depends(get_${module_name}_service),
 ):
-    """Get {module_name} by ID."""
-    item = await service.get_{module_name}(item_id)
+    """Get ${module_name} by ID."""
+    item = await service.get_${module_name}(item_id)
     if not item:
-        raise HTTPException(status_code=404, detail=f"{model_name} not found: {{item_id}}")
+        raise HTTPException(status_code=404, detail=f"${model_name} not found: {item_id}")
     return item
 
 
-@router.delete("/{{item_id}}")
-async def delete_{module_name}(
+@router.delete("/{item_id}")
+async def delete_${module_name}(
     item_id: str,
-    service: {model_name}Service = Depends(get_{module_name}_service),
+    service: ${model_name}Service = Depends(get_${module_name}_service),
 ):
-    """Delete {module_name} by ID."""
-    result = await service.delete_{module_name}(item_id)
+    """Delete ${module_name} by ID."""
+    result = await service.delete_${module_name}(item_id)
     if not result:
-        raise HTTPException(status_code=404, detail=f"{model_name} not found: {{item_id}}")
-    return {{"status": "deleted", "id": item_id}}
-'''
+        raise HTTPException(status_code=404, detail=f"${model_name} not found: {item_id}")
+    return {"status": "deleted", "id": item_id}
+''')
+
+
+def to_pascal_case(name: str) -> str:
+    """将 snake_case 转换为 PascalCase"""
+    return "".join(word.capitalize() for word in name.split("_"))
+
+
+def generate_init_py(module_name: str, model_name: str) -> str:
+    """生成 __init__.py 内容"""
+    return _TPL_INIT.substitute(module_name=module_name, model_name=model_name)
+
+
+def generate_models_py(module_name: str, model_name: str) -> str:
+    """生成 models.py 内容"""
+    return _TPL_MODELS.substitute(module_name=module_name, model_name=model_name)
+
+
+def generate_schemas_py(module_name: str, model_name: str) -> str:
+    """生成 schemas.py 内容"""
+    return _TPL_SCHEMAS.substitute(module_name=module_name, model_name=model_name)
+
+
+def generate_dao_py(module_name: str, model_name: str) -> str:
+    """生成 dao.py 内容"""
+    return _TPL_DAO.substitute(module_name=module_name, model_name=model_name)
+
+
+def generate_service_py(module_name: str, model_name: str) -> str:
+    """生成 service.py 内容"""
+    return _TPL_SERVICE.substitute(module_name=module_name, model_name=model_name)
+
+
+def generate_api_py(module_name: str, model_name: str) -> str:
+    """生成 api.py 内容"""
+    return _TPL_API.substitute(module_name=module_name, model_name=model_name)
 
 
 def create_module(module_name: str) -> None:
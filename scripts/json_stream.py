@@ -0,0 +1,93 @@
+"""
+JSON Stream Scanner - find the first JSON value in a streamed LLM reply.
+
+Shared by the integration test scripts so structured-output probes can act
+on the answer as soon as it closes instead of waiting for the whole stream.
+"""
+
+import json
+from typing import Any, Callable, Optional
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+
+def is_structured(value: Any) -> bool:
+    """True for a JSON object or an array of objects/arrays (e.g. not a "[1]" footnote)."""
+    if isinstance(value, dict):
+        return True
+    return isinstance(value, list) and all(isinstance(item, (dict, list)) for item in value)
+
+
+class JSONStreamScanner:
+    """
+    Incrementally scan streamed text for the first top-level JSON array/object.
+
+    Brackets are counted outside string literals only. A closed span that does
+    not parse (e.g. a "[注]" preamble) or is rejected by ``accept`` is skipped
+    and scanning continues with the next one.
+    """
+
+    def __init__(self, accept: Callable[[Any], bool] = is_structured):
+        self.accept = accept
+        self.value: Any = None
+        self.span: Optional[tuple] = None  # (start, end) of the value in text
+        self._parts = []
+        self._offset = 0      # 已累计文本长度, 用于把 chunk 内下标换算为全文下标
+        self._start = 0       # 当前顶层括号的起始下标
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def done(self) -> bool:
+        """Whether a JSON value has been found."""
+        return self.span is not None
+
+    @property
+    def text(self) -> str:
+        """All text fed so far."""
+        return "".join(self._parts)
+
+    @property
+    def value_text(self) -> str:
+        """Source text of the found value ("" if none yet)."""
+        return self.text[slice(*self.span)] if self.span else ""
+
+    def feed(self, chunk: str) -> bool:
+        """Consume the next chunk; returns True once a value has been found."""
+        self._parts.append(chunk)
+        if not self.done:
+            self._scan(chunk)
+        self._offset += len(chunk)
+        return self.done
+
+    def _scan(self, chunk: str):
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"' and self._depth:
+                self._in_string = True
+            elif ch in "[{":
+                if self._depth == 0:
+                    self._start = self._offset + i
+                self._depth += 1
+            elif ch in "]}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    end = self._offset + i + 1
+                    try:
+                        value = json_loads(self.text[self._start:end])
+                    except ValueError:  # json / orjson JSONDecodeError
+                        continue
+                    if self.accept(value):
+                        self.value = value
+                        self.span = (self._start, end)
+                        return
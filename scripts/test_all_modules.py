@@ -4,12 +4,20 @@ Tests ALL modules with REAL services (Qdrant + LLM)
 
 Usage:
     python scripts/test_all_modules.py
+
+    # Reuse LLM responses across reruns (SQLite cache at data/llm_cache.db)
+    LLM_CACHE=1 python scripts/test_all_modules.py
 """
 
 import sys
 import io
 import asyncio
+import hashlib
+import json
+import time
 import traceback
+import uuid
+from contextvars import ContextVar
 from pathlib import Path
 
 # Force UTF-8 encoding for Windows
@@ -23,20 +31,78 @@ sys.path.insert(0, str(BACKEND_DIR))
 
 from test_config import find_test_video, CONFIG
 
+# Batched ingest/search checks; timings are reported but never gate a result
+BULK_INGEST_DOCS = 500
+BATCH_SEARCH_QUERIES = 50
+
+# Phase 6 reuses nebula results from earlier runs for this long (seconds)
+NEBULA_SNAPSHOT_DIR = Path(__file__).parent / ".cache"
+NEBULA_SNAPSHOT_TTL = 3600
+
+# All output goes through one printer task. Concurrent phases buffer their
+# lines and enqueue them as a single block so their output never interleaves.
+PRINT_Q: asyncio.Queue | None = None
+_phase_buffer: ContextVar[list | None] = ContextVar("_phase_buffer", default=None)
+
+
+def out(text: str = ""):
+    """Emit a line of output (buffered per phase when running concurrently)."""
+    buffer = _phase_buffer.get()
+    if buffer is not None:
+        buffer.append(text)
+    elif PRINT_Q is not None:
+        PRINT_Q.put_nowait(text)
+    else:
+        print(text)
+
+
+async def printer():
+    """Drain PRINT_Q to stdout, flushing once per 100 messages or when idle."""
+    written = 0
+    while True:
+        text = await PRINT_Q.get()
+        sys.stdout.write(text + "\n")
+        written += 1
+        if written % 100 == 0 or PRINT_Q.empty():
+            sys.stdout.flush()
+        PRINT_Q.task_done()
+
+
+async def run_buffered(coro):
+    """Run a phase coroutine, collecting its output into one block."""
+    buffer = []
+    _phase_buffer.set(buffer)
+    try:
+        return await coro
+    finally:
+        _phase_buffer.set(None)
+        out("\n".join(buffer))
+
+
+BAR = "=" * 70
+
 
 def print_header(title: str):
     """Print a formatted header."""
-    print("\n" + "=" * 70)
-    print(f"[TEST] {title}")
-    print("=" * 70)
+    out(f"\n{BAR}\n[TEST] {title}\n{BAR}")
+
+
+def unique_source_id(prefix: str) -> str:
+    """Build a per-run source ID so concurrent phases never share vector data."""
+    return f"{prefix}_{uuid.uuid4().hex[:8]}"
 
 
 def print_result(name: str, success: bool, details: str = ""):
     """Print a test result."""
     status = "[PASS]" if success else "[FAIL]"
-    print(f"  {status} {name}")
+    out(f"  {status} {name}")
     if details:
-        print(f"       {details}")
+        out(f"       {details}")
+
+
+def print_exc():
+    """Print the current exception's traceback through the shared printer."""
+    out(traceback.format_exc().rstrip())
 
 
 # ============================================================================
@@ -48,17 +114,16 @@ def test_qdrant_connection():
     print_header("Phase 1: Qdrant Connection")
 
     try:
-        from qdrant_client import QdrantClient
+        from app.shared.storage import get_vector_store
 
-        client = QdrantClient(host="localhost", port=6333)
-        collections = client.get_collections()
+        # Every phase shares the vector store singleton's Qdrant client
+        client = get_vector_store().client
+        exists = client.collection_exists("video_knowledge")
 
         print_result("Qdrant Connection", True, f"Connected to localhost:6333")
-        print_result("Collections Check", True, f"Found {len(collections.collections)} collections")
 
         # Check if our collection exists
-        collection_names = [c.name for c in collections.collections]
-        if "video_knowledge" in collection_names:
+        if exists:
             print_result("Video Collection", True, "video_knowledge exists")
         else:
             print_result("Video Collection", True, "Will be created on first use")
@@ -67,9 +132,9 @@ def test_qdrant_connection():
 
     except Exception as e:
         print_result("Qdrant Connection", False, str(e))
-        print("\n[ERROR] Qdrant is not running!")
-        print("        Please start Qdrant with:")
-        print("        docker-compose -f docker-compose.qdrant.yml up -d")
+        out("\n[ERROR] Qdrant is not running!")
+        out("        Please start Qdrant with:")
+        out("        docker-compose -f docker-compose.qdrant.yml up -d")
         return False
 
 
@@ -82,10 +147,9 @@ def test_vector_store():
     print_header("Phase 2: Vector Store (Qdrant)")
 
     try:
-        from app.shared.storage import get_vector_store, reset_vector_store
+        from app.shared.storage import get_vector_store
 
-        # Reset and get fresh instance
-        reset_vector_store()
+        # Shared singleton; later phases reuse the same connection
         vs = get_vector_store()
 
         # Test stats
@@ -93,6 +157,21 @@ def test_vector_store():
         print_result("Initialization", True, f"Host: {stats['host']}:{stats['port']}")
         print_result("Collection", True, f"Name: {stats['collection_name']}")
 
+        collection_info = vs.client.get_collection(vs.collection_name)
+        indexed_fields = set(collection_info.payload_schema or {})
+        print_result(
+            "Payload Index",
+            "source_id" in indexed_fields,
+            f"Indexed fields: {', '.join(sorted(indexed_fields)) or 'none'}",
+        )
+
+        quantization = collection_info.config.quantization_config
+        print_result(
+            "Quantization",
+            quantization is not None,
+            f"{type(quantization).__name__}" if quantization else "Not configured (collection predates quantization?)",
+        )
+
         # Test adding data
         test_source_id = "test_video_001"
 
@@ -113,10 +192,46 @@ def test_vector_store():
         results = vs.search("测试视频 内容", n_results=5)
         print_result("Search", len(results) > 0, f"Found {len(results)} results")
 
+        # Test batched search against sequential search
+        queries = [f"测试视频 内容 {i}" for i in range(BATCH_SEARCH_QUERIES)]
+        start = time.perf_counter()
+        batch_results = vs.search_batch(queries, n_results=5)
+        batch_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        sequential_results = [vs.search(q, n_results=5) for q in queries]
+        sequential_elapsed = time.perf_counter() - start
+        # 批量检索必须与逐条检索命中相同的文档
+        batch_matches = len(batch_results) == len(queries) and all(
+            {r["text"] for r in b} == {r["text"] for r in s}
+            for b, s in zip(batch_results, sequential_results)
+        )
+        print_result(
+            "Batch Search",
+            batch_matches,
+            f"{len(queries)} queries: batch {batch_elapsed:.2f}s vs sequential {sequential_elapsed:.2f}s",
+        )
+
         # Test get_source_documents
         docs = vs.get_source_documents(test_source_id)
         print_result("Get Source Docs", len(docs) > 0, f"Retrieved {len(docs)} docs")
 
+        # Test batched ingest
+        bulk_source_id = unique_source_id("bulk_test")
+        bulk_transcripts = [
+            {"text": f"批量写入测试片段 {i}", "start": i * 5, "end": i * 5 + 5}
+            for i in range(BULK_INGEST_DOCS)
+        ]
+        start = time.perf_counter()
+        bulk_count = vs.add_video_data(bulk_source_id, bulk_transcripts, [], "批量测试视频")
+        elapsed = time.perf_counter() - start
+        stored = len(vs.get_source_documents(bulk_source_id))
+        print_result(
+            "Bulk Add Data",
+            bulk_count == BULK_INGEST_DOCS and stored == BULK_INGEST_DOCS,
+            f"Added {bulk_count} documents ({stored} stored) in {elapsed:.2f}s",
+        )
+        vs.delete_source(bulk_source_id)
+
         # Test collection count
         total = vs.get_collection_count()
         print_result("Collection Count", total > 0, f"Total: {total} docs")
@@ -129,7 +244,7 @@ def test_vector_store():
 
     except Exception as e:
         print_result("Vector Store", False, str(e))
-        traceback.print_exc()
+        print_exc()
         return False
 
 
@@ -150,62 +265,60 @@ async def test_source_service():
         await init_db()
         print_result("Database Init", True, "Tables created")
 
-        # Get session
-        session = async_session()
-        source_service = SourceService(session)
-        print_result("Service Init", True, "SourceService ready")
+        # One session for all sub-checks, closed automatically on exit
+        async with async_session() as session:
+            source_service = SourceService(session)
+            print_result("Service Init", True, "SourceService ready")
 
-        # Find test video
-        video_path = find_test_video()
-        if not video_path:
-            print_result("Test Video", False, "No test video found")
-            return False
+            # Find test video
+            video_path = find_test_video()
+            if not video_path:
+                print_result("Test Video", False, "No test video found")
+                return False
 
-        print_result("Test Video", True, f"{video_path.name} ({video_path.stat().st_size / 1024 / 1024:.1f} MB)")
+            print_result("Test Video", True, f"{video_path.name} ({video_path.stat().st_size / 1024 / 1024:.1f} MB)")
 
-        # Create source
-        source_data = SourceCreate(
-            title=video_path.stem,
-            file_type="video",
-            platform="local",
-        )
+            # Create source
+            source_data = SourceCreate(
+                title=video_path.stem,
+                file_type="video",
+                platform="local",
+            )
 
-        source = await source_service.create_source(
-            data=source_data,
-            file_path=str(video_path),
-            url=f"/static/uploads/{video_path.name}",
-        )
-        await session.commit()
+            source = await source_service.create_source(
+                data=source_data,
+                file_path=str(video_path),
+                url=f"/static/uploads/{video_path.name}",
+            )
 
-        print_result("Create Source", True, f"ID: {source.id}")
-        print_result("Source Status", source.status == "uploaded", f"Status: {source.status}")
+            print_result("Create Source", True, f"ID: {source.id}")
+            print_result("Source Status", source.status == "uploaded", f"Status: {source.status}")
 
-        # List sources
-        sources = await source_service.list_sources()
-        print_result("List Sources", len(sources) >= 1, f"Total: {len(sources)}")
+            # List sources
+            sources = await source_service.list_sources()
+            print_result("List Sources", len(sources) >= 1, f"Total: {len(sources)}")
 
-        # Get by ID
-        retrieved = await source_service.get_source(source.id)
-        print_result("Get Source", retrieved is not None, f"Retrieved: {retrieved.title if retrieved else 'None'}")
+            # Get by ID
+            retrieved = await source_service.get_source(source.id)
+            print_result("Get Source", retrieved is not None, f"Retrieved: {retrieved.title if retrieved else 'None'}")
 
-        # Search by title
-        results = await source_service.search_by_title(video_path.stem[:8])
-        print_result("Search", len(results) >= 1, f"Found {len(results)}")
+            # Search by title
+            results = await source_service.search_by_title(video_path.stem[:8])
+            print_result("Search", len(results) >= 1, f"Found {len(results)}")
 
-        # Get recent
-        recent = await source_service.get_recent(limit=5)
-        print_result("Recent Sources", len(recent) >= 1, f"Got {len(recent)}")
+            # Get recent
+            recent = await source_service.get_recent(limit=5)
+            print_result("Recent Sources", len(recent) >= 1, f"Got {len(recent)}")
 
-        # Clean up
-        await source_service.delete_source(source.id)
-        print_result("Delete Source", True, "Cleaned up test data")
+            # Clean up
+            await source_service.delete_source(source.id)
+            print_result("Delete Source", True, "Cleaned up test data")
 
-        await session.close()
-        return True
+            return True
 
     except Exception as e:
         print_result("Source Service", False, str(e))
-        traceback.print_exc()
+        print_exc()
         return False
 
 
@@ -224,7 +337,7 @@ async def test_analysis_service():
         print_result("Service Init", True, "AnalysisService ready")
 
         # Test LLM connection
-        print("\n  [INFO] Testing LLM connection...")
+        out("\n  [INFO] Testing LLM connection...")
         from app.shared.perception import get_sophnet_service
         sophnet = get_sophnet_service()
 
@@ -235,9 +348,9 @@ async def test_analysis_service():
         print_result("LLM Connection", True, f"Response: {test_response[:50]}...")
 
         # Generate analysis (uses LLM)
-        print("\n  [INFO] Generating analysis with REAL LLM...")
+        out("\n  [INFO] Generating analysis with REAL LLM...")
         result = await service.generate_analysis(
-            source_ids=["test_source"],
+            source_ids=[unique_source_id("test_source")],
             use_cache=False
         )
 
@@ -249,7 +362,7 @@ async def test_analysis_service():
 
     except Exception as e:
         print_result("Analysis Service", False, str(e))
-        traceback.print_exc()
+        print_exc()
         return False
 
 
@@ -273,7 +386,7 @@ async def test_chat_service():
         print_result("Vector Store", True, "Connected to Qdrant")
 
         # Add test data to vector store
-        test_source_id = "chat_test_001"
+        test_source_id = unique_source_id("chat_test")
         vs.add_video_data(
             source_id=test_source_id,
             transcripts=[
@@ -287,8 +400,21 @@ async def test_chat_service():
         )
         print_result("Add Test Data", True, "Added to vector store")
 
+        # Repeated queries should hit the query-embedding cache
+        cache_query = "人工智能和机器学习有什么关系？"
+        vs.search(query=cache_query, source_ids=[test_source_id], n_results=5)
+        hits_before = vs.get_stats()["query_embedding_cache"]["hits"]
+        start = time.perf_counter()
+        vs.search(query=cache_query, source_ids=[test_source_id], n_results=5)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print_result(
+            "Query Embedding Cache",
+            vs.get_stats()["query_embedding_cache"]["hits"] > hits_before,
+            f"Repeat search took {elapsed_ms:.1f}ms",
+        )
+
         # Test RAG chat
-        print("\n  [INFO] Testing RAG chat with REAL LLM...")
+        out("\n  [INFO] Testing RAG chat with REAL LLM...")
         result = await service.chat_with_video(
             query="人工智能和机器学习有什么关系？",
             source_ids=[test_source_id],
@@ -303,8 +429,30 @@ async def test_chat_service():
 
         if content:
             preview = content[:200] + "..." if len(content) > 200 else content
-            print(f"\n  [OK] Response preview:")
-            print(f"  {preview}")
+            out(f"\n  [OK] Response preview:")
+            out(f"  {preview}")
+
+        # Test streaming RAG chat (time to first token)
+        out("\n  [INFO] Testing streaming RAG chat...")
+        start = time.perf_counter()
+        first_token_s = None
+        streamed_chars = 0
+        async for line in service.chat_with_video_stream(
+            query="人工智能和机器学习有什么关系？",
+            source_ids=[test_source_id],
+            n_results=5,
+        ):
+            delta = json.loads(line).get("delta")
+            if delta:
+                if first_token_s is None:
+                    first_token_s = time.perf_counter() - start
+                streamed_chars += len(delta)
+        total_s = time.perf_counter() - start
+        print_result(
+            "Streaming Response",
+            streamed_chars > 0,
+            f"TTFT: {first_token_s or 0:.2f}s, total: {total_s:.2f}s, {streamed_chars} chars",
+        )
 
         # Clean up
         vs.delete_source(test_source_id)
@@ -314,7 +462,7 @@ async def test_chat_service():
 
     except Exception as e:
         print_result("Chat Service", False, str(e))
-        traceback.print_exc()
+        print_exc()
         return False
 
 
@@ -322,6 +470,25 @@ async def test_chat_service():
 # PHASE 6: Nebula Service Test
 # ============================================================================
 
+async def nebula_snapshot(name: str, source_ids: list, compute):
+    """Return (result, from_snapshot): a fresh JSON snapshot keyed by the sorted source_ids, else compute()."""
+    digest = hashlib.sha1(",".join(sorted(source_ids)).encode()).hexdigest()
+    path = NEBULA_SNAPSHOT_DIR / f"nebula_{name}_{digest}.json"
+    try:
+        if time.time() - path.stat().st_mtime < NEBULA_SNAPSHOT_TTL:
+            return json.loads(path.read_text(encoding="utf-8")), True
+    except (OSError, json.JSONDecodeError):
+        pass
+
+    result = await compute()
+    try:
+        NEBULA_SNAPSHOT_DIR.mkdir(exist_ok=True)
+        path.write_text(json.dumps(result, ensure_ascii=False), encoding="utf-8")
+    except OSError as e:
+        out(f"  [WARN] Could not save nebula snapshot: {e}")
+    return result, False
+
+
 async def test_nebula_service():
     """Test NebulaService."""
     print_header("Phase 6: Nebula Service")
@@ -334,16 +501,22 @@ async def test_nebula_service():
         print_result("Service Init", True, "NebulaService ready")
 
         # Get concepts
-        print("\n  [INFO] Getting global concepts...")
-        concepts = await service.get_global_concepts(top_k=10)
-        print_result("Get Concepts", len(concepts) >= 0, f"Found {len(concepts)} concepts")
+        out("\n  [INFO] Getting global concepts...")
+        concepts, cached = await nebula_snapshot(
+            "concepts", [], lambda: service.get_global_concepts(top_k=10)
+        )
+        source = " (snapshot)" if cached else ""
+        print_result("Get Concepts", len(concepts) >= 0, f"Found {len(concepts)} concepts{source}")
 
         # Build structure
-        print("\n  [INFO] Building nebula structure...")
-        structure = await service.build_nebula_structure(source_ids=[])
+        out("\n  [INFO] Building nebula structure...")
+        structure, cached = await nebula_snapshot(
+            "structure", [], lambda: service.build_nebula_structure(source_ids=[])
+        )
         nodes = structure.get("nodes", [])
         links = structure.get("links", [])
-        print_result("Build Structure", True, f"Nodes: {len(nodes)}, Links: {len(links)}")
+        source = " (snapshot)" if cached else ""
+        print_result("Build Structure", True, f"Nodes: {len(nodes)}, Links: {len(links)}{source}")
 
         # Test task creation
         task_id = service.create_task()
@@ -356,7 +529,7 @@ async def test_nebula_service():
 
     except Exception as e:
         print_result("Nebula Service", False, str(e))
-        traceback.print_exc()
+        print_exc()
         return False
 
 
@@ -374,7 +547,7 @@ async def test_creative_services():
         from app.modules.director.service import DirectorService
 
         # Debate
-        print("\n  [Debate Service]")
+        out("\n  [Debate Service]")
         debate = DebateService()
         print_result("Init", True, "DebateService ready")
 
@@ -385,7 +558,7 @@ async def test_creative_services():
         print_result("Task Status", status is not None, f"Status: {status}")
 
         # Story
-        print("\n  [Story Service]")
+        out("\n  [Story Service]")
         story = StoryService()
         print_result("Init", True, "StoryService ready")
 
@@ -396,7 +569,7 @@ async def test_creative_services():
         print_result("Task Status", status is not None, f"Status: {status}")
 
         # Director
-        print("\n  [Director Service]")
+        out("\n  [Director Service]")
         from app.modules.director.service import PERSONA_CONFIGS
         director = DirectorService()
         print_result("Init", True, "DirectorService ready")
@@ -415,7 +588,7 @@ async def test_creative_services():
 
     except Exception as e:
         print_result("Creative Services", False, str(e))
-        traceback.print_exc()
+        print_exc()
         return False
 
 
@@ -448,11 +621,11 @@ async def test_media_service():
         print_result("FFmpeg Available", ffmpeg_available, "FFmpeg check")
 
         if ffmpeg_available:
-            print("\n  [INFO] Processing video with FFmpeg...")
+            out("\n  [INFO] Processing video with FFmpeg...")
             # Process video (creates temp directory)
             result = await processor.process_video(
                 video_path=Path(video_path),
-                source_id="media_test_001",
+                source_id=unique_source_id("media_test"),
                 frame_interval=10
             )
 
@@ -464,7 +637,7 @@ async def test_media_service():
 
     except Exception as e:
         print_result("Media Service", False, str(e))
-        traceback.print_exc()
+        print_exc()
         return False
 
 
@@ -488,7 +661,7 @@ async def test_ingest_service():
 
     except Exception as e:
         print_result("Ingest Service", False, str(e))
-        traceback.print_exc()
+        print_exc()
         return False
 
 
@@ -498,10 +671,10 @@ async def test_ingest_service():
 
 async def run_all_tests():
     """Run all module tests."""
-    print("\n" + "=" * 70)
-    print("VIEWPOINT PRISM - COMPLETE MODULE TEST")
-    print("Testing ALL modules with REAL services")
-    print("=" * 70)
+    out("\n" + BAR)
+    out("VIEWPOINT PRISM - COMPLETE MODULE TEST")
+    out("Testing ALL modules with REAL services")
+    out(BAR)
 
     results = {}
 
@@ -512,51 +685,54 @@ async def run_all_tests():
     # Phase 3: Source
     results["Source Service"] = await test_source_service()
 
-    # Phase 4-5: Analysis & Chat (LLM)
-    results["Analysis Service"] = await test_analysis_service()
-    results["Chat Service"] = await test_chat_service()
-
-    # Phase 6: Nebula
-    results["Nebula Service"] = await test_nebula_service()
-
-    # Phase 7: Creative
-    results["Creative Services"] = await test_creative_services()
-
-    # Phase 8: Media
-    results["Media Service"] = await test_media_service()
-
-    # Phase 9: Ingest
-    results["Ingest Service"] = await test_ingest_service()
+    # Phase 4-9: independent of each other, run concurrently
+    phases = {
+        "Analysis Service": test_analysis_service(),
+        "Chat Service": test_chat_service(),
+        "Nebula Service": test_nebula_service(),
+        "Creative Services": test_creative_services(),
+        "Media Service": test_media_service(),
+        "Ingest Service": test_ingest_service(),
+    }
+    outcomes = await asyncio.gather(
+        *(run_buffered(phase) for phase in phases.values()),
+        return_exceptions=True,
+    )
+    for name, outcome in zip(phases, outcomes):
+        if isinstance(outcome, BaseException):
+            print_result(name, False, repr(outcome))
+            outcome = False
+        results[name] = outcome
 
     # Summary
-    print("\n" + "=" * 70)
-    print("TEST SUMMARY")
-    print("=" * 70)
+    out("\n" + BAR)
+    out("TEST SUMMARY")
+    out(BAR)
 
     passed = sum(1 for v in results.values() if v)
     total = len(results)
 
     for name, success in results.items():
         status = "[PASS]" if success else "[FAIL]"
-        print(f"  {status} {name}")
+        out(f"  {status} {name}")
 
-    print("=" * 70)
-    print(f"Total: {passed}/{total} tests passed")
-    print("=" * 70)
+    out(BAR)
+    out(f"Total: {passed}/{total} tests passed")
+    out(BAR)
 
     if passed == total:
-        print("\n[SUCCESS] All tests passed!")
+        out("\n[SUCCESS] All tests passed!")
         return True
     else:
-        print(f"\n[WARNING] {total - passed} tests failed")
+        out(f"\n[WARNING] {total - passed} tests failed")
         return total - passed == 0 or passed >= total - 1
 
 
 async def cleanup():
     """Cleanup resources."""
-    print("\n" + "=" * 70)
-    print("CLEANUP")
-    print("=" * 70)
+    out("\n" + BAR)
+    out("CLEANUP")
+    out(BAR)
 
     try:
         from app.shared.storage import reset_vector_store
@@ -569,11 +745,14 @@ async def cleanup():
         print_result("Database", True, "Disposed")
 
     except Exception as e:
-        print(f"  [WARN] Cleanup error: {e}")
+        out(f"  [WARN] Cleanup error: {e}")
 
 
 async def main():
     """Main entry point."""
+    global PRINT_Q
+    PRINT_Q = asyncio.Queue()
+    printer_task = asyncio.create_task(printer())
     try:
         failed = await run_all_tests()
         await cleanup()
@@ -586,12 +765,16 @@ async def main():
             sys.exit(1)
 
     except KeyboardInterrupt:
-        print("\n\nTest interrupted by user")
+        out("\n\nTest interrupted by user")
         sys.exit(1)
     except Exception as e:
-        print(f"\nFatal error: {e}")
-        traceback.print_exc()
+        out(f"\nFatal error: {e}")
+        print_exc()
         sys.exit(1)
+    finally:
+        await PRINT_Q.join()
+        printer_task.cancel()
+        sys.stdout.flush()
 
 
 if __name__ == "__main__":
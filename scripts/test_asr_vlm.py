@@ -9,13 +9,20 @@ Usage:
 
 import asyncio
 import sys
+import time
 from pathlib import Path
 
 # Add backend to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "packages" / "backend"))
 
-from app.services.intelligence import IntelligenceService, _WHISPER_AVAILABLE
-from app.services.sophnet_service import get_sophnet_service
+from app.shared.perception import get_asr_service, get_sophnet_service
+from app.shared.perception.asr import _WHISPER_AVAILABLE
+
+VLM_BATCH_FRAMES = 16
+
+# Load the Whisper model once per process, before any test runs
+asr_service = get_asr_service()
+asr_service.warmup()
 
 
 def print_header(text: str):
@@ -64,8 +71,7 @@ async def test_whisper_asr():
     print_info(f"Using audio file: {test_audio}")
 
     try:
-        intelligence = IntelligenceService()
-        transcripts = await intelligence.transcribe_audio(test_audio)
+        transcripts = await asr_service.transcribe_audio(test_audio)
 
         if transcripts:
             print_success(f"ASR transcribed {len(transcripts)} segments")
@@ -118,14 +124,28 @@ async def test_sophnet_vlm():
             image_path=test_image,
         )
 
-        if result and not result.startswith("Error:"):
-            print_success("VLM analysis completed")
-            print(f"    Result: {result[:100]}...")
-            return True
-        else:
+        if not result or result.startswith("Error:"):
             print_error(f"VLM analysis failed: {result}")
             return False
 
+        print_success("VLM analysis completed")
+        print(f"    Result: {result[:100]}...")
+
+        # Test batched VLM: frames run concurrently under a bounded semaphore
+        frames = sorted(test_image.parent.glob("*.jpg"))[:VLM_BATCH_FRAMES]
+        print_info(f"Analyzing {len(frames)} frames concurrently...")
+        start = time.perf_counter()
+        batch_results = await sophnet.analyze_video_frames(
+            [{"prompt": "请用中文简要描述这张图片的内容。", "image_path": f} for f in frames]
+        )
+        elapsed = time.perf_counter() - start
+        failed = [r for r in batch_results if not r or r.startswith("Error:")]
+        if failed:
+            print_error(f"Batched VLM: {len(failed)}/{len(frames)} frames failed")
+            return False
+        print_success(f"Batched VLM analyzed {len(frames)} frames in {elapsed:.2f}s")
+        return True
+
     except Exception as e:
         print_error(f"VLM test failed: {e}")
         import traceback
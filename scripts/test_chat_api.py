@@ -1,17 +1,34 @@
 """
 测试 Chat API
+
+使用方式:
+    python scripts/test_chat_api.py            # 单次请求
+    python scripts/test_chat_api.py --bench 20 # 并发 20 个相同请求, 统计 QPS
 """
-import requests
+import asyncio
 import json
+import sys
+import time
+
+import httpx
+
+try:
+    import orjson
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    loads = orjson.loads
+except ImportError:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    loads = json.loads
 
 # 配置
 API_BASE = "http://localhost:8000/api"
 SOURCE_ID = "bb762472-522e-448b-8e98-b86574b022e4"
 
-print("=" * 60)
-print("测试 Chat API")
-print("=" * 60)
-
 # 测试请求
 request_data = {
     "session_id": "test_session",
@@ -19,29 +36,68 @@ request_data = {
     "source_ids": [SOURCE_ID]
 }
 
-print(f"\n[请求]")
-print(f"  URL: {API_BASE}/chat/")
-print(f"  Data: {json.dumps(request_data, ensure_ascii=False, indent=2)}")
-
-print(f"\n[发送请求...]")
-response = requests.post(
-    f"{API_BASE}/chat/",
-    json=request_data,
-    headers={"Content-Type": "application/json"}
-)
-
-print(f"\n[响应]")
-print(f"  Status: {response.status_code}")
-print(f"  Body: {json.dumps(response.json(), ensure_ascii=False, indent=2)}")
-
-# 检查是否有 references
-result = response.json()
-references = result.get("references", [])
-print(f"\n[References]")
-print(f"  数量: {len(references)}")
-for i, ref in enumerate(references[:3], 1):
-    print(f"  [{i}] source_id={ref.get('source_id', 'N/A')}")
-    print(f"      timestamp={ref.get('timestamp', 'N/A')}s")
-    print(f"      text={ref.get('text', '')[:80]}...")
-
-print("\n" + "=" * 60)
+# 请求体只序列化一次, 所有请求复用同一份 bytes
+REQUEST_BODY = dumps(request_data)
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+async def test_chat(client: httpx.AsyncClient):
+    """发送一次 Chat 请求并打印结果"""
+    print(f"\n[请求]")
+    print(f"  URL: {API_BASE}/chat/")
+    print(f"  Data: {json.dumps(request_data, ensure_ascii=False, indent=2)}")
+
+    print(f"\n[发送请求...]")
+    response = await client.post("/chat/", content=REQUEST_BODY, headers=JSON_HEADERS)
+    result = loads(response.content)
+
+    print(f"\n[响应]")
+    print(f"  Status: {response.status_code}")
+    print(f"  Body: {json.dumps(result, ensure_ascii=False, indent=2)}")
+
+    # 检查是否有 references
+    references = result.get("references", [])
+    print(f"\n[References]")
+    print(f"  数量: {len(references)}")
+    for i, ref in enumerate(references[:3], 1):
+        print(f"  [{i}] source_id={ref.get('source_id', 'N/A')}")
+        print(f"      timestamp={ref.get('timestamp', 'N/A')}s")
+        print(f"      text={ref.get('text', '')[:80]}...")
+
+
+async def bench(client: httpx.AsyncClient, n: int):
+    """并发发送 n 个相同请求, 测量服务端吞吐"""
+    print(f"\n[Bench] 并发 {n} 个请求...")
+    start = time.perf_counter()
+    responses = await asyncio.gather(
+        *(client.post("/chat/", content=REQUEST_BODY, headers=JSON_HEADERS) for _ in range(n)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    ok = sum(1 for r in responses if isinstance(r, httpx.Response) and r.status_code == 200)
+    print(f"  成功: {ok}/{n}")
+    print(f"  耗时: {elapsed:.2f}s")
+    print(f"  QPS: {n / elapsed:.2f}")
+
+
+async def main():
+    print("=" * 60)
+    print("测试 Chat API")
+    print("=" * 60)
+
+    bench_n = 0
+    if len(sys.argv) == 3 and sys.argv[1] == "--bench":
+        bench_n = int(sys.argv[2])
+
+    # 复用同一个连接池, 握手只在首个请求发生
+    async with httpx.AsyncClient(base_url=API_BASE, timeout=60.0) as client:
+        await test_chat(client)
+        if bench_n > 0:
+            await bench(client, bench_n)
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -27,6 +27,14 @@ CONFIG = {
 }
 
 
+def _iter_mp4_entries():
+    """Yield DirEntry objects for MP4 files in VIDEO_DIR (one scandir pass)."""
+    with os.scandir(VIDEO_DIR) as it:
+        for entry in it:
+            if entry.name.lower().endswith(".mp4") and entry.is_file():
+                yield entry
+
+
 def find_test_video() -> Path | None:
     """
     Find a suitable test video file.
@@ -38,11 +46,11 @@ def find_test_video() -> Path | None:
         print(f"[Config] Video directory not found: {VIDEO_DIR}")
         return None
 
-    for video_path in VIDEO_DIR.glob("*.mp4"):
-        size_mb = video_path.stat().st_size / (1024 * 1024)
+    for entry in _iter_mp4_entries():
+        size_mb = entry.stat().st_size / (1024 * 1024)
         if size_mb >= MIN_VIDEO_SIZE_MB:
-            print(f"[Config] Found test video: {video_path.name} ({size_mb:.1f} MB)")
-            return video_path
+            print(f"[Config] Found test video: {entry.name} ({size_mb:.1f} MB)")
+            return Path(entry.path)
 
     print(f"[Config] No suitable test video found in {VIDEO_DIR}")
     return None
@@ -58,7 +66,7 @@ def get_all_test_videos() -> list[Path]:
     if not VIDEO_DIR.exists():
         return []
 
-    return sorted(VIDEO_DIR.glob("*.mp4"))
+    return sorted(Path(entry.path) for entry in _iter_mp4_entries())
 
 
 def setup_logging(log_level: str = "INFO"):
@@ -5,26 +5,91 @@ Tests the Context Bridge API endpoint for generating bridging summaries
 when users seek to different timestamps in a video.
 """
 
+import argparse
 import asyncio
+import functools
+import importlib.util
 import httpx
 import json
-from typing import Dict, Any
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+try:
+    import orjson
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    loads = orjson.loads
+except ImportError:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    loads = json.loads
 
 # Configuration
 API_BASE = "http://localhost:8000"
+JSON_HEADERS = {"Content-Type": "application/json"}
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# 同时在途的场景请求上限, 避免把后端 LLM 打满
+MAX_CONCURRENT_SCENARIOS = 4
+_scenario_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SCENARIOS)
+_output_lock = asyncio.Lock()
+
+# 批量接口单次最多携带的场景数, 超过则分多批提交
+BATCH_MAX_ITEMS = 8
+
+# 源列表本地缓存 (按 API_BASE 分键), TTL 内直接复用, 过期后用 If-Modified-Since 校验
+SOURCES_CACHE_PATH = Path.home() / ".cache" / "vp_test" / "sources.json"
+SOURCES_CACHE_TTL = 60
+
+
+@functools.lru_cache(maxsize=1024)
+def _fmt_ts(seconds: int) -> str:
+    """Format whole seconds as MM:SS."""
+    m, r = divmod(seconds, 60)
+    return f"{m:02d}:{r:02d}"
 
 
-async def test_context_bridge(source_id: str, timestamp: float, previous_timestamp: float | None = None):
+def make_client() -> httpx.AsyncClient:
+    """
+    Create the shared client; keep-alive lets scenarios reuse one pooled connection.
+
+    HTTP/2 is enabled when ``h2`` is installed so concurrent scenarios are
+    multiplexed over a single connection; HTTP/1.1-only servers are unaffected.
+    """
+    return httpx.AsyncClient(
+        base_url=API_BASE,
+        http2=HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(30.0, connect=5.0, read=30.0),
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=8, keepalive_expiry=30.0),
+    )
+
+
+async def test_context_bridge(
+    client: httpx.AsyncClient,
+    source_id: str,
+    timestamp: float,
+    previous_timestamp: float | None = None,
+    title: str | None = None,
+):
     """
     Test the Context Bridge API endpoint.
 
+    The request is awaited before anything is printed, and the report is
+    buffered and written with a single ``sys.stdout.write``, so concurrent
+    scenarios never interleave their output.
+
     Args:
+        client: Shared HTTP client
         source_id: Video source ID to test
         timestamp: Target timestamp to seek to (in seconds)
         previous_timestamp: Optional - where user was before seeking
+        title: Optional scenario title printed above the report
     """
-    url = f"{API_BASE}/api/chat/context-bridge"
-
     payload = {
         "source_id": source_id,
         "timestamp": timestamp,
@@ -33,114 +98,238 @@ async def test_context_bridge(source_id: str, timestamp: float, previous_timesta
     if previous_timestamp is not None:
         payload["previous_timestamp"] = previous_timestamp
 
-    print(f"\n{'='*60}")
-    print(f"Testing Context Bridge API")
-    print(f"{'='*60}")
-    print(f"Source ID: {source_id}")
-    mins = int(timestamp // 60)
-    secs = int(timestamp % 60)
-    print(f"Target Timestamp: {timestamp}s ({mins:02d}:{secs:02d})")
-    if previous_timestamp is not None:
-        prev_mins = int(previous_timestamp // 60)
-        prev_secs = int(previous_timestamp % 60)
-        print(f"Previous Timestamp: {previous_timestamp}s ({prev_mins:02d}:{prev_secs:02d})")
-        print(f"Jump Distance: {abs(timestamp - previous_timestamp):.1f}s")
-    print(f"{'='*60}\n")
-
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+    response = None
+    error = None
+    async with _scenario_semaphore:
+        try:
             response = await client.post(
-                url,
-                json=payload,
-                headers={"Content-Type": "application/json"}
+                "/api/chat/context-bridge",
+                content=dumps(payload),
+                headers=JSON_HEADERS,
             )
+        except Exception as e:
+            error = e
 
+    # 整个场景的输出先缓存, 最后一次性写出, 并发场景之间不会交错
+    lines: list[str] = []
+    emit = lines.append
+    try:
+        if title:
+            emit(f"\n--- {title} ---")
+        emit(f"\n{'='*60}")
+        emit(f"Testing Context Bridge API")
+        emit(f"{'='*60}")
+        emit(f"Source ID: {source_id}")
+        emit(f"Target Timestamp: {timestamp}s ({_fmt_ts(int(timestamp))})")
+        if previous_timestamp is not None:
+            emit(f"Previous Timestamp: {previous_timestamp}s ({_fmt_ts(int(previous_timestamp))})")
+            emit(f"Jump Distance: {abs(timestamp - previous_timestamp):.1f}s")
+        emit(f"{'='*60}\n")
+
+        if isinstance(error, httpx.ConnectError):
+            emit("[ERROR] Connection Error: Could not connect to the API server.")
+            emit(f"   Make sure the backend is running at {API_BASE}")
+            return None
+        if isinstance(error, httpx.TimeoutException):
+            emit("[ERROR] Timeout Error: Request took too long.")
+            return None
+        if error is not None:
+            emit(f"[ERROR] Unexpected Error: {error}")
+            return None
+
+        try:
             if response.status_code == 200:
-                data = response.json()
-
-                print("[OK] API Response Successful\n")
-                print(f"Timestamp: {data.get('timestamp_str')}")
-                print(f"Previous Context: {data.get('previous_context')}")
-                print(f"Current Context: {data.get('current_context')}")
-                print(f"\n[*] Bridging Summary:")
-                print(f"  {data.get('summary')}")
-
-                # Validate response structure
-                required_fields = ["summary", "previous_context", "current_context", "timestamp_str"]
-                missing = [f for f in required_fields if f not in data]
-                if missing:
-                    print(f"\n[!] Missing fields: {missing}")
-                else:
-                    print("\n[OK] All required fields present")
+                data = loads(response.content)
 
+                emit("[OK] API Response Successful\n")
+                _report_bridge(data, emit)
                 return data
             else:
-                print(f"[ERROR] API Error: HTTP {response.status_code}")
-                print(f"Response: {response.text}")
+                emit(f"[ERROR] API Error: HTTP {response.status_code}")
+                emit(f"Response: {response.text}")
                 return None
 
-    except httpx.ConnectError:
-        print("[ERROR] Connection Error: Could not connect to the API server.")
-        print(f"   Make sure the backend is running at {API_BASE}")
-        return None
-    except httpx.TimeoutException:
-        print("[ERROR] Timeout Error: Request took too long.")
-        return None
-    except Exception as e:
-        print(f"[ERROR] Unexpected Error: {e}")
+        except Exception as e:
+            emit(f"[ERROR] Unexpected Error: {e}")
+            return None
+    finally:
+        async with _output_lock:
+            sys.stdout.write("\n".join(lines) + "\n")
+
+
+REQUIRED_FIELDS = ("summary", "previous_context", "current_context", "timestamp_str")
+
+
+def _report_bridge(data: dict, emit: Callable[[str], None]):
+    """Print one context bridge result and validate its structure."""
+    emit(f"Timestamp: {data.get('timestamp_str')}")
+    emit(f"Previous Context: {data.get('previous_context')}")
+    emit(f"Current Context: {data.get('current_context')}")
+    emit(f"\n[*] Bridging Summary:")
+    emit(f"  {data.get('summary')}")
+
+    # Validate response structure
+    missing = [f for f in REQUIRED_FIELDS if f not in data]
+    if missing:
+        emit(f"\n[!] Missing fields: {missing}")
+    else:
+        emit("\n[OK] All required fields present")
+
+
+async def test_context_bridge_batch(client: httpx.AsyncClient, source_id: str, scenarios: list):
+    """
+    Submit scenarios through the batch endpoint, at most BATCH_MAX_ITEMS per request.
+
+    Returns a list aligned with ``scenarios`` (None for failed entries), or
+    None if the server has no batch endpoint so callers can fall back.
+    """
+    results: list = []
+    for start in range(0, len(scenarios), BATCH_MAX_ITEMS):
+        chunk = scenarios[start:start + BATCH_MAX_ITEMS]
+        payload = {
+            "source_id": source_id,
+            "items": [
+                {"timestamp": s["timestamp"], "previous_timestamp": s.get("previous")}
+                for s in chunk
+            ],
+        }
+        try:
+            response = await client.post(
+                "/api/chat/context-bridge/batch",
+                content=dumps(payload),
+                headers=JSON_HEADERS,
+            )
+        except httpx.HTTPError as e:
+            print(f"[ERROR] Batch request failed: {e}")
+            results.extend([None] * len(chunk))
+            continue
+
+        if response.status_code in (404, 405):
+            return None
+        if response.status_code != 200:
+            print(f"[ERROR] Batch API Error: HTTP {response.status_code}")
+            results.extend([None] * len(chunk))
+            continue
+
+        results.extend(loads(response.content).get("results", []))
+
+    return results
+
+
+# (最短时长阈值, 场景构造函数): 视频时长超过阈值才生成该场景
+_SCENARIO_TEMPLATES: tuple[tuple[float, Callable[[float], dict]], ...] = (
+    # Jump to middle from beginning
+    (120, lambda d: {"name": "Jump from start to middle", "timestamp": d / 2, "previous": 0}),
+    # Jump to near end
+    (180, lambda d: {"name": "Jump from middle to near end", "timestamp": d * 0.8, "previous": d / 2}),
+    # Jump to specific point (30 seconds), no previous timestamp
+    (60, lambda d: {"name": "Jump to 30s mark", "timestamp": 30, "previous": None}),
+)
+
+# Scenarios for videos without duration info
+_FALLBACK_SCENARIOS: tuple[dict, ...] = (
+    {"name": "Test at 30s", "timestamp": 30, "previous": 0},
+    {"name": "Test at 60s", "timestamp": 60, "previous": 30},
+    {"name": "Test at 120s", "timestamp": 120, "previous": 60},
+)
+
+
+def _load_sources_cache() -> Dict[str, Any]:
+    """Read the whole sources cache file; missing or corrupt files yield {}."""
+    try:
+        return loads(SOURCES_CACHE_PATH.read_bytes())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_sources_cache(entry: Dict[str, Any]):
+    """Store the cache entry for the current API_BASE."""
+    cache = _load_sources_cache()
+    cache[API_BASE] = entry
+    try:
+        SOURCES_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        SOURCES_CACHE_PATH.write_bytes(dumps(cache))
+    except OSError as e:
+        print(f"[!] Could not write sources cache: {e}")
+
+
+async def fetch_sources(client: httpx.AsyncClient, refresh: bool = False) -> list | None:
+    """
+    Get the source list, served from the disk cache while it is fresh.
+
+    Returns None when the request fails and no cached copy is available.
+    """
+    entry = None if refresh else _load_sources_cache().get(API_BASE)
+    if entry and time.time() - entry.get("fetched_at", 0) < SOURCES_CACHE_TTL:
+        print("[cache] Using cached source list")
+        return entry["sources"]
+
+    headers = {}
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = await client.get("/api/sources/", headers=headers, timeout=10.0)
+
+    if response.status_code == 304 and entry:
+        print("[cache] Source list not modified")
+        sources = entry["sources"]
+    elif response.status_code == 200:
+        sources = loads(response.content).get("sources", [])
+    else:
+        print(f"[ERROR] Failed to get sources: HTTP {response.status_code}")
         return None
 
+    _save_sources_cache({
+        "fetched_at": time.time(),
+        "last_modified": response.headers.get("last-modified"),
+        "sources": sources,
+    })
+    return sources
 
-async def list_available_sources():
-    """Get list of available video sources."""
-    url = f"{API_BASE}/api/sources/"
 
+async def list_available_sources(client: httpx.AsyncClient, refresh: bool = False):
+    """Get list of available video sources."""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url)
+        sources = await fetch_sources(client, refresh=refresh)
+        if sources is None:
+            return []
 
-            if response.status_code == 200:
-                data = response.json()
-                sources = data.get("sources", [])
-
-                print(f"\n{'='*60}")
-                print(f"Available Video Sources ({len(sources)})")
-                print(f"{'='*60}")
-
-                for source in sources:
-                    duration = source.get("duration")
-                    if duration is not None:
-                        mins = int(duration // 60)
-                        secs = int(duration % 60)
-                        duration_str = f"{mins:02d}:{secs:02d}"
-                    else:
-                        duration_str = "N/A"
-                    status = source.get("status")
-
-                    status_icon = "[OK]" if status == "done" else "[..]"
-                    print(f"{status_icon} [{source['id'][:8]}...] {source['title'][:40]}")
-                    print(f"   Duration: {duration_str} | Status: {status}")
-
-                print(f"{'='*60}\n")
-
-                return sources
-            else:
-                print(f"[ERROR] Failed to get sources: HTTP {response.status_code}")
-                return []
+        print(f"\n{'='*60}")
+        print(f"Available Video Sources ({len(sources)})")
+        print(f"{'='*60}")
+
+        for source in sources:
+            duration = source.get("duration")
+            duration_str = _fmt_ts(int(duration)) if duration is not None else "N/A"
+            status = source.get("status")
+
+            status_icon = "[OK]" if status == "done" else "[..]"
+            print(f"{status_icon} [{source['id'][:8]}...] {source['title'][:40]}")
+            print(f"   Duration: {duration_str} | Status: {status}")
+
+        print(f"{'='*60}\n")
+
+        return sources
 
     except Exception as e:
         print(f"[ERROR] Error getting sources: {e}")
         return []
 
 
-async def main():
+async def main(refresh_sources: bool = False):
     """Main test function."""
     print("\n" + "="*60)
     print("Context Bridge Feature Test")
     print("="*60)
 
+    async with make_client() as client:
+        await run_tests(client, refresh_sources)
+
+
+async def run_tests(client: httpx.AsyncClient, refresh_sources: bool = False):
+    """Run all scenarios over the shared client."""
     # Step 1: Get available sources
-    sources = await list_available_sources()
+    sources = await list_available_sources(client, refresh=refresh_sources)
 
     # Filter for completed sources
     done_sources = [s for s in sources if s.get("status") == "done"]
@@ -163,52 +352,43 @@ async def main():
     print("Running Test Scenarios")
     print("="*60)
 
-    scenarios = []
-
     if duration > 0:
-        # Scenario 1: Jump to middle from beginning
-        if duration > 120:
-            scenarios.append({
-                "name": "Jump from start to middle",
-                "timestamp": duration / 2,
-                "previous": 0,
-            })
-
-        # Scenario 2: Jump to near end
-        if duration > 180:
-            scenarios.append({
-                "name": "Jump from middle to near end",
-                "timestamp": duration * 0.8,
-                "previous": duration / 2,
-            })
-
-        # Scenario 3: Jump to specific point (30 seconds)
-        if duration > 60:
-            scenarios.append({
-                "name": "Jump to 30s mark",
-                "timestamp": 30,
-                "previous": None,  # No previous timestamp
-            })
+        scenarios = [build(duration) for threshold, build in _SCENARIO_TEMPLATES if duration > threshold]
     else:
         # Fallback scenarios for videos without duration info
-        scenarios = [
-            {"name": "Test at 30s", "timestamp": 30, "previous": 0},
-            {"name": "Test at 60s", "timestamp": 60, "previous": 30},
-            {"name": "Test at 120s", "timestamp": 120, "previous": 60},
+        scenarios = list(_FALLBACK_SCENARIOS)
+
+    # Prefer one batched round-trip; fall back to concurrent single calls on older servers
+    results_raw = await test_context_bridge_batch(client, source_id, scenarios)
+    if results_raw is not None:
+        lines: list[str] = []
+        for i, (scenario, result) in enumerate(zip(scenarios, results_raw), 1):
+            lines.append(f"\n--- Scenario {i}: {scenario['name']} ---")
+            lines.append(f"Target Timestamp: {scenario['timestamp']}s ({_fmt_ts(int(scenario['timestamp']))})")
+            if scenario.get("previous") is not None:
+                lines.append(f"Jump Distance: {abs(scenario['timestamp'] - scenario['previous']):.1f}s")
+            if result:
+                _report_bridge(result, lines.append)
+            else:
+                lines.append("[ERROR] No result")
+        sys.stdout.write("\n".join(lines) + "\n")
+    else:
+        print("[!] Batch endpoint unavailable, falling back to single requests")
+        tasks = [
+            test_context_bridge(
+                client,
+                source_id=source_id,
+                timestamp=scenario["timestamp"],
+                previous_timestamp=scenario.get("previous"),
+                title=f"Scenario {i}: {scenario['name']}",
+            )
+            for i, scenario in enumerate(scenarios, 1)
         ]
+        results_raw = await asyncio.gather(*tasks, return_exceptions=True)
 
-    # Run each scenario
     results = []
-    for i, scenario in enumerate(scenarios, 1):
-        print(f"\n--- Scenario {i}: {scenario['name']} ---")
-
-        result = await test_context_bridge(
-            source_id=source_id,
-            timestamp=scenario["timestamp"],
-            previous_timestamp=scenario.get("previous")
-        )
-
-        if result:
+    for scenario, result in zip(scenarios, results_raw):
+        if result and not isinstance(result, BaseException):
             results.append({
                 "scenario": scenario["name"],
                 "summary": result.get("summary"),
@@ -240,4 +420,11 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Context Bridge feature test")
+    parser.add_argument(
+        "--refresh-sources",
+        action="store_true",
+        help="ignore the cached source list and fetch it again",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(refresh_sources=args.refresh_sources))
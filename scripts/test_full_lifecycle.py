@@ -12,8 +12,20 @@ if sys.platform == "win32":
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 import asyncio
+import json
+import random
 import traceback
+from contextlib import AsyncExitStack
+from contextvars import ContextVar
 from pathlib import Path
+from typing import AsyncIterator
+
+import numpy as np
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 # Add backend to path
 BACKEND_DIR = Path(__file__).parent.parent / "packages" / "backend"
@@ -27,52 +39,195 @@ from app.modules.source.service import SourceService
 from app.modules.source.schemas import SourceCreate
 
 
+# 并发阶段的输出先写入各自的缓冲区, 结束时一次性写出, 避免交错
+_log_buffer: ContextVar[list | None] = ContextVar("_log_buffer", default=None)
+
+
+def log(text: str = ""):
+    """Emit a line of output, buffered while running inside run_buffered()."""
+    buffer = _log_buffer.get()
+    if buffer is not None:
+        buffer.append(text)
+    else:
+        sys.stdout.write(text + "\n")
+
+
+async def run_buffered(coro):
+    """Run a test phase, writing all of its output in a single write at the end."""
+    buffer = []
+    _log_buffer.set(buffer)
+    try:
+        return await coro
+    finally:
+        _log_buffer.set(None)
+        sys.stdout.write("\n".join(buffer) + "\n")
+        sys.stdout.flush()
+
+
+# 任务 ID 只需在单次测试内唯一, 不需要 uuid4 的加密随机源
+_rng = random.Random()
+
+
+def _short_id() -> str:
+    """Return an 8-char hex task id."""
+    return _rng.randbytes(4).hex()
+
+
 class MockVectorStore:
-    """Mock VectorStore for testing without ChromaDB."""
+    """
+    Mock VectorStore for testing without ChromaDB.
+
+    Documents are kept column-wise (one list per field) instead of as a list
+    of dicts; dicts are only rebuilt for documents actually returned.
+    """
+
+    _TYPES = ("transcript", "visual")
+    # 倒排索引的 n-gram 长度; 更短的查询直接全表扫描
+    _NGRAM = 3
 
     def __init__(self):
-        self.documents = {}
+        # 列式存储, 行号即文档序号
+        self._ids: list[str] = []
+        self._texts: list[str] = []
+        self._texts_lc: list[str] = []
+        self._types: list[int] = []
+        self._starts: list[float] = []
+        self._source_ids: list[str] = []
+        self._titles: list[str] = []
+        self._alive: list[bool] = []
+        # source_id -> [start, end) 行区间, 同一来源的文档总是连续写入
+        self._ranges: dict[str, tuple[int, int]] = {}
+        # 倒排索引: 小写字符 n-gram -> 行号
+        self._index: dict[str, set[int]] = {}
+        # 查询时才构建的 NumPy 列, 写入后失效
+        self._arrays = None
+
+    def _append(self, source_id, doc_id, text, type_code, start, video_title):
+        row = len(self._ids)
+        text_lc = text.lower()
+        self._ids.append(doc_id)
+        self._texts.append(text)
+        self._texts_lc.append(text_lc)
+        self._types.append(type_code)
+        self._starts.append(start)
+        self._source_ids.append(source_id)
+        self._titles.append(video_title)
+        self._alive.append(True)
+        for gram in self._ngrams(text_lc):
+            self._index.setdefault(gram, set()).add(row)
+
+    @classmethod
+    def _ngrams(cls, text_lc):
+        n = cls._NGRAM
+        return {text_lc[i:i + n] for i in range(len(text_lc) - n + 1)}
+
+    def _doc(self, row):
+        return {
+            "id": self._ids[row],
+            "text": self._texts[row],
+            "metadata": {
+                "source_id": self._source_ids[row],
+                "type": self._TYPES[self._types[row]],
+                "start": self._starts[row],
+                "video_title": self._titles[row],
+            },
+        }
+
+    def _columns(self):
+        if self._arrays is None:
+            self._arrays = (
+                np.array(self._source_ids, dtype=object),
+                np.array(self._types, dtype=np.uint8),
+                np.array(self._alive, dtype=bool),
+            )
+        return self._arrays
 
     def add_video_data(self, source_id, transcripts, visual_descriptions, video_title):
-        self.documents[source_id] = []
+        self.delete_source(source_id)
+        first = len(self._ids)
         for i, t in enumerate(transcripts):
-            self.documents[source_id].append({
-                "id": f"{source_id}_transcript_{i}",
-                "text": t.get("text", ""),
-                "metadata": {"source_id": source_id, "type": "transcript", "start": t.get("timestamp", 0), "video_title": video_title}
-            })
+            self._append(source_id, f"{source_id}_transcript_{i}", t.get("text", ""), 0, t.get("timestamp", 0), video_title)
         for i, v in enumerate(visual_descriptions):
-            self.documents[source_id].append({
-                "id": f"{source_id}_visual_{i}",
-                "text": v.get("description", ""),
-                "metadata": {"source_id": source_id, "type": "visual", "start": v.get("timestamp", 0), "video_title": video_title}
-            })
-        return len(self.documents[source_id])
+            self._append(source_id, f"{source_id}_visual_{i}", v.get("description", ""), 1, v.get("timestamp", 0), video_title)
+        self._ranges[source_id] = (first, len(self._ids))
+        self._arrays = None
+        return len(self._ids) - first
 
     def get_source_documents(self, source_id):
-        return self.documents.get(source_id, [])
+        start, end = self._ranges.get(source_id, (0, 0))
+        return [self._doc(row) for row in range(start, end)]
 
     def search(self, query, source_ids=None, n_results=10, doc_type=None):
+        """
+        Substring search over pre-lowercased texts.
+
+        Any text containing the query contains all of its character n-grams, so
+        the n-gram index narrows the rows to a superset of the matches; queries
+        shorter than _NGRAM characters scan every row.
+        """
+        if not self._ids:
+            return []
+        source_arr, type_arr, alive_arr = self._columns()
+
+        q_lc = query.lower()
+        grams = self._ngrams(q_lc)
+        if grams:
+            candidates = set.intersection(*[self._index.get(g, set()) for g in grams])
+            rows = np.fromiter(sorted(candidates), dtype=np.intp, count=len(candidates))
+        else:
+            rows = np.arange(len(self._ids))
+
+        mask = alive_arr[rows]
+        if source_ids:
+            mask &= np.isin(source_arr[rows], list(source_ids))
+        if doc_type:
+            # 未知类型不匹配任何文档, 而不是抛出 ValueError
+            if doc_type not in self._TYPES:
+                return []
+            mask &= type_arr[rows] == self._TYPES.index(doc_type)
+        rows = rows[mask]
+
+        # 子串校验逐行进行, 凑够 n_results 即停止
+        texts_lc = self._texts_lc
         results = []
-        for sid, docs in self.documents.items():
-            if source_ids and sid not in source_ids:
-                continue
-            for doc in docs:
-                if query.lower() in doc.get("text", "").lower():
-                    results.append(doc)
-                    if len(results) >= n_results:
-                        return results
+        for row in rows:
+            if q_lc in texts_lc[row]:
+                results.append(self._doc(row))
+                if len(results) >= n_results:
+                    break
         return results
 
     def delete_source(self, source_id):
-        if source_id in self.documents:
-            del self.documents[source_id]
+        start, end = self._ranges.pop(source_id, (0, 0))
+        for row in range(start, end):
+            self._alive[row] = False
+            for gram in self._ngrams(self._texts_lc[row]):
+                postings = self._index.get(gram)
+                if postings is not None:
+                    postings.discard(row)
+                    if not postings:
+                        del self._index[gram]
+        if end > start:
+            self._arrays = None
 
 
 class MockSophNet:
     """Mock SophNet service for testing without API calls."""
 
+    STREAM_CHUNK_SIZE = 16
+
     async def chat(self, messages, model="DeepSeek-V3.2"):
+        return "".join([chunk async for chunk in self.chat_stream(messages, model)])
+
+    async def chat_stream(self, messages, model="DeepSeek-V3.2") -> AsyncIterator[str]:
+        """Yield the mock response in small chunks, like a token stream."""
+        text = self._respond(messages)
+        for i in range(0, len(text), self.STREAM_CHUNK_SIZE):
+            yield text[i:i + self.STREAM_CHUNK_SIZE]
+            await asyncio.sleep(0)
+
+    @staticmethod
+    def _respond(messages):
         # Return a mock response based on the prompt
         user_content = messages[-1]["content"] if messages else ""
         if "冲突" in user_content:
@@ -88,13 +243,17 @@ class MockSophNet:
 class MockAnalysisService:
     """Mock AnalysisService for testing."""
 
-    def __init__(self):
+    def __init__(self, vector_store):
         self.sophnet = MockSophNet()
-        self.vector_store = MockVectorStore()
+        self.vector_store = vector_store
         self._cache = {}
 
+    @staticmethod
+    def _cache_key(method, source_ids):
+        return f"{method}:{','.join(sorted(source_ids))}"
+
     async def generate_conflicts(self, source_ids):
-        cache_key = f"conflicts:{','.join(sorted(source_ids))}"
+        cache_key = self._cache_key("conflicts", source_ids)
         if cache_key in self._cache:
             return self._cache[cache_key]
 
@@ -104,9 +263,8 @@ class MockAnalysisService:
         prompt = f"分析以下视频内容，找出主要观点冲突：\n{combined_text[:500]}"
         response = await self.sophnet.chat([{"role": "user", "content": prompt}])
 
-        import json
         try:
-            conflicts = json.loads(response)
+            conflicts = json_loads(response)
             if not isinstance(conflicts, list):
                 conflicts = [conflicts]
             self._cache[cache_key] = conflicts
@@ -116,7 +274,7 @@ class MockAnalysisService:
         return conflicts
 
     async def generate_graph(self, source_ids):
-        cache_key = f"graph:{','.join(sorted(source_ids))}"
+        cache_key = self._cache_key("graph", source_ids)
         if cache_key in self._cache:
             return self._cache[cache_key]
 
@@ -125,21 +283,24 @@ class MockAnalysisService:
         return result
 
     async def generate_timeline(self, source_ids):
-        cache_key = f"timeline:{','.join(sorted(source_ids))}"
+        cache_key = self._cache_key("timeline", source_ids)
         if cache_key in self._cache:
             return self._cache[cache_key]
 
-        result = [{"id": "event1", "time": "01:30", "timestamp": 90, "title": "测试事件", "description": "这是一个测试事件", "is_key_moment": True, "event_type": "STORY"}]
+        result = {"timeline": [{"id": "event1", "time": "01:30", "timestamp": 90, "title": "测试事件", "description": "这是一个测试事件", "is_key_moment": True, "event_type": "STORY"}]}
         self._cache[cache_key] = result
-        return {"timeline": result}
+        return result
 
     async def generate_analysis(self, source_ids, use_cache=True):
         if not use_cache:
             self._cache.clear()
 
-        conflicts = await self.generate_conflicts(source_ids)
-        graph = await self.generate_graph(source_ids)
-        timeline = await self.generate_timeline(source_ids)
+        # 三项分析互不依赖, 并发执行
+        conflicts, graph, timeline = await asyncio.gather(
+            self.generate_conflicts(source_ids),
+            self.generate_graph(source_ids),
+            self.generate_timeline(source_ids),
+        )
 
         return {
             "conflicts": conflicts,
@@ -151,20 +312,41 @@ class MockAnalysisService:
 class MockChatService:
     """Mock ChatService for testing."""
 
-    def __init__(self):
-        self.vector_store = MockVectorStore()
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
+        self.sophnet = MockSophNet()
         self.model = "DeepSeek-V3.2"
 
-    async def chat_with_video(self, query, source_ids, n_results=10):
-        results = self.vector_store.search(query, source_ids, n_results)
+    async def chat_with_video_stream(self, query, source_ids, n_results=10):
+        """Yield references first, then answer deltas, then the full content."""
+        # 只展示前 3 条内容和前 5 条引用, 检索上限不必超过 5
+        results = self.vector_store.search(query, source_ids, min(n_results, 5))
+
+        references = [{"source_id": r.get("metadata", {}).get("source_id", ""), "timestamp": r.get("metadata", {}).get("start", 0), "text": r.get("text", "")[:200]} for r in results[:5]]
+        yield {"references": references}
 
-        content = f"根据视频内容，我找到了以下相关信息：\n\n"
+        header = f"根据视频内容，我找到了以下相关信息：\n\n"
         for i, r in enumerate(results[:3], 1):
             metadata = r.get("metadata", {})
-            content += f"[{i}] {metadata.get('video_title', 'Unknown')} {metadata.get('start', 0)}秒\n"
-            content += f"   {r.get('text', '')[:100]}...\n\n"
+            header += f"[{i}] {metadata.get('video_title', 'Unknown')} {metadata.get('start', 0)}秒\n"
+            header += f"   {r.get('text', '')[:100]}...\n\n"
 
-        references = [{"source_id": r.get("metadata", {}).get("source_id", ""), "timestamp": r.get("metadata", {}).get("start", 0), "text": r.get("text", "")[:200]} for r in results[:5]]
+        parts = [header]
+        yield {"delta": header}
+        async for chunk in self.sophnet.chat_stream([{"role": "user", "content": query}], model=self.model):
+            parts.append(chunk)
+            yield {"delta": chunk}
+
+        yield {"content": "".join(parts), "done": True}
+
+    async def chat_with_video(self, query, source_ids, n_results=10):
+        references = []
+        content = ""
+        async for event in self.chat_with_video_stream(query, source_ids, n_results):
+            if "references" in event:
+                references = event["references"]
+            elif event.get("done"):
+                content = event["content"]
 
         return {"content": content, "references": references}
 
@@ -172,13 +354,12 @@ class MockChatService:
 class MockNebulaService:
     """Mock NebulaService for testing."""
 
-    def __init__(self):
-        self.vector_store = MockVectorStore()
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
         self.tasks = {}
 
     def create_task(self):
-        import uuid
-        task_id = uuid.uuid4().hex[:8]
+        task_id = _short_id()
         self.tasks[task_id] = {"status": "pending", "progress": 0, "message": "Task created"}
         return task_id
 
@@ -196,8 +377,7 @@ class MockDebateService:
         self.tasks = {}
 
     def create_task(self):
-        import uuid
-        task_id = uuid.uuid4().hex[:8]
+        task_id = _short_id()
         self.tasks[task_id] = {"status": "pending", "progress": 0, "message": "Task created", "video_url": None}
         return task_id
 
@@ -212,8 +392,7 @@ class MockStoryService:
         self.tasks = {}
 
     def create_task(self):
-        import uuid
-        task_id = uuid.uuid4().hex[:8]
+        task_id = _short_id()
         self.tasks[task_id] = {"status": "pending", "progress": 0, "message": "Task created"}
         return task_id
 
@@ -223,36 +402,39 @@ class MockStoryService:
 
 async def init_services():
     """Initialize all services (using mocks for ChromaDB-dependent services)."""
-    print("\n" + "=" * 60)
-    print("[Phase 1] Initializing Services")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("[Phase 1] Initializing Services")
+    log("=" * 60)
 
     # Initialize database
     await init_db()
-    print("  [OK] Database initialized")
+    log("  [OK] Database initialized")
 
     # Get database session using context manager
     session = async_session()
 
     # Initialize SourceService (needs real DB)
     source_service = SourceService(session)
-    print("  [OK] SourceService initialized (real DB)")
+    log("  [OK] SourceService initialized (real DB)")
 
     # Initialize mock services (avoids ChromaDB issues on Windows)
-    analysis_service = MockAnalysisService()
-    print("  [OK] AnalysisService initialized (mock)")
+    # 所有 mock 服务共享同一个向量库实例
+    vector_store = MockVectorStore()
 
-    chat_service = MockChatService()
-    print("  [OK] ChatService initialized (mock)")
+    analysis_service = MockAnalysisService(vector_store)
+    log("  [OK] AnalysisService initialized (mock)")
 
-    nebula_service = MockNebulaService()
-    print("  [OK] NebulaService initialized (mock)")
+    chat_service = MockChatService(vector_store)
+    log("  [OK] ChatService initialized (mock)")
+
+    nebula_service = MockNebulaService(vector_store)
+    log("  [OK] NebulaService initialized (mock)")
 
     debate_service = MockDebateService()
-    print("  [OK] DebateService initialized (mock)")
+    log("  [OK] DebateService initialized (mock)")
 
     story_service = MockStoryService()
-    print("  [OK] StoryService initialized (mock)")
+    log("  [OK] StoryService initialized (mock)")
 
     return {
         "session": session,
@@ -270,9 +452,9 @@ async def test_source_ingestion(services: dict, video_path: Path) -> str:
     Phase 2: Test Source Ingestion
     Create a source record for the test video.
     """
-    print("\n" + "=" * 60)
-    print("[Phase 2] Source Ingestion")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("[Phase 2] Source Ingestion")
+    log("=" * 60)
 
     source_service = services["source"]
     session = services["session"]
@@ -284,24 +466,22 @@ async def test_source_ingestion(services: dict, video_path: Path) -> str:
         platform="local",
     )
 
-    # Create source record
+    # Create source record (the DAO commits and refreshes the instance itself)
     source = await source_service.create_source(
         data=source_data,
         file_path=str(video_path),
         url=f"/static/uploads/{video_path.name}",
     )
 
-    # Commit the session
-    await session.commit()
-    print(f"  [OK] Source created: {source.id}")
-    print(f"       Title: {source.title}")
-    print(f"       File: {source.file_path}")
-    print(f"       Status: {source.status}")
+    log(f"  [OK] Source created: {source.id}")
+    log(f"       Title: {source.title}")
+    log(f"       File: {source.file_path}")
+    log(f"       Status: {source.status}")
 
-    # Verify we can retrieve it
-    retrieved = await source_service.get_source(source.id)
+    # Verify we can retrieve it; session.get hits the identity map, no extra SELECT
+    retrieved = await session.get(Source, source.id)
     assert retrieved is not None, "Failed to retrieve created source"
-    print(f"  [OK] Source retrieval verified")
+    log(f"  [OK] Source retrieval verified")
 
     return source.id
 
@@ -311,34 +491,34 @@ async def test_analysis_service(services: dict, video_id: str):
     Phase 3: Test Analysis Service
     Generate analysis for the video.
     """
-    print("\n" + "=" * 60)
-    print("[Phase 3] Analysis Service")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("[Phase 3] Analysis Service")
+    log("=" * 60)
 
     analysis_service = services["analysis"]
 
     # Generate analysis
-    print("  [INFO] Generating analysis for video...")
+    log("  [INFO] Generating analysis for video...")
     result = await analysis_service.generate_analysis(
         source_ids=[video_id],
         use_cache=False
     )
 
-    print(f"       Conflicts: {len(result.get('conflicts', []))}")
-    print(f"       Graph nodes: {len(result.get('graph', {}).get('nodes', []))}")
-    print(f"       Timeline events: {len(result.get('timeline', []))}")
+    log(f"       Conflicts: {len(result.get('conflicts', []))}")
+    log(f"       Graph nodes: {len(result.get('graph', {}).get('nodes', []))}")
+    log(f"       Timeline events: {len(result.get('timeline', []))}")
 
     if result.get('conflicts'):
-        print("  [OK] Analysis generated successfully")
+        log("  [OK] Analysis generated successfully")
         for conflict in result['conflicts'][:2]:
-            print(f"         - {conflict.get('topic', 'Unknown')}")
+            log(f"         - {conflict.get('topic', 'Unknown')}")
     else:
-        print("  [WARN] No conflicts found")
+        log("  [WARN] No conflicts found")
 
     if result.get('timeline'):
-        print("  [OK] Timeline generated")
+        log("  [OK] Timeline generated")
         for event in result['timeline'][:2]:
-            print(f"         - {event.get('title', 'Unknown')} at {event.get('time', 'N/A')}")
+            log(f"         - {event.get('title', 'Unknown')} at {event.get('time', 'N/A')}")
 
     return result
 
@@ -347,25 +527,25 @@ async def test_nebula_service(services: dict, video_id: str):
     """
     Phase 4: Test Nebula Service (Knowledge Graph)
     """
-    print("\n" + "=" * 60)
-    print("[Phase 4] Nebula Service (Knowledge Graph)")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("[Phase 4] Nebula Service (Knowledge Graph)")
+    log("=" * 60)
 
     nebula_service = services["nebula"]
 
-    print("  [INFO] Building knowledge graph...")
+    log("  [INFO] Building knowledge graph...")
     structure = await nebula_service.build_nebula_structure(source_ids=[video_id])
 
     nodes = structure.get("nodes", [])
     links = structure.get("links", [])
 
-    print(f"       Nodes: {len(nodes)}")
-    print(f"       Links: {len(links)}")
+    log(f"       Nodes: {len(nodes)}")
+    log(f"       Links: {len(links)}")
 
     if nodes:
-        print("  [OK] Knowledge graph built successfully")
+        log("  [OK] Knowledge graph built successfully")
         for node in nodes[:5]:
-            print(f"         - {node.get('name', 'Unknown')} ({node.get('category', 'general')})")
+            log(f"         - {node.get('name', 'Unknown')} ({node.get('category', 'general')})")
 
     return structure
 
@@ -374,26 +554,26 @@ async def test_creative_services(services: dict, video_id: str):
     """
     Phase 5: Test Creative Services (Debate & Story)
     """
-    print("\n" + "=" * 60)
-    print("[Phase 5] Creative Services (Debate & Story)")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("[Phase 5] Creative Services (Debate & Story)")
+    log("=" * 60)
 
     debate_service = services["debate"]
     story_service = services["story"]
 
     # Test Debate task creation
-    print("  [INFO] Testing Debate service...")
+    log("  [INFO] Testing Debate service...")
     debate_task_id = debate_service.create_task()
-    print(f"  [OK] Debate task created: {debate_task_id}")
+    log(f"  [OK] Debate task created: {debate_task_id}")
     status = debate_service.get_task_status(debate_task_id)
-    print(f"       Task status: {status.get('status', 'unknown')}")
+    log(f"       Task status: {status.get('status', 'unknown')}")
 
     # Test Story task creation
-    print("  [INFO] Testing Story service...")
+    log("  [INFO] Testing Story service...")
     story_task_id = story_service.create_task()
-    print(f"  [OK] Story task created: {story_task_id}")
+    log(f"  [OK] Story task created: {story_task_id}")
     story_status = story_service.get_task_status(story_task_id)
-    print(f"       Task status: {story_status.get('status', 'unknown')}")
+    log(f"       Task status: {story_status.get('status', 'unknown')}")
 
     return {
         "debate_task_id": debate_task_id,
@@ -405,13 +585,13 @@ async def test_chat_service(services: dict, video_id: str):
     """
     Phase 6: Test Chat Service (RAG-based conversation)
     """
-    print("\n" + "=" * 60)
-    print("[Phase 6] Chat Service (RAG)")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("[Phase 6] Chat Service (RAG)")
+    log("=" * 60)
 
     chat_service = services["chat"]
 
-    print("  [INFO] Testing RAG chat...")
+    log("  [INFO] Testing RAG chat...")
     result = await chat_service.chat_with_video(
         query="这个视频的主要内容是什么？",
         source_ids=[video_id],
@@ -421,109 +601,87 @@ async def test_chat_service(services: dict, video_id: str):
     content = result.get("content", "")
     references = result.get("references", [])
 
-    print(f"       Response length: {len(content)} chars")
-    print(f"       References found: {len(references)}")
+    log(f"       Response length: {len(content)} chars")
+    log(f"       References found: {len(references)}")
 
     if content:
         preview = content[:200] + "..." if len(content) > 200 else content
-        print(f"       Response preview: {preview}")
-        print("  [OK] Chat service working")
+        log(f"       Response preview: {preview}")
+        log("  [OK] Chat service working")
 
     if references:
-        print("  [OK] References returned")
+        log("  [OK] References returned")
         for ref in references[:3]:
-            print(f"         - Source: {ref.get('source_id', 'unknown')}")
+            log(f"         - Source: {ref.get('source_id', 'unknown')}")
 
     return result
 
 
-async def cleanup(services: dict):
-    """Clean up resources."""
-    print("\n" + "=" * 60)
-    print("Cleanup")
-    print("=" * 60)
-
-    session = services.get("session")
-    if session:
-        try:
-            await session.close()
-            print("  [OK] Database session closed")
-        except Exception as e:
-            print(f"  [WARN] Error closing session: {e}")
-
-    try:
-        await engine.dispose()
-        print("  [OK] Database engine disposed")
-    except Exception as e:
-        print(f"  [WARN] Error disposing engine: {e}")
-
-
 async def run_full_lifecycle_test():
     """Run the complete lifecycle test."""
 
-    print("\n" + "=" * 60)
-    print("Viewpoint Prism Full Lifecycle Integration Test")
-    print("=" * 60)
-    print("\n[INFO] Using mock services for ChromaDB-dependent features")
-    print("       (due to Windows ChromaDB compatibility issues)")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("Viewpoint Prism Full Lifecycle Integration Test")
+    log("=" * 60)
+    log("\n[INFO] Using mock services for ChromaDB-dependent features")
+    log("       (due to Windows ChromaDB compatibility issues)")
+    log("=" * 60)
 
     # Find test video
     video_path = find_test_video()
     if not video_path:
-        print("[ERROR] No test video found. Please add an MP4 file to the uploads directory.")
+        log("[ERROR] No test video found. Please add an MP4 file to the uploads directory.")
         return False
 
-    print(f"\nTest video: {video_path}")
-    print(f"Video size: {video_path.stat().st_size / (1024*1024):.1f} MB")
+    log(f"\nTest video: {video_path}")
+    log(f"Video size: {video_path.stat().st_size / (1024*1024):.1f} MB")
 
     video_id = None
-    try:
-        # Initialize all services
-        services = await init_services()
-
-        # Phase 2: Source Ingestion
-        video_id = await test_source_ingestion(services, video_path)
-
-        # Phase 3: Analysis Service
-        await test_analysis_service(services, video_id)
-
-        # Phase 4: Nebula Service
-        await test_nebula_service(services, video_id)
-
-        # Phase 5: Creative Services
-        await test_creative_services(services, video_id)
-
-        # Phase 6: Chat Service
-        await test_chat_service(services, video_id)
-
-        print("\n" + "=" * 60)
-        print("[SUCCESS] All lifecycle phases completed!")
-        print("=" * 60)
-        print(f"Video ID: {video_id}")
-        print("\nNote: This test uses mock services for features that depend")
-        print("on ChromaDB (vector store) due to Windows compatibility issues.")
-        print("Real functionality requires running on Linux/macOS or Docker.")
-        print("=" * 60)
-
-        return True
+    async with AsyncExitStack() as stack:
+        # 退出时按注册的逆序清理: 先关会话, 最后释放引擎
+        stack.push_async_callback(engine.dispose)
+        try:
+            # Initialize all services
+            services = await init_services()
+            stack.push_async_callback(services["session"].close)
+
+            # Phase 2: Source Ingestion
+            video_id = await test_source_ingestion(services, video_path)
+
+            # Phases 3/4/6 only depend on video_id, run them concurrently;
+            # each phase's report is buffered and written as one block
+            await asyncio.gather(
+                run_buffered(test_analysis_service(services, video_id)),
+                run_buffered(test_nebula_service(services, video_id)),
+                run_buffered(test_chat_service(services, video_id)),
+            )
+
+            # Phase 5: Creative Services
+            await test_creative_services(services, video_id)
+
+            log("\n" + "=" * 60)
+            log("[SUCCESS] All lifecycle phases completed!")
+            log("=" * 60)
+            log(f"Video ID: {video_id}")
+            log("\nNote: This test uses mock services for features that depend")
+            log("on ChromaDB (vector store) due to Windows compatibility issues.")
+            log("Real functionality requires running on Linux/macOS or Docker.")
+            log("=" * 60)
+
+            return True
 
-    except Exception as e:
-        print("\n" + "=" * 60)
-        print("[FAILED] Test Failed!")
-        print("=" * 60)
-        print(f"Error: {e}")
-        print("\nTraceback:")
-        traceback.print_exc()
-        print("=" * 60)
-
-        if video_id:
-            print(f"Video ID was created: {video_id}")
-        return False
+        except Exception as e:
+            log("\n" + "=" * 60)
+            log("[FAILED] Test Failed!")
+            log("=" * 60)
+            log(f"Error: {e}")
+            log("\nTraceback:")
+            log(traceback.format_exc().rstrip())
+            log("=" * 60)
 
-    finally:
-        if "services" in locals():
-            await cleanup(services)
+            if video_id:
+                log(f"Video ID was created: {video_id}")
+            return False
 
 
 def main():
@@ -532,11 +690,11 @@ def main():
         result = asyncio.run(run_full_lifecycle_test())
         sys.exit(0 if result else 1)
     except KeyboardInterrupt:
-        print("\n\nTest interrupted by user")
+        log("\n\nTest interrupted by user")
         sys.exit(1)
     except Exception as e:
-        print(f"\nFatal error: {e}")
-        traceback.print_exc()
+        log(f"\nFatal error: {e}")
+        log(traceback.format_exc().rstrip())
         sys.exit(1)
 
 
@@ -5,10 +5,32 @@ Tests the complete pipeline with REAL LLM calls via SophNet API.
 
 import sys
 import io
+import argparse
+import json
+import re
 import asyncio
+import bisect
+import hashlib
+import time
 import traceback
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# 提示词上下文按 token 预算装填; 无 tiktoken (或编码表无法下载) 时按字符数估算,
+# 对中文文本偏保守
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
 
 # Force UTF-8 encoding for Windows
 if sys.platform == "win32":
@@ -20,21 +42,175 @@ BACKEND_DIR = Path(__file__).parent.parent / "packages" / "backend"
 sys.path.insert(0, str(BACKEND_DIR))
 
 from test_config import find_test_video, CONFIG
+from json_stream import JSONStreamScanner, is_structured
+from app.core import get_settings
 from app.core.database import async_session, init_db, engine
 from app.models import Source, SourceStatus
 from app.modules.source.service import SourceService
 from app.modules.source.schemas import SourceCreate
 from app.modules.analysis.service import AnalysisService
 from app.modules.chat.service import ChatService
-from app.shared.perception import get_sophnet_service
+from app.shared.perception import SophNetService, get_sophnet_service, close_sophnet_service
 from app.shared.storage import get_vector_store
 
+import numpy as np
+
+try:
+    from blake3 import blake3 as _key_hash
+except ImportError:
+    _key_hash = hashlib.blake2b
+
+
+# 并发阶段的输出先写入各自的缓冲区, 结束时一次性写出, 避免交错
+_log_buffer: ContextVar[list | None] = ContextVar("_log_buffer", default=None)
+
+
+def log(text: str = ""):
+    """Emit a line of output, buffered while running inside run_buffered()."""
+    buffer = _log_buffer.get()
+    if buffer is not None:
+        buffer.append(text)
+    else:
+        sys.stdout.write(text + "\n")
+
+
+async def run_buffered(coro):
+    """Run a test phase, writing all of its output in a single write at the end."""
+    buffer = []
+    _log_buffer.set(buffer)
+    try:
+        return await coro
+    finally:
+        _log_buffer.set(None)
+        sys.stdout.write("\n".join(buffer) + "\n")
+        sys.stdout.flush()
+
+
+# 分析提示词: 静态的任务说明与 JSON 格式要求放在 system 消息中, 动态的视频内容放在
+# 最后的 user 消息里, 三类请求各自拥有稳定前缀, 便于服务端的前缀缓存命中
+CONFLICT_SYSTEM = """分析以下视频内容，找出主要观点冲突或分歧。
+
+请以JSON格式返回冲突列表，每个冲突包含：
+- topic: 冲突主题
+- severity: 严重程度 (critical/warning/info)
+- viewpoint_a: 甲方观点 (包含 source_id, title, description)
+- viewpoint_b: 乙方观点 (包含 source_id, title, description)
+- verdict: 你的判断
+
+请返回JSON数组格式。如果没有明显冲突，返回空数组 []。"""
+
+GRAPH_SYSTEM = """从以下内容中提取实体和关系，构建知识图谱。
+
+请提取所有实体（人物、地点、物品、事件等）和它们之间的关系。
+以JSON格式返回：
+- nodes: 实体列表 (id, name, category)
+- links: 关系列表 (source, target, relation)
+
+请返回JSON对象。如果无法提取，返回 {"nodes": [], "links": []}。"""
+
+TIMELINE_SYSTEM = """从以下内容中提取时间线事件。
+
+请提取关键事件，按时间顺序排列。
+以JSON格式返回事件列表，每个事件包含：
+- id: 事件ID
+- time: 格式化时间 (MM:SS)
+- timestamp: 时间戳(秒)
+- title: 事件标题
+- description: 事件描述
+- is_key_moment: 是否为关键时刻
+- event_type: 事件类型 (STORY/COMBAT/EXPLORE)
+
+请返回JSON数组。如果没有事件，返回空数组 []。"""
+
+LLM_MODEL = "DeepSeek-V3.2"
+
+ANALYSIS_TOKEN_BUDGET = 8000
+CHAT_TOKEN_BUDGET = 3000
+
+# 语义缓存: 同一组视频上的近义提问 (余弦相似度超过阈值) 直接复用已有回答
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_SIZE = 128
+
+# 提示词模板的指纹: 模板一改, 旧的缓存键自然失效
+_TEMPLATE_SHA = hashlib.sha256(
+    "\0".join((CONFLICT_SYSTEM, GRAPH_SYSTEM, TIMELINE_SYSTEM)).encode("utf-8")
+).hexdigest()[:16]
+
+
+@lru_cache(maxsize=256)
+def _canonical_sids(sids: frozenset) -> str:
+    """Order-independent form of a source id set; memoized since the same set is keyed repeatedly."""
+    return ":".join(sorted(sids))
+
+
+# LLM 常把 JSON 包在 ```json 代码块里或夹杂说明文字, 解析失败时依次尝试提取
+_JSON_FENCE = re.compile(r"```json\s*([\s\S]*?)\s*```")
+_JSON_ARRAY = re.compile(r"\[[\s\S]*\]")
+_JSON_OBJECT = re.compile(r"\{[\s\S]*\}")
+
+
+def _extract_json(response: str, want_array: bool = True):
+    """
+    Parse an LLM reply as JSON: raw text first, then a ```json fence, then the
+    outermost bare array/object. Returns None if nothing parses.
+    """
+    candidates = [response]
+    fence = _JSON_FENCE.search(response)
+    if fence:
+        candidates.append(fence.group(1))
+    bare = (_JSON_ARRAY if want_array else _JSON_OBJECT).search(response)
+    if bare:
+        candidates.append(bare.group(0))
+    for candidate in candidates:
+        try:
+            return json_loads(candidate)
+        except ValueError:  # json / orjson JSONDecodeError
+            continue
+    return None
+
+
+def _count_tokens(doc: Dict) -> int:
+    """Token count of a document's text, memoized on the document dict."""
+    n = doc.get("_tokens")
+    if n is None:
+        text = doc.get("text", "") or ""
+        n = len(_ENCODING.encode(text)) if _ENCODING else len(text)
+        doc["_tokens"] = n
+    return n
+
+
+def _pack_to_budget(docs: List[Dict], budget_tokens: int, score=None) -> List[Dict]:
+    """
+    Greedily keep the highest-scoring documents (default: longest text) that
+    fit in budget_tokens; the kept documents stay in their original order.
+    """
+    score = score or (lambda d: len(d.get("text", "") or ""))
+    chosen = []
+    used = 0
+    for i in sorted(range(len(docs)), key=lambda i: score(docs[i]), reverse=True):
+        n = _count_tokens(docs[i])
+        if used + n <= budget_tokens:
+            chosen.append(i)
+            used += n
+    return [docs[i] for i in sorted(chosen)]
+
+
+def _bigram_overlap(query: str):
+    """Relevance scorer: how many of the query's character bigrams a document contains."""
+    q = query.lower()
+    bigrams = {q[i:i + 2] for i in range(len(q) - 1)} or {q}
+    return lambda d: sum(1 for b in bigrams if b in (d.get("text", "") or "").lower())
+
 
 class MemoryVectorStore:
     """In-memory vector store fallback for when ChromaDB fails."""
 
     def __init__(self):
         self.documents = {}
+        # 每个来源的小写文本以 \x00 拼接成一个字符串, 子串搜索变成一次 str.find;
+        # _offsets[sid][i] 是第 i 个文档在拼接串中的起始位置
+        self._joined = {}
+        self._offsets = {}
 
     def add_video_data(self, source_id, transcripts, visual_descriptions, video_title):
         self.documents[source_id] = []
@@ -50,26 +226,51 @@ class MemoryVectorStore:
                 "text": v.get("description", ""),
                 "metadata": {"source_id": source_id, "type": "visual", "start": v.get("timestamp", 0), "video_title": video_title}
             })
+
+        # 偏移量按小写后的文本计算 (个别字符小写后长度会变化)
+        lowered = [(doc["text"] or "").lower() for doc in self.documents[source_id]]
+        offsets = []
+        pos = 0
+        for text in lowered:
+            offsets.append(pos)
+            pos += len(text) + 1
+        self._offsets[source_id] = offsets
+        self._joined[source_id] = "\x00".join(lowered)
         return len(self.documents[source_id])
 
     def get_source_documents(self, source_id):
         return self.documents.get(source_id, [])
 
+    def get_documents_for_sources(self, source_ids):
+        return {sid: self.documents.get(sid, []) for sid in source_ids}
+
     def search(self, query, source_ids=None, n_results=10, doc_type=None):
+        q_lc = query.lower()
+        if "\x00" in q_lc:
+            return []
         results = []
         for sid, docs in self.documents.items():
             if source_ids and sid not in source_ids:
                 continue
-            for doc in docs:
-                if query.lower() in doc.get("text", "").lower():
-                    results.append(doc)
-                    if len(results) >= n_results:
-                        return results
+            joined = self._joined[sid]
+            offsets = self._offsets[sid]
+            pos = joined.find(q_lc)
+            while pos != -1:
+                idx = bisect.bisect_right(offsets, pos) - 1
+                results.append(docs[idx])
+                if len(results) >= n_results:
+                    return results
+                # 每个文档只命中一次, 从下一个文档开头继续查找
+                if idx + 1 >= len(offsets):
+                    break
+                pos = joined.find(q_lc, offsets[idx + 1])
         return results
 
     def delete_source(self, source_id):
         if source_id in self.documents:
             del self.documents[source_id]
+            del self._joined[source_id]
+            del self._offsets[source_id]
 
     def collection(self):
         class MockCollection:
@@ -81,232 +282,183 @@ class MemoryVectorStore:
 class RealAnalysisService:
     """AnalysisService with real LLM calls and fallback vector store."""
 
-    def __init__(self):
-        print("  [INFO] Initializing RealAnalysisService...")
+    def __init__(self, sophnet: Optional[SophNetService] = None):
+        log("  [INFO] Initializing RealAnalysisService...")
         # Try to get real services, fallback to memory if needed
         self._use_real_vector = True
         self._use_real_llm = True
 
-        try:
-            self.sophnet = get_sophnet_service()
-            print("  [OK] SophNet service initialized (REAL)")
-        except Exception as e:
-            print(f"  [WARN] Failed to initialize SophNet: {e}")
+        self.sophnet = sophnet
+        if sophnet is not None:
+            log("  [OK] SophNet service attached (REAL, shared connection pool)")
+        else:
+            log("  [WARN] SophNet unavailable, using mock responses")
             self._use_real_llm = False
 
         try:
             self.vector_store = get_vector_store()
-            print("  [OK] VectorStore initialized (REAL)")
+            log("  [OK] VectorStore initialized (REAL)")
         except Exception as e:
-            print(f"  [WARN] ChromaDB failed: {e}")
-            print("  [INFO] Using memory fallback for vector store")
+            log(f"  [WARN] ChromaDB failed: {e}")
+            log("  [INFO] Using memory fallback for vector store")
             self.vector_store = MemoryVectorStore()
             self._use_real_vector = False
 
         self._cache = {}
+        # 连接探测每个实例只做一次, 并发调用方共享同一次探测结果
+        self._llm_ready_lock = asyncio.Lock()
+        self._llm_checked = False
+
+    async def _ensure_llm_ready(self):
+        """Probe the LLM once; on failure fall back to mock responses."""
+        if not self._use_real_llm or self._llm_checked:
+            return
+        async with self._llm_ready_lock:
+            if self._llm_checked:
+                return
+            log("  [INFO] Testing SophNet LLM connection...")
+            try:
+                test_response = await self.sophnet.chat(
+                    messages=[{"role": "user", "content": "你好，测试连接"}],
+                    model=LLM_MODEL,
+                    use_cache=False,  # 连通性探测必须真正访问网络
+                )
+                log(f"  [OK] LLM connection successful! Response: {test_response[:50]}...")
+            except Exception as e:
+                log(f"  [WARN] LLM connection failed: {e}")
+                self._use_real_llm = False
+            self._llm_checked = True
 
-    async def _call_llm(self, prompt: str) -> str:
-        """Call LLM with prompt."""
-        if self._use_real_llm:
-            response = await self.sophnet.chat(
-                messages=[{"role": "user", "content": prompt}],
-                model="DeepSeek-V3.2",
-            )
-            return response
-        return "[MOCK] 这是一个模拟回复。"
+    def _combined_text(self, source_ids: List[str]) -> str:
+        """Join the given sources' documents into one prompt context within the token budget."""
+        source_docs = []
+        # 空文本不占预算, 也不在提示词里留下多余空格
+        for docs in self.vector_store.get_documents_for_sources(source_ids).values():
+            source_docs.extend(d for d in docs if d.get("text"))
+        packed = _pack_to_budget(source_docs, ANALYSIS_TOKEN_BUDGET)
+        return " ".join(d["text"] for d in packed)
+
+    async def _call_llm_json(self, system: str, user: str, want_array: bool = True) -> Any:
+        """
+        Stream the reply for a static system prompt plus dynamic user content and
+        parse the first top-level JSON array/object as soon as its bracket closes.
+
+        The stream is still drained so the complete reply lands in the LLM cache;
+        if no streamed value parses, the full text goes through _extract_json.
+        """
+        if not self._use_real_llm:
+            return _extract_json("[MOCK] 这是一个模拟回复。", want_array)
+
+        started = time.perf_counter()
+        wanted = list if want_array else dict
+        scanner = JSONStreamScanner(accept=lambda value: isinstance(value, wanted) and is_structured(value))
+        async for chunk in self.sophnet.chat_stream(
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            model=LLM_MODEL,
+            # 确定性输出, 命中 LLM 响应磁盘缓存时与重新请求结果一致
+            temperature=0,
+        ):
+            was_done = scanner.done
+            if scanner.feed(chunk) and not was_done:
+                log(f"  [INFO] JSON ready after {time.perf_counter() - started:.1f}s, still receiving...")
+
+        if scanner.done:
+            return scanner.value
+        return _extract_json(scanner.text, want_array)
 
     def _get_cache_key(self, operation: str, source_ids: List[str]) -> str:
-        import hashlib
-        content = f"{operation}:{':'.join(sorted(source_ids))}"
-        return hashlib.md5(content.encode()).hexdigest()
-
-    async def generate_conflicts(self, source_ids: List[str]) -> List[Dict]:
+        """Cache identity: operation, sources, model and prompt template version."""
+        canonical = json.dumps(
+            {"op": operation, "sids": _canonical_sids(frozenset(source_ids)), "model": LLM_MODEL, "tpl": _TEMPLATE_SHA},
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+        return _key_hash(canonical.encode("utf-8")).hexdigest()
+
+    async def generate_conflicts(self, source_ids: List[str], combined_text: Optional[str] = None) -> List[Dict]:
         cache_key = self._get_cache_key("conflicts", source_ids)
         if cache_key in self._cache:
             return self._cache[cache_key]
 
-        # Get documents from vector store
-        source_docs = []
-        for sid in source_ids:
-            docs = self.vector_store.get_source_documents(sid)
-            source_docs.extend(docs)
-
-        # Build combined text
-        combined_text = " ".join([d.get("text", "") for d in source_docs[:10]])
+        if combined_text is None:
+            combined_text = self._combined_text(source_ids)
 
-        prompt = f"""分析以下视频内容，找出主要观点冲突或分歧：
-
-{combined_text if combined_text else "这是一段测试视频内容的描述。请分析其中可能存在的观点冲突。"}
-
-请以JSON格式返回冲突列表，每个冲突包含：
-- topic: 冲突主题
-- severity: 严重程度 (critical/warning/info)
-- viewpoint_a: 甲方观点 (包含 source_id, title, description)
-- viewpoint_b: 乙方观点 (包含 source_id, title, description)
-- verdict: 你的判断
-
-请返回JSON数组格式。如果没有明显冲突，返回空数组 []。"""
+        # 没有任何文档时 LLM 只能针对占位文字作答, 直接返回空结果
+        if not combined_text.strip():
+            log("  [INFO] No documents, skipping LLM call for conflict analysis")
+            conflicts = []
+            self._cache[cache_key] = conflicts
+            return conflicts
 
-        print("  [INFO] Calling LLM for conflict analysis...")
-        response = await self._call_llm(prompt)
+        user = f"视频内容：\n{combined_text}"
 
-        import json
-        try:
-            # Try to parse as-is first
-            conflicts = json.loads(response)
+        log("  [INFO] Calling LLM for conflict analysis...")
+        conflicts = await self._call_llm_json(CONFLICT_SYSTEM, user, want_array=True)
+        if conflicts is None:
+            log(f"  [WARN] No parseable JSON in conflict response")
+            conflicts = []
+        else:
             if not isinstance(conflicts, list):
                 conflicts = [conflicts]
-            self._cache[cache_key] = conflicts
-            print(f"  [OK] Found {len(conflicts)} conflicts")
-        except json.JSONDecodeError:
-            # Try to extract JSON from markdown code block
-            import re
-            json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response)
-            if json_match:
-                json_str = json_match.group(1).strip()
-                try:
-                    conflicts = json.loads(json_str)
-                    if not isinstance(conflicts, list):
-                        conflicts = [conflicts]
-                    self._cache[cache_key] = conflicts
-                    print(f"  [OK] Found {len(conflicts)} conflicts (from markdown)")
-                except json.JSONDecodeError:
-                    print(f"  [WARN] Failed to parse extracted JSON")
-                    conflicts = []
-                    self._cache[cache_key] = conflicts
-            else:
-                # Try to find JSON array in response
-                json_match = re.search(r'\[[\s\S]*?\]', response)
-                if json_match:
-                    try:
-                        conflicts = json.loads(json_match.group(0))
-                        if not isinstance(conflicts, list):
-                            conflicts = [conflicts]
-                        self._cache[cache_key] = conflicts
-                        print(f"  [OK] Found {len(conflicts)} conflicts (extracted)")
-                    except json.JSONDecodeError:
-                        print(f"  [WARN] Failed to parse extracted array")
-                        conflicts = []
-                        self._cache[cache_key] = conflicts
-                else:
-                    print(f"  [WARN] No JSON found in response")
-                    conflicts = []
-                    self._cache[cache_key] = conflicts
+            log(f"  [OK] Found {len(conflicts)} conflicts")
+        self._cache[cache_key] = conflicts
 
         return conflicts
 
-    async def generate_graph(self, source_ids: List[str]) -> Dict:
+    async def generate_graph(self, source_ids: List[str], combined_text: Optional[str] = None) -> Dict:
         cache_key = self._get_cache_key("graph", source_ids)
         if cache_key in self._cache:
             return self._cache[cache_key]
 
-        source_docs = []
-        for sid in source_ids:
-            docs = self.vector_store.get_source_documents(sid)
-            source_docs.extend(docs)
-
-        combined_text = " ".join([d.get("text", "") for d in source_docs[:10]])
-
-        prompt = f"""从以下内容中提取实体和关系，构建知识图谱：
-
-{combined_text if combined_text else "这是一段视频内容的描述。请提取其中的实体（人物、地点、物品、事件等）和它们之间的关系。"}
-
-请提取所有实体和它们之间的关系。
-以JSON格式返回：
-- nodes: 实体列表 (id, name, category)
-- links: 关系列表 (source, target, relation)
+        if combined_text is None:
+            combined_text = self._combined_text(source_ids)
 
-请返回JSON对象。如果无法提取，返回 {{"nodes": [], "links": []}}。"""
+        if not combined_text.strip():
+            log("  [INFO] No documents, skipping LLM call for knowledge graph")
+            graph = {"nodes": [], "links": []}
+            self._cache[cache_key] = graph
+            return graph
 
-        print("  [INFO] Calling LLM for knowledge graph...")
-        response = await self._call_llm(prompt)
+        user = f"视频内容：\n{combined_text}"
 
-        import json
-        try:
-            graph = json.loads(response)
-            if "nodes" not in graph:
-                graph = {"nodes": [], "links": []}
-            self._cache[cache_key] = graph
-            print(f"  [OK] Generated graph with {len(graph.get('nodes', []))} nodes")
-        except json.JSONDecodeError:
-            print(f"  [WARN] Failed to parse graph response")
+        log("  [INFO] Calling LLM for knowledge graph...")
+        graph = await self._call_llm_json(GRAPH_SYSTEM, user, want_array=False)
+        if not isinstance(graph, dict) or "nodes" not in graph:
+            log(f"  [WARN] Failed to parse graph response")
             graph = {"nodes": [], "links": []}
-            self._cache[cache_key] = graph
+        else:
+            log(f"  [OK] Generated graph with {len(graph.get('nodes', []))} nodes")
+        self._cache[cache_key] = graph
 
         return graph
 
-    async def generate_timeline(self, source_ids: List[str]) -> Dict:
+    async def generate_timeline(self, source_ids: List[str], combined_text: Optional[str] = None) -> Dict:
         cache_key = self._get_cache_key("timeline", source_ids)
         if cache_key in self._cache:
             return self._cache[cache_key]
 
-        source_docs = []
-        for sid in source_ids:
-            docs = self.vector_store.get_source_documents(sid)
-            source_docs.extend(docs)
+        if combined_text is None:
+            combined_text = self._combined_text(source_ids)
 
-        combined_text = " ".join([d.get("text", "") for d in source_docs[:10]])
-
-        prompt = f"""从以下内容中提取时间线事件：
-
-{combined_text if combined_text else "这是一段视频内容的描述。请提取关键事件，按时间顺序排列。"}
-
-请提取关键事件，按时间顺序排列。
-以JSON格式返回事件列表，每个事件包含：
-- id: 事件ID
-- time: 格式化时间 (MM:SS)
-- timestamp: 时间戳(秒)
-- title: 事件标题
-- description: 事件描述
-- is_key_moment: 是否为关键时刻
-- event_type: 事件类型 (STORY/COMBAT/EXPLORE)
-
-请返回JSON数组。如果没有事件，返回空数组 []。"""
+        if not combined_text.strip():
+            log("  [INFO] No documents, skipping LLM call for timeline")
+            timeline = []
+            self._cache[cache_key] = timeline
+            return {"timeline": timeline}
 
-        print("  [INFO] Calling LLM for timeline...")
-        response = await self._call_llm(prompt)
+        user = f"视频内容：\n{combined_text}"
 
-        import json
-        try:
-            timeline = json.loads(response)
-            if not isinstance(timeline, list):
-                timeline = []
-            self._cache[cache_key] = timeline
-            print(f"  [OK] Generated timeline with {len(timeline)} events")
-        except json.JSONDecodeError:
-            # Try to extract from markdown
-            import re
-            json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response)
-            if json_match:
-                json_str = json_match.group(1).strip()
-                try:
-                    timeline = json.loads(json_str)
-                    if not isinstance(timeline, list):
-                        timeline = []
-                    self._cache[cache_key] = timeline
-                    print(f"  [OK] Generated timeline with {len(timeline)} events (from markdown)")
-                except json.JSONDecodeError:
-                    print(f"  [WARN] Failed to parse timeline JSON")
-                    timeline = []
-                    self._cache[cache_key] = timeline
-            else:
-                # Try to find array
-                json_match = re.search(r'\[[\s\S]*?\]', response)
-                if json_match:
-                    try:
-                        timeline = json.loads(json_match.group(0))
-                        if not isinstance(timeline, list):
-                            timeline = []
-                        self._cache[cache_key] = timeline
-                        print(f"  [OK] Generated timeline with {len(timeline)} events (extracted)")
-                    except json.JSONDecodeError:
-                        print(f"  [WARN] Failed to parse timeline array")
-                        timeline = []
-                        self._cache[cache_key] = timeline
-                else:
-                    print(f"  [WARN] No timeline JSON found")
-                    timeline = []
-                    self._cache[cache_key] = timeline
+        log("  [INFO] Calling LLM for timeline...")
+        timeline = await self._call_llm_json(TIMELINE_SYSTEM, user, want_array=True)
+        if not isinstance(timeline, list):
+            log(f"  [WARN] No timeline JSON found")
+            timeline = []
+        else:
+            log(f"  [OK] Generated timeline with {len(timeline)} events")
+        self._cache[cache_key] = timeline
 
         return {"timeline": timeline}
 
@@ -314,24 +466,17 @@ class RealAnalysisService:
         if not use_cache:
             self._cache.clear()
 
-        print("  [INFO] Generating complete analysis with REAL LLM...")
+        log("  [INFO] Generating complete analysis with REAL LLM...")
 
-        # Test LLM connection first
-        if self._use_real_llm:
-            print("  [INFO] Testing SophNet LLM connection...")
-            try:
-                test_response = await self.sophnet.chat(
-                    messages=[{"role": "user", "content": "你好，测试连接"}],
-                    model="DeepSeek-V3.2",
-                )
-                print(f"  [OK] LLM connection successful! Response: {test_response[:50]}...")
-            except Exception as e:
-                print(f"  [WARN] LLM connection failed: {e}")
-                self._use_real_llm = False
+        await self._ensure_llm_ready()
 
-        conflicts = await self.generate_conflicts(source_ids)
-        graph = await self.generate_graph(source_ids)
-        timeline_result = await self.generate_timeline(source_ids)
+        # 三个分析互不依赖: 文档只取一次, 三次 LLM 调用并发执行
+        combined_text = self._combined_text(source_ids)
+        conflicts, graph, timeline_result = await asyncio.gather(
+            self.generate_conflicts(source_ids, combined_text),
+            self.generate_graph(source_ids, combined_text),
+            self.generate_timeline(source_ids, combined_text),
+        )
 
         return {
             "conflicts": conflicts,
@@ -343,39 +488,81 @@ class RealAnalysisService:
 class RealChatService:
     """ChatService with real LLM calls."""
 
-    def __init__(self):
-        print("  [INFO] Initializing RealChatService...")
+    def __init__(self, sophnet: Optional[SophNetService] = None):
+        log("  [INFO] Initializing RealChatService...")
 
-        try:
-            self.sophnet = get_sophnet_service()
-            self._use_real_llm = True
-            print("  [OK] SophNet service initialized (REAL)")
-        except Exception as e:
-            print(f"  [WARN] Failed to initialize SophNet: {e}")
-            self._use_real_llm = False
+        self.sophnet = sophnet
+        self._use_real_llm = sophnet is not None
+        if sophnet is not None:
+            log("  [OK] SophNet service attached (REAL, shared connection pool)")
+        else:
+            log("  [WARN] SophNet unavailable, using mock responses")
 
         try:
             self.vector_store = get_vector_store()
-            print("  [OK] VectorStore initialized (REAL)")
+            log("  [OK] VectorStore initialized (REAL)")
             self._use_real_vector = True
         except Exception as e:
-            print(f"  [WARN] ChromaDB failed: {e}")
-            print("  [INFO] Using memory fallback for vector store")
+            log(f"  [WARN] ChromaDB failed: {e}")
+            log("  [INFO] Using memory fallback for vector store")
             self.vector_store = MemoryVectorStore()
             self._use_real_vector = False
 
+        # (source signature, query) -> (unit query embedding, result), LRU order
+        self._semantic_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def _embed_query(self, query: str) -> Optional[np.ndarray]:
+        """Unit-length query embedding from the vector store's model, or None if unavailable."""
+        embed = getattr(self.vector_store, "embed_query", None)
+        if embed is None:
+            return None
+        vector = np.asarray(embed(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def _semantic_lookup(self, signature: tuple, embedding: np.ndarray) -> Optional[Dict]:
+        """Return the cached result of the most similar earlier query, if close enough."""
+        keys = [key for key in self._semantic_cache if key[0] == signature]
+        if not keys:
+            return None
+        matrix = np.stack([self._semantic_cache[key][0] for key in keys])
+        sims = matrix @ embedding
+        best = int(np.argmax(sims))
+        if sims[best] < SEMANTIC_CACHE_THRESHOLD:
+            return None
+        self._semantic_cache.move_to_end(keys[best])
+        log(f"  [OK] Served from semantic cache (similarity {sims[best]:.3f})")
+        return {**self._semantic_cache[keys[best]][1], "from_semantic_cache": True}
+
+    def _semantic_store(self, signature: tuple, query: str, embedding: np.ndarray, result: Dict):
+        """Remember a fresh LLM answer, evicting the least recently used entry past the cap."""
+        self._semantic_cache[(signature, query)] = (embedding, result)
+        self._semantic_cache.move_to_end((signature, query))
+        while len(self._semantic_cache) > SEMANTIC_CACHE_SIZE:
+            self._semantic_cache.popitem(last=False)
+
     async def chat_with_video(self, query: str, source_ids: List[str], n_results: int = 10) -> Dict:
-        print(f"  [INFO] Searching for: '{query}'")
+        log(f"  [INFO] Searching for: '{query}'")
 
-        # Get documents from vector store
+        signature = tuple(sorted(source_ids))
+        embedding = self._embed_query(query)
+        if embedding is not None:
+            cached = self._semantic_lookup(signature, embedding)
+            if cached is not None:
+                return cached
+
+        # Get documents from vector store, keeping the most query-relevant ones that fit the budget
         results = []
-        for sid in source_ids:
-            docs = self.vector_store.get_source_documents(sid)
-            results.extend(docs)
+        for docs in self.vector_store.get_documents_for_sources(source_ids).values():
+            results.extend(d for d in docs if d.get("text"))
+        results = _pack_to_budget(results, CHAT_TOKEN_BUDGET, score=_bigram_overlap(query))
+        if not results:
+            log("  [INFO] No documents, skipping LLM call")
+            return {"content": "没有找到相关的视频内容。", "references": []}
 
         # Build context
         context_parts = []
-        for i, r in enumerate(results[:5], 1):
+        for i, r in enumerate(results, 1):
             metadata = r.get("metadata", {})
             source_id = metadata.get("source_id", "unknown")
             start_time = metadata.get("start", 0)
@@ -384,7 +571,7 @@ class RealChatService:
 
             context_parts.append(f"[{i}] [{video_title} {self._format_timestamp(start_time)}]\n{text}")
 
-        context = "\n\n".join(context_parts) if context_parts else "没有找到相关的视频内容。"
+        context = "\n\n".join(context_parts)
 
         prompt = f"""根据以下视频内容回答用户的问题。如果内容不相关，请说明。
 
@@ -397,7 +584,7 @@ class RealChatService:
 请给出回答，并在引用相关片段时使用 [视频标题 MM:SS] 格式。"""
 
         if self._use_real_llm:
-            print("  [INFO] Calling LLM for chat response...")
+            log("  [INFO] Calling LLM for chat response...")
             response = await self.sophnet.chat(
                 messages=[{"role": "user", "content": prompt}],
                 model="DeepSeek-V3.2",
@@ -411,10 +598,13 @@ class RealChatService:
                 "timestamp": r.get("metadata", {}).get("start", 0),
                 "text": r.get("text", "")[:200],
             }
-            for r in results[:5]
+            for r in results
         ]
 
-        return {"content": response, "references": references}
+        result = {"content": response, "references": references}
+        if embedding is not None and self._use_real_llm:
+            self._semantic_store(signature, query, embedding, result)
+        return result
 
     def _format_timestamp(self, seconds: float) -> str:
         if seconds is None or seconds < 0:
@@ -426,24 +616,31 @@ class RealChatService:
 
 async def init_services():
     """Initialize all services."""
-    print("\n" + "=" * 60)
-    print("[Phase 1] Initializing Services (REAL)")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("[Phase 1] Initializing Services (REAL)")
+    log("=" * 60)
 
     # Initialize database
     await init_db()
-    print("  [OK] Database initialized")
+    log("  [OK] Database initialized")
 
     # Get database session
     session = async_session()
 
     # Initialize SourceService (real DB)
     source_service = SourceService(session)
-    print("  [OK] SourceService initialized (real DB)")
+    log("  [OK] SourceService initialized (real DB)")
 
-    # Initialize services with real LLM
-    analysis_service = RealAnalysisService()
-    chat_service = RealChatService()
+    # Initialize services with real LLM; both share one SophNetService, i.e. one
+    # pooled (HTTP/2 when h2 is installed) client and its keep-alive connections
+    try:
+        sophnet = get_sophnet_service()
+        log("  [OK] SophNet service initialized (REAL)")
+    except Exception as e:
+        log(f"  [WARN] Failed to initialize SophNet: {e}")
+        sophnet = None
+    analysis_service = RealAnalysisService(sophnet)
+    chat_service = RealChatService(sophnet)
 
     return {
         "session": session,
@@ -455,9 +652,9 @@ async def init_services():
 
 async def test_source_ingestion(services: dict, video_path: Path) -> str:
     """Phase 2: Test Source Ingestion."""
-    print("\n" + "=" * 60)
-    print("[Phase 2] Source Ingestion (Real DB)")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("[Phase 2] Source Ingestion (Real DB)")
+    log("=" * 60)
 
     source_service = services["source"]
     session = services["session"]
@@ -475,60 +672,60 @@ async def test_source_ingestion(services: dict, video_path: Path) -> str:
     )
 
     await session.commit()
-    print(f"  [OK] Source created: {source.id}")
-    print(f"       Title: {source.title}")
-    print(f"       Status: {source.status}")
+    log(f"  [OK] Source created: {source.id}")
+    log(f"       Title: {source.title}")
+    log(f"       Status: {source.status}")
 
     retrieved = await source_service.get_source(source.id)
     assert retrieved is not None, "Failed to retrieve created source"
-    print(f"  [OK] Source retrieval verified")
+    log(f"  [OK] Source retrieval verified")
 
     return source.id
 
 
 async def test_analysis_with_real_llm(services: dict, video_id: str):
     """Phase 3: Test Analysis with REAL LLM."""
-    print("\n" + "=" * 60)
-    print("[Phase 3] Analysis Service (REAL LLM)")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("[Phase 3] Analysis Service (REAL LLM)")
+    log("=" * 60)
 
     analysis_service = services["analysis"]
 
-    print("\n  [INFO] Testing SophNet LLM API...")
-    print("  [INFO] This will make real API calls to the LLM service.")
+    log("\n  [INFO] Testing SophNet LLM API...")
+    log("  [INFO] This will make real API calls to the LLM service.")
 
     result = await analysis_service.generate_analysis([video_id])
 
-    print(f"\n  Results:")
-    print(f"       Conflicts: {len(result.get('conflicts', []))}")
-    print(f"       Graph nodes: {len(result.get('graph', {}).get('nodes', []))}")
-    print(f"       Timeline events: {len(result.get('timeline', []))}")
+    log(f"\n  Results:")
+    log(f"       Conflicts: {len(result.get('conflicts', []))}")
+    log(f"       Graph nodes: {len(result.get('graph', {}).get('nodes', []))}")
+    log(f"       Timeline events: {len(result.get('timeline', []))}")
 
     if result.get('conflicts'):
-        print("\n  [OK] LLM analysis successful!")
+        log("\n  [OK] LLM analysis successful!")
         for conflict in result['conflicts'][:2]:
             topic = conflict.get('topic', 'Unknown')
-            print(f"         - {topic}")
+            log(f"         - {topic}")
 
     if result.get('timeline'):
-        print("\n  [OK] Timeline generated!")
+        log("\n  [OK] Timeline generated!")
         for event in result['timeline'][:2]:
             title = event.get('title', 'Unknown')
             time = event.get('time', 'N/A')
-            print(f"         - {title} at {time}")
+            log(f"         - {title} at {time}")
 
     return result
 
 
 async def test_chat_with_real_llm(services: dict, video_id: str):
     """Phase 4: Test Chat with REAL LLM."""
-    print("\n" + "=" * 60)
-    print("[Phase 4] Chat Service (REAL LLM + Vector)")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("[Phase 4] Chat Service (REAL LLM + Vector)")
+    log("=" * 60)
 
     chat_service = services["chat"]
 
-    print("\n  [INFO] Testing RAG chat with real LLM...")
+    log("\n  [INFO] Testing RAG chat with real LLM...")
 
     result = await chat_service.chat_with_video(
         query="这个视频的主要内容和观点是什么？",
@@ -539,61 +736,76 @@ async def test_chat_with_real_llm(services: dict, video_id: str):
     content = result.get("content", "")
     references = result.get("references", [])
 
-    print(f"\n  Response length: {len(content)} chars")
-    print(f"  References found: {len(references)}")
+    log(f"\n  Response length: {len(content)} chars")
+    log(f"  References found: {len(references)}")
 
     if content:
         preview = content[:300] + "..." if len(content) > 300 else content
-        print(f"\n  [OK] Chat response preview:")
-        print(f"  {preview}")
+        log(f"\n  [OK] Chat response preview:")
+        log(f"  {preview}")
     else:
-        print("\n  [WARN] No response content")
+        log("\n  [WARN] No response content")
+
+    # 近义改写的问题应由语义缓存直接返回, 不再调用 LLM
+    paraphrase = await chat_service.chat_with_video(
+        query="这个视频主要讲了哪些内容和观点？",
+        source_ids=[video_id],
+        n_results=5
+    )
+    hit = paraphrase.get("from_semantic_cache", False)
+    log(f"\n  [INFO] Paraphrased query served from semantic cache: {hit}")
 
     return result
 
 
 async def cleanup(services: dict):
     """Clean up resources."""
-    print("\n" + "=" * 60)
-    print("Cleanup")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("Cleanup")
+    log("=" * 60)
 
     session = services.get("session")
     if session:
         try:
             await session.close()
-            print("  [OK] Database session closed")
+            log("  [OK] Database session closed")
         except Exception as e:
-            print(f"  [WARN] Error closing session: {e}")
+            log(f"  [WARN] Error closing session: {e}")
 
     try:
         await engine.dispose()
-        print("  [OK] Database engine disposed")
+        log("  [OK] Database engine disposed")
     except Exception as e:
-        print(f"  [WARN] Error disposing engine: {e}")
+        log(f"  [WARN] Error disposing engine: {e}")
+
+    try:
+        await close_sophnet_service()
+        log("  [OK] SophNet connection pool closed")
+    except Exception as e:
+        log(f"  [WARN] Error closing SophNet client: {e}")
 
 
 async def run_full_lifecycle_test():
     """Run the complete lifecycle test with REAL services."""
 
-    print("\n" + "=" * 60)
-    print("Viewpoint Prism Full Lifecycle Integration Test")
-    print("WITH REAL LLM API CALLS")
-    print("=" * 60)
-    print("\n[INFO] This test will make REAL API calls to:")
-    print("       - SophNet LLM (DeepSeek-V3.2)")
-    print("       - ChromaDB Vector Store (with fallback)")
-    print("       - SQLite Database")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("Viewpoint Prism Full Lifecycle Integration Test")
+    log("WITH REAL LLM API CALLS")
+    log("=" * 60)
+    log("\n[INFO] This test will make REAL API calls to:")
+    log("       - SophNet LLM (DeepSeek-V3.2)")
+    log("       - ChromaDB Vector Store (with fallback)")
+    log("       - SQLite Database")
+    log("=" * 60)
 
     # Find test video
     video_path = find_test_video()
     if not video_path:
-        print("[ERROR] No test video found.")
+        log("[ERROR] No test video found.")
         return False
 
-    print(f"\nTest video: {video_path.name}")
-    print(f"Video size: {video_path.stat().st_size / (1024*1024):.1f} MB")
+    log(f"\nTest video: {video_path.name}")
+    log(f"Video size: {video_path.stat().st_size / (1024*1024):.1f} MB")
 
     video_id = None
     try:
@@ -603,34 +815,35 @@ async def run_full_lifecycle_test():
         # Phase 2: Source Ingestion
         video_id = await test_source_ingestion(services, video_path)
 
-        # Phase 3: Analysis with REAL LLM
-        await test_analysis_with_real_llm(services, video_id)
-
-        # Phase 4: Chat with REAL LLM
-        await test_chat_with_real_llm(services, video_id)
-
-        print("\n" + "=" * 60)
-        print("[SUCCESS] All lifecycle phases completed with REAL services!")
-        print("=" * 60)
-        print(f"\nVideo ID: {video_id}")
-        print("\n[NOTE] The LLM generated responses based on the test prompts.")
-        print("       Full analysis of video content requires video processing pipeline")
-        print("       (transcription, embedding, etc.) to populate the vector store.")
-        print("=" * 60)
+        # Phases 3/4 only read video_id (neither touches the DB session), run them concurrently;
+        # each phase's report is buffered and written as one block
+        await asyncio.gather(
+            run_buffered(test_analysis_with_real_llm(services, video_id)),
+            run_buffered(test_chat_with_real_llm(services, video_id)),
+        )
+
+        log("\n" + "=" * 60)
+        log("[SUCCESS] All lifecycle phases completed with REAL services!")
+        log("=" * 60)
+        log(f"\nVideo ID: {video_id}")
+        log("\n[NOTE] The LLM generated responses based on the test prompts.")
+        log("       Full analysis of video content requires video processing pipeline")
+        log("       (transcription, embedding, etc.) to populate the vector store.")
+        log("=" * 60)
 
         return True
 
     except Exception as e:
-        print("\n" + "=" * 60)
-        print("[FAILED] Test Failed!")
-        print("=" * 60)
-        print(f"Error: {e}")
-        print("\nTraceback:")
-        traceback.print_exc()
-        print("=" * 60)
+        log("\n" + "=" * 60)
+        log("[FAILED] Test Failed!")
+        log("=" * 60)
+        log(f"Error: {e}")
+        log("\nTraceback:")
+        log(traceback.format_exc().rstrip())
+        log("=" * 60)
 
         if video_id:
-            print(f"Video ID was created: {video_id}")
+            log(f"Video ID was created: {video_id}")
         return False
 
     finally:
@@ -640,15 +853,27 @@ async def run_full_lifecycle_test():
 
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="Viewpoint Prism lifecycle test with real services")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="skip the on-disk LLM response cache and call the API for every prompt",
+    )
+    args = parser.parse_args()
+
+    # 只有 temperature=0 的分析请求经 LLM 响应缓存 (SQLite, LLM_CACHE_TTL 过期) 跨运行复用;
+    # 连接探测与 temperature>0 的聊天回复始终实时请求
+    get_settings().llm_cache = not args.no_cache
+
     try:
         result = asyncio.run(run_full_lifecycle_test())
         sys.exit(0 if result else 1)
     except KeyboardInterrupt:
-        print("\n\nTest interrupted by user")
+        log("\n\nTest interrupted by user")
         sys.exit(1)
     except Exception as e:
-        print(f"\nFatal error: {e}")
-        traceback.print_exc()
+        log(f"\nFatal error: {e}")
+        log(traceback.format_exc().rstrip())
         sys.exit(1)
 
 
